@@ -0,0 +1,95 @@
+"""Requests/sec of a sync (`def` + Session) vs async (`async def` + AsyncSession) handler.
+
+Both apps serve the same artist lookup against the database configured in .env and are
+driven in-process at a fixed concurrency, so the sync variant goes through Starlette's
+threadpool exactly like the routers used to. On MySQL, `--db-latency-ms` adds a
+server-side SLEEP to every request to mimic a slow round trip.
+
+    cd backend && python -m bench.db_layer --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select, text
+
+from database import AsyncSessionLocal, SessionLocal
+from models.artist import Artist
+
+
+def build_sync_app(sleep_sql: str | None) -> FastAPI:
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/artists/{artist_id}")
+    def get_artist(artist_id: int, db=Depends(get_db)):
+        if sleep_sql:
+            db.execute(text(sleep_sql))
+        artist = db.execute(select(Artist.id, Artist.name).where(Artist.id == artist_id)).first()
+        return {"id": artist.id, "name": artist.name} if artist else None
+
+    return app
+
+
+def build_async_app(sleep_sql: str | None) -> FastAPI:
+    app = FastAPI()
+
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    @app.get("/artists/{artist_id}")
+    async def get_artist(artist_id: int, db=Depends(get_db)):
+        if sleep_sql:
+            await db.execute(text(sleep_sql))
+        artist = (await db.execute(select(Artist.id, Artist.name).where(Artist.id == artist_id))).first()
+        return {"id": artist.id, "name": artist.name} if artist else None
+
+    return app
+
+
+async def drive(app: FastAPI, concurrency: int, total: int, artist_ids: list[int]) -> float:
+    transport = httpx.ASGITransport(app=app)
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                r = await client.get(f"/artists/{artist_ids[i % len(artist_ids)]}")
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=int, default=0, help="MySQL only: SELECT SLEEP() per request")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        artist_ids = list(db.scalars(select(Artist.id).limit(1000))) or [1]
+        dialect = db.get_bind().dialect.name
+    sleep_sql = None
+    if args.db_latency_ms and dialect in ("mysql", "mariadb"):
+        sleep_sql = f"SELECT SLEEP({args.db_latency_ms / 1000})"
+
+    print(f"dialect={dialect} concurrency={args.concurrency} requests={args.requests} latency={args.db_latency_ms}ms")
+    for name, app in (("sync", build_sync_app(sleep_sql)), ("async", build_async_app(sleep_sql))):
+        rps = asyncio.run(drive(app, args.concurrency, args.requests, artist_ids))
+        print(f"{name:>6}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
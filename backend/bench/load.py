@@ -0,0 +1,234 @@
+"""Scripted load against the real API, with per-endpoint throughput and latency percentiles.
+
+Virtual users pick scenarios by weight and run their steps back to back:
+
+    browse   song list pages (cursor), song detail, artist + albums, album songs, genre filter
+    search   /api/search and song title filter on catalog words
+    auth     /api/auth/login with a bench user
+    write    create a song, link a genre, rename it, delete it
+
+By default main.app is driven in-process (no server, no network); --url targets a running
+server instead. Seed the database first with bench.seed.
+
+    cd backend && python -m bench.load --seconds 30 --concurrency 50 --out run.json
+    cd backend && python -m bench.load --seconds 30 --baseline run.json   # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import func, select
+
+from database import SessionLocal
+from models import artist, album, song, genre, user, table_version  # noqa: F401 (mappers)
+from models.album import Album
+from models.artist import Artist
+from models.genre import Genre
+from models.song import Song
+from models.user import User
+from bench.seed import USER_PASSWORD, WORDS
+
+SCENARIOS = ("browse", "search", "auth", "write")
+
+
+class Catalog:
+    """Id ranges of the seeded catalog, read once so scenarios can pick valid ids."""
+
+    def __init__(self):
+        with SessionLocal() as db:
+            self.ranges = {
+                name: tuple(db.execute(select(func.min(model.id), func.max(model.id))).one())
+                for name, model in (("artist", Artist), ("album", Album), ("song", Song), ("genre", Genre))
+            }
+            self.users = list(db.scalars(select(User.username).where(User.username.like("bench-user-%")).limit(1000)))
+        if any(low is None for low, _ in self.ranges.values()):
+            sys.exit("empty catalog: run `python -m bench.seed` first")
+
+    def pick(self, rng: random.Random, name: str) -> int:
+        return rng.randint(*self.ranges[name])
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        # 404s are expected: random ids can point at rows another user just deleted
+        if r.status_code not in ok and r.status_code != 404:
+            self.errors[name] += 1
+        return r
+
+
+async def browse(client, rec: Recorder, cat: Catalog, rng: random.Random):
+    r = await rec.call(client, "GET /api/songs/", "GET", "/api/songs/", params={"limit": 50})
+    cursor = r.headers.get("X-Next-Cursor") if r is not None else None
+    if cursor:
+        await rec.call(client, "GET /api/songs/?cursor", "GET", "/api/songs/", params={"limit": 50, "cursor": cursor})
+    await rec.call(client, "GET /api/songs/{id}", "GET", f"/api/songs/{cat.pick(rng, 'song')}")
+    artist_id = cat.pick(rng, "artist")
+    await rec.call(client, "GET /api/artists/{id}", "GET", f"/api/artists/{artist_id}")
+    await rec.call(client, "GET /api/artists/{id}/albums", "GET", f"/api/artists/{artist_id}/albums")
+    await rec.call(client, "GET /api/albums/{id}/songs", "GET", f"/api/albums/{cat.pick(rng, 'album')}/songs")
+    await rec.call(client, "GET /api/songs/?genre_id", "GET", "/api/songs/", params={"genre_id": cat.pick(rng, "genre"), "limit": 50})
+
+
+async def search(client, rec: Recorder, cat: Catalog, rng: random.Random):
+    q = rng.choice(WORDS)
+    await rec.call(client, "GET /api/search/", "GET", "/api/search/", params={"q": q})
+    await rec.call(client, "GET /api/songs/?q", "GET", "/api/songs/", params={"q": f"{q} {rng.choice(WORDS)}", "limit": 20})
+
+
+async def auth(client, rec: Recorder, cat: Catalog, rng: random.Random):
+    if cat.users:
+        await rec.call(client, "POST /api/auth/login", "POST", "/api/auth/login",
+                       json={"username": rng.choice(cat.users), "password": USER_PASSWORD})
+
+
+async def write(client, rec: Recorder, cat: Catalog, rng: random.Random):
+    r = await rec.call(client, "POST /api/songs/", "POST", "/api/songs/", ok=(201,),
+                       json={"title": f"bench {rng.choice(WORDS)}", "duration": 200.0, "artist_id": cat.pick(rng, "artist")})
+    if r is None or r.status_code != 201:
+        return
+    song_id = r.json()["id"]
+    await rec.call(client, "POST /api/songs/{id}/genres/{id}", "POST", f"/api/songs/{song_id}/genres/{cat.pick(rng, 'genre')}", ok=(204,))
+    await rec.call(client, "PUT /api/songs/{id}", "PUT", f"/api/songs/{song_id}",
+                   json={"title": f"bench {rng.choice(WORDS)} v2", "duration": 201.0, "artist_id": None})
+    await rec.call(client, "DELETE /api/songs/{id}", "DELETE", f"/api/songs/{song_id}", ok=(204,))
+
+
+RUNNERS = {"browse": browse, "search": search, "auth": auth, "write": write}
+
+
+def _parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in RUNNERS:
+            raise SystemExit(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+async def run(args) -> dict:
+    cat = Catalog()
+    rec = Recorder()
+    weights = _parse_mix(args.mix)
+    names, odds = list(weights), list(weights.values())
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        from main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        stop_at = time.perf_counter() + args.seconds
+
+        async def virtual_user(n: int):
+            rng = random.Random(args.seed * 1000 + n)
+            while time.perf_counter() < stop_at:
+                await RUNNERS[rng.choices(names, odds)[0]](client, rec, cat, rng)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return _report(rec, elapsed, args)
+
+
+def _report(rec: Recorder, elapsed: float, args) -> dict:
+    endpoints = {}
+    for name in sorted(rec.latencies.keys() | rec.errors.keys()):
+        samples = sorted(rec.latencies.get(name, []))
+        q = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) >= 2 else [samples[0] if samples else 0.0] * 99
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": rec.errors.get(name, 0),
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(q[49] * 1000, 2),
+            "p95_ms": round(q[94] * 1000, 2),
+            "p99_ms": round(q[98] * 1000, 2),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "config": {"seconds": args.seconds, "concurrency": args.concurrency, "mix": args.mix, "seed": args.seed, "url": args.url},
+        "elapsed_seconds": round(elapsed, 2),
+        "total_requests": total,
+        "total_rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def _print(report: dict):
+    print(f"{report['total_requests']} requests in {report['elapsed_seconds']}s, {report['total_rps']} req/s")
+    print(f"{'endpoint':<36} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, e in report["endpoints"].items():
+        print(f"{name:<36} {e['requests']:>7} {e['errors']:>5} {e['rps']:>8} {e['p50_ms']:>8} {e['p95_ms']:>8} {e['p99_ms']:>8}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_requests: int) -> list[str]:
+    """Endpoints whose p95/p99 grew, or whose throughput dropped, by more than tolerance.
+
+    Endpoints with fewer than min_requests samples on either side are shown but not
+    judged: their tail percentiles are mostly noise.
+    """
+    regressions = []
+    differs = [k for k in ("concurrency", "mix", "seed") if report["config"][k] != baseline["config"].get(k)]
+    if differs:
+        print(f"\nwarning: baseline ran with a different {', '.join(differs)}; rps is not comparable")
+    print(f"\n{'vs baseline':<36} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, e in report["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base or not base["requests"]:
+            continue
+        delta = {k: (e[k] - base[k]) / base[k] if base[k] else 0.0 for k in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+        print(f"{name:<36} " + " ".join(f"{delta[k]:>+8.0%}" for k in ("rps", "p50_ms", "p95_ms", "p99_ms")))
+        if min(e["requests"], base["requests"]) < min_requests:
+            continue
+        if delta["rps"] < -tolerance or delta["p95_ms"] > tolerance or delta["p99_ms"] > tolerance:
+            regressions.append(name)
+        if e["errors"] > base["errors"]:
+            regressions.append(f"{name} (errors {base['errors']} -> {e['errors']})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--mix", default="browse=6,search=2,auth=1,write=1", help="scenario weights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="running server to target instead of main.app in-process")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--min-requests", type=int, default=200, help="samples needed to judge an endpoint")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    _print(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_requests)
+        if regressions:
+            print("\nregressions: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
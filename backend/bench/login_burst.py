@@ -0,0 +1,106 @@
+"""Catalog latency during a login burst, with hashing inline vs in the hash pool.
+
+A steady stream of GET /api/artists/{id} runs at a fixed concurrency; halfway through,
+`--logins` clients start hammering POST /api/auth/login. With HASH_POOL=none every bcrypt
+verify runs on the event loop and the catalog p99 jumps to the hash cost; with the
+process pool it should stay close to the quiet phase. Runs main.app, as deployed.
+
+    cd backend && python -m bench.login_burst --seconds 5 --logins 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from database import SessionLocal
+from main import app  # migrates the database on import
+from models.artist import Artist
+from models.user import User
+from utils import security
+
+USERNAME = "bench-login"
+PASSWORD = "bench-password"
+
+
+def _setup() -> list[int]:
+    with SessionLocal() as db:
+        if not db.scalar(select(User).where(User.username == USERNAME)):
+            db.add(User(username=USERNAME, email="bench-login@example.com", password=security.hash_password(PASSWORD)))
+        if not db.scalar(select(Artist.id).limit(1)):
+            db.add(Artist(name="Bench artist"))
+        db.commit()
+        return list(db.scalars(select(Artist.id).limit(100)))
+
+
+def _percentiles(samples: list[float]) -> str:
+    if len(samples) < 2:
+        return "n/a"
+    q = statistics.quantiles(samples, n=100)
+    return f"n={len(samples):6d} p50={q[49] * 1000:7.1f}ms p95={q[94] * 1000:7.1f}ms p99={q[98] * 1000:7.1f}ms"
+
+
+async def run(app: FastAPI, artist_ids: list[int], concurrency: int, logins: int, seconds: float):
+    transport = httpx.ASGITransport(app=app)
+    quiet: list[float] = []
+    burst: list[float] = []
+    login_count = 0
+    start = time.perf_counter()
+    burst_at = start + seconds / 2
+    stop_at = start + seconds
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def reader(n: int):
+            i = n
+            while (now := time.perf_counter()) < stop_at:
+                t = time.perf_counter()
+                r = await client.get(f"/api/artists/{artist_ids[i % len(artist_ids)]}")
+                r.raise_for_status()
+                (burst if now >= burst_at else quiet).append(time.perf_counter() - t)
+                i += concurrency
+
+        async def login():
+            nonlocal login_count
+            await asyncio.sleep(max(0.0, burst_at - time.perf_counter()))
+            while time.perf_counter() < stop_at:
+                r = await client.post("/api/auth/login", data={"username": USERNAME, "password": PASSWORD})
+                if r.status_code == 200:
+                    login_count += 1
+
+        await asyncio.gather(*(reader(n) for n in range(concurrency)), *(login() for _ in range(logins)))
+    return quiet, burst, login_count
+
+
+async def run_modes(args, artist_ids: list[int]):
+    # one event loop for every mode: the async engine's pool is bound to it
+    for mode in args.modes:
+        security.shutdown_hashing()
+        security.HASH_POOL = mode
+        security.hashing_stats = security.HashingStats()
+        quiet, burst, logins = await run(app, artist_ids, args.concurrency, args.logins, args.seconds)
+        print(f"HASH_POOL={mode}")
+        print(f"  quiet: {_percentiles(quiet)}")
+        print(f"  burst: {_percentiles(burst)}  logins={logins}")
+        print(f"  hashing: {security.hashing_stats.as_dict()}")
+    security.shutdown_hashing()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20, help="catalog readers")
+    parser.add_argument("--logins", type=int, default=20, help="concurrent login clients during the burst")
+    parser.add_argument("--seconds", type=float, default=6.0, help="run length per mode, burst in the second half")
+    parser.add_argument("--modes", nargs="+", default=["none", "process"], choices=["none", "thread", "process"])
+    args = parser.parse_args()
+
+    artist_ids = _setup()
+    print(f"bcrypt rounds={security.BCRYPT_ROUNDS} workers={security.HASH_WORKERS} "
+          f"concurrency={args.concurrency} logins={args.logins}")
+    asyncio.run(run_modes(args, artist_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Seeded synthetic catalog for benchmarks.
+
+Fills the database configured in .env (DATABASE_URL works too, e.g. a SQLite file) with
+artists, albums, songs, genres, genre links and users. The same --seed and sizes always
+produce the same catalog, so runs on different branches compare like for like. Rows are
+written with multi-row INSERTs in chunks, with ids assigned here, which keeps millions
+of songs within minutes on MySQL.
+
+    cd backend && python -m bench.seed --songs 100000
+    cd backend && python -m bench.seed --songs 2000000 --artists 50000 --reset
+
+Bench users log in through /api/auth/login as bench-user-<n> / bench-password.
+"""
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import delete, func, insert, select
+
+from database import SessionLocal, engine
+from models import artist, album, song, genre, user, table_version, catalog_stats  # noqa: F401 (mappers)
+from models.album import Album
+from models.artist import Artist
+from models.associations import song_genres
+from models.genre import Genre
+from models.song import Song
+from models.user import User
+from utils.cache import cache
+from utils.conditional import VERSIONED_TABLES, bump_versions_sync
+from utils.migrations import upgrade_database
+from services.stats import rebuild_stats_sync
+from utils.security import hash_password
+
+USER_PASSWORD = "bench-password"
+# short vocabulary so FULLTEXT / LIKE searches have realistic hit rates
+WORDS = (
+    "love night heart fire blue dream road rain light summer city gold wild river home moon "
+    "dance storm ghost echo sky stone velvet neon shadow ocean glass paper silver last first"
+).split()
+GENRES = (
+    "Rock", "Pop", "Jazz", "Hip-Hop", "Electro", "Classique", "Folk", "Metal", "Soul", "Reggae",
+    "Blues", "Punk", "Funk", "Ambient", "Country", "R&B", "Indie", "House", "Techno", "Disco",
+)
+
+
+def _title(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _next_id(db, model) -> int:
+    return (db.scalar(select(func.max(model.id))) or 0) + 1
+
+
+class Seeder:
+    def __init__(self, db, chunk_size: int = 5000):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def insert(self, table, rows):
+        chunk = []
+        count = 0
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                count += self._flush(table, chunk)
+                chunk = []
+        if chunk:
+            count += self._flush(table, chunk)
+        return count
+
+    def _flush(self, table, chunk) -> int:
+        self.db.execute(insert(table).values(chunk))
+        self.db.commit()
+        return len(chunk)
+
+
+def seed(args) -> dict:
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    upgrade_database(engine)
+    with SessionLocal() as db:
+        if args.reset:
+            for table in (song_genres, Song.__table__, Album.__table__, Artist.__table__, Genre.__table__):
+                db.execute(delete(table))
+            db.execute(delete(User).where(User.username.like("bench-user-%")))
+            db.commit()
+        s = Seeder(db, args.chunk_size)
+
+        first_genre = _next_id(db, Genre)
+        genre_ids = list(range(first_genre, first_genre + args.genres))
+        s.insert(Genre.__table__, (
+            {"id": gid, "title": GENRES[i % len(GENRES)] + ("" if i < len(GENRES) else f" {i // len(GENRES)}"), "description": None}
+            for i, gid in enumerate(genre_ids)
+        ))
+
+        first_artist = _next_id(db, Artist)
+        artist_ids = range(first_artist, first_artist + args.artists)
+        s.insert(Artist.__table__, (
+            {"id": aid, "name": _title(rng, rng.randint(1, 3)), "avatar": None, "bio": None} for aid in artist_ids
+        ))
+
+        first_album = _next_id(db, Album)
+        album_artist: list[int] = []
+        for aid in artist_ids:
+            album_artist.extend([aid] * rng.randint(0, 2 * args.albums_per_artist))
+        s.insert(Album.__table__, (
+            {"id": first_album + i, "title": _title(rng, rng.randint(1, 4)), "cover": None, "release_date": None, "artist_id": aid}
+            for i, aid in enumerate(album_artist)
+        ))
+
+        first_song = _next_id(db, Song)
+
+        def songs():
+            for i in range(args.songs):
+                # most songs sit on an album of their artist, some are singles
+                if album_artist and rng.random() < 0.9:
+                    idx = rng.randrange(len(album_artist))
+                    artist_id, album_id = album_artist[idx], first_album + idx
+                else:
+                    artist_id, album_id = rng.choice(artist_ids) if args.artists else None, None
+                yield {
+                    "id": first_song + i,
+                    "title": _title(rng, rng.randint(1, 5)),
+                    "duration": round(rng.uniform(90, 420), 1),
+                    "artist_id": artist_id,
+                    "album_id": album_id,
+                }
+
+        s.insert(Song.__table__, songs())
+
+        def links():
+            for i in range(args.songs):
+                for gid in rng.sample(genre_ids, min(len(genre_ids), rng.randint(0, 2 * args.genres_per_song))):
+                    yield {"song_id": first_song + i, "genre_id": gid}
+
+        link_count = s.insert(song_genres, links()) if genre_ids else 0
+
+        password = hash_password(USER_PASSWORD) if args.hashed_passwords else USER_PASSWORD
+        existing = set(db.scalars(select(User.username).where(User.username.like("bench-user-%"))))
+        s.insert(User.__table__, (
+            {"username": f"bench-user-{n}", "email": f"bench-user-{n}@example.com", "password": password}
+            for n in range(args.users) if f"bench-user-{n}" not in existing
+        ))
+
+        # rows went in behind the API: recompute the counters in one pass
+        rebuild_stats_sync(db)
+        bump_versions_sync(db, *VERSIONED_TABLES)
+        db.commit()
+    cache.clear()
+    return {
+        "genres": len(genre_ids),
+        "artists": len(artist_ids),
+        "albums": len(album_artist),
+        "songs": args.songs,
+        "genre_links": link_count,
+        "users": args.users,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--artists", type=int, default=1000)
+    parser.add_argument("--albums-per-artist", type=int, default=3, help="average")
+    parser.add_argument("--songs", type=int, default=50000)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--genres-per-song", type=int, default=1, help="average")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--hashed-passwords", action="store_true",
+                        help="bcrypt the user passwords up front instead of storing them in clear "
+                             "(hashed by /api/auth/login on each user's first login)")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true", help="delete the catalog and bench users first")
+    args = parser.parse_args()
+    print(seed(args), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
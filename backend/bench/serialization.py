@@ -0,0 +1,105 @@
+"""Rows/sec of a 200-song page through three response paths.
+
+    models   ORM Song entities, one SongWithNamesResponse built per row (the old path)
+    columns  plain column tuples as dicts, validated once against response_model and
+             dumped straight to JSON bytes by pydantic (what the song lists now do)
+    orjson   the same dicts through ORJSONResponse, skipping response_model entirely
+
+Each app serves the same songs_with_names() page from the database configured in .env,
+requested sequentially in-process so the numbers are CPU per page, not concurrency.
+
+    cd backend && python -m bench.serialization --requests 300
+"""
+import argparse
+import asyncio
+import time
+import warnings
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from database import AsyncSessionLocal, SessionLocal
+from models import artist, album, song, genre, user, table_version  # noqa: F401 (mappers)
+from models.artist import Artist
+from models.song import Song
+from schemas.song import SongWithNamesResponse
+from services.catalog import SONG_COLUMNS, songs_with_names
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from fastapi.responses import ORJSONResponse
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def build_app(path: str, limit: int) -> FastAPI:
+    app = FastAPI()
+
+    if path == "models":
+        @app.get("/songs", response_model=List[SongWithNamesResponse])
+        async def songs(db=Depends(get_db)):
+            rows = (await db.execute(songs_with_names().order_by(Song.id).limit(limit))).all()
+            return [
+                SongWithNamesResponse(
+                    id=s.id, title=s.title, duration=s.duration, artist_id=s.artist_id, artist_name=an,
+                    album_id=s.album_id, album_title=aln,
+                )
+                for s, an, aln in rows
+            ]
+    elif path == "columns":
+        @app.get("/songs", response_model=List[SongWithNamesResponse])
+        async def songs(db=Depends(get_db)):
+            rows = (await db.execute(songs_with_names(*SONG_COLUMNS).order_by(Song.id).limit(limit))).all()
+            return [row._asdict() for row in rows]
+    else:
+        @app.get("/songs", response_class=ORJSONResponse)
+        async def songs(db=Depends(get_db)):
+            rows = (await db.execute(songs_with_names(*SONG_COLUMNS).order_by(Song.id).limit(limit))).all()
+            return ORJSONResponse([row._asdict() for row in rows])
+
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> tuple[float, int]:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        rows = len((await client.get("/songs")).json())  # warm-up
+        start = time.perf_counter()
+        for _ in range(requests):
+            r = await client.get("/songs")
+            r.raise_for_status()
+        return time.perf_counter() - start, rows
+
+
+def _seed(limit: int):
+    with SessionLocal() as db:
+        missing = limit - db.query(Song).count()
+        if missing > 0:
+            a = Artist(name="Bench artist")
+            db.add(a)
+            db.flush()
+            db.add_all(Song(title=f"Bench song {i}", duration=180.0, artist_id=a.id) for i in range(missing))
+            db.commit()
+
+
+async def run(paths: list[str], limit: int, requests: int):
+    for path in paths:
+        elapsed, rows = await drive(build_app(path, limit), requests)
+        print(f"{path:>8}: {requests / elapsed:7.1f} pages/s  {requests * rows / elapsed:9.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--paths", nargs="+", default=["models", "columns", "orjson"], choices=["models", "columns", "orjson"])
+    args = parser.parse_args()
+    _seed(args.limit)
+    asyncio.run(run(args.paths, args.limit, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Memory and load time of the in-process catalog snapshot (services/snapshot.py).
+
+Loads the seeded catalog the way a worker does at startup and reports what it costs,
+scaled to a million songs. Seed first with bench.seed; run on the database you size for.
+
+    cd backend && python -m bench.seed --songs 1000000 --reset
+    cd backend && python -m bench.snapshot
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from database import engine
+from models import artist, album, song, genre, user, table_version  # noqa: F401 (mappers)
+from services.snapshot import FULL_LOADS, CatalogTables
+
+
+def measure() -> dict:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    tables = CatalogTables()
+    with Session(engine) as db:
+        for stmt, loader in FULL_LOADS.values():
+            loader(tables, db.execute(stmt.execution_options(yield_per=20000)))
+    seconds = time.perf_counter() - started
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    counts = tables.counts()
+    per_million = size / counts["songs"] * 1_000_000 if counts["songs"] else 0
+    return {
+        **counts,
+        "load_seconds": round(seconds, 1),
+        "memory_mb": round(size / 2**20, 1),
+        "mb_per_million_songs": round(per_million / 2**20, 1),
+    }
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+    print(json.dumps(measure(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""SQL statements per write request, read from the Server-Timing header.
+
+Drives main.app in-process through every catalog and user write, including the error
+paths that used to need an existence SELECT (unknown foreign key, duplicate user), and
+prints the statement count of each (statements that ran to completion: a write the
+database rejects does not count). The rows it creates are deleted at the end. Use a
+scratch database: DATABASE_URL=sqlite:///./bench.db works.
+
+Only successful writes are held to the baseline: an unknown parent now costs the rejected
+write plus the lookup naming it, instead of the lookup alone.
+
+    cd backend && python -m bench.write_path --out writes.json
+    cd backend && python -m bench.write_path --baseline writes.json   # exit 1 if a count grew
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import uuid
+
+import httpx
+
+
+TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+class Counter:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.counts: dict[str, int] = {}
+        self.failures: set[str] = set()
+
+    async def call(self, name: str, method: str, url: str, expect: int, **kwargs) -> httpx.Response:
+        r = await self.client.request(method, url, **kwargs)
+        if r.status_code != expect:
+            sys.exit(f"{name}: expected {expect}, got {r.status_code} {r.text}")
+        match = TIMING.search(r.headers.get("server-timing", ""))
+        if match is None:
+            sys.exit("no Server-Timing header: run with METRICS_ENABLED and SERVER_TIMING on")
+        self.counts[name] = int(match.group(1))
+        if expect >= 400:
+            self.failures.add(name)
+        return r
+
+
+async def run() -> Counter:
+    os.environ.setdefault("SERVER_TIMING", "true")  # off by default, read when main is imported
+    from main import app
+
+    tag = uuid.uuid4().hex[:8]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        c = Counter(client)
+        artist = (await c.call("POST /api/artists/", "POST", "/api/artists/", 201, json={"name": f"bench {tag}"})).json()["id"]
+        await c.call("PUT /api/artists/{id}", "PUT", f"/api/artists/{artist}", 200, json={"name": f"bench {tag} 2"})
+        await c.call("PUT /api/artists/{id} (404)", "PUT", "/api/artists/0", 404, json={"name": "x"})
+        album = (await c.call("POST /api/albums/", "POST", "/api/albums/", 201, json={"title": "a", "artist_id": artist})).json()["id"]
+        await c.call("POST /api/albums/ (unknown artist)", "POST", "/api/albums/", 404, json={"title": "a", "artist_id": 0})
+        await c.call("PUT /api/albums/{id}", "PUT", f"/api/albums/{album}", 200, json={"title": "a2", "artist_id": artist})
+        song = (await c.call("POST /api/songs/", "POST", "/api/songs/", 201,
+                             json={"title": "s", "duration": 100.0, "artist_id": artist, "album_id": album})).json()["id"]
+        await c.call("POST /api/songs/ (unknown album)", "POST", "/api/songs/", 404, json={"title": "s", "album_id": 0})
+        await c.call("PUT /api/songs/{id} (title)", "PUT", f"/api/songs/{song}", 200,
+                     json={"title": "s2", "duration": 100.0, "artist_id": artist, "album_id": album})
+        await c.call("PUT /api/songs/{id} (duration)", "PUT", f"/api/songs/{song}", 200,
+                     json={"title": "s2", "duration": 120.0, "artist_id": artist, "album_id": album})
+        await c.call("POST /api/albums/{id}/songs", "POST", f"/api/albums/{album}/songs", 201, json={"title": "t", "duration": 90.0})
+        genre = (await c.call("POST /api/genres/", "POST", "/api/genres/", 201, json={"title": f"bench {tag}"})).json()["id"]
+        await c.call("PUT /api/genres/{id}", "PUT", f"/api/genres/{genre}", 200, json={"title": f"bench {tag} 2"})
+        user = {"username": f"bench-{tag}", "email": f"bench-{tag}@example.com", "password": "x"}
+        user_id = (await c.call("POST /api/users/", "POST", "/api/users/", 201, json=user)).json()["id"]
+        await c.call("POST /api/users/ (duplicate)", "POST", "/api/users/", 400, json=user)
+        await c.call("PUT /api/users/{id}", "PUT", f"/api/users/{user_id}", 200, json={**user, "password": "y"})
+
+        await c.call("PATCH /api/artists/{id}", "PATCH", f"/api/artists/{artist}", 200, json={"bio": "b"})
+        await c.call("PATCH /api/albums/{id}", "PATCH", f"/api/albums/{album}", 200, json={"title": "a3"})
+        await c.call("PATCH /api/songs/{id}", "PATCH", f"/api/songs/{song}", 200, json={"title": "s3"})
+        await c.call("PATCH /api/songs/{id} (unknown artist)", "PATCH", f"/api/songs/{song}", 404, json={"artist_id": 0})
+        await c.call("PATCH /api/genres/{id}", "PATCH", f"/api/genres/{genre}", 200, json={"description": "d"})
+        await c.call("PATCH /api/users/{id}", "PATCH", f"/api/users/{user_id}", 200, json={"password": "z"})
+
+        for url in (f"/api/users/{user_id}", f"/api/genres/{genre}", f"/api/artists/{artist}"):
+            await client.delete(url)
+    return c
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", help="write the counts here as JSON")
+    parser.add_argument("--baseline", help="JSON counts to compare against")
+    args = parser.parse_args()
+
+    c = asyncio.run(run())
+    counts = c.counts
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(f"{'request':<40} {'queries':>8}" + (f" {'baseline':>9}" if baseline else ""))
+    for name, n in counts.items():
+        print(f"{name:<40} {n:>8}" + (f" {baseline.get(name, '-'):>9}" if baseline else ""))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(counts, f, indent=2)
+    if grew := [name for name, n in counts.items() if name in baseline and n > baseline[name] and name not in c.failures]:
+        print("\nmore queries than the baseline: " + ", ".join(grew))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
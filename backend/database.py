@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv, find_dotenv
 
+from utils.metrics import instrument_engine
+
 load_dotenv(find_dotenv())
 
 DB_USER = os.getenv("DB_USER")
@@ -11,9 +18,203 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 DB_PORT = os.getenv("DB_PORT", "3306")
+DB_ASYNC_DRIVER = os.getenv("DB_ASYNC_DRIVER", "aiomysql")  # or asyncmy
+
+# Pool tuning, see GET /health/db for the numbers to size it against
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, below MySQL wait_timeout
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+
+def _async_url(url: str) -> str:
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1).replace("+pysqlite", "")
+    return url.replace("mysql+pymysql://", f"mysql+{DB_ASYNC_DRIVER}://", 1)
+
+
+# DATABASE_URL overrides the DB_* settings (e.g. sqlite:///./spotilike.db for local runs)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SQLALCHEMY_ASYNC_DATABASE_URL = os.getenv("DATABASE_ASYNC_URL") or _async_url(SQLALCHEMY_DATABASE_URL)
+# read replicas, same URL form, comma-separated (e.g. two copies of a SQLite file locally)
+REPLICA_DATABASE_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "least_connections")  # or round_robin
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))  # a failed replica sits out this long
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    # _do_get is where QueuePool blocks when every connection is checked out
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_kwargs(url: str, poolclass) -> dict:
+    kwargs = dict(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if url.startswith("mysql"):
+        kwargs["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+    elif url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    return kwargs
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+def enforce_foreign_keys(engine):
+    """SQLite leaves foreign keys unchecked unless each connection asks: the routers rely
+    on the constraint, not a SELECT, to reject unknown parents (utils/writes.py)."""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", lambda dbapi_connection, _: dbapi_connection.execute("PRAGMA foreign_keys=ON"))
+
+
+def pool_status(pool) -> dict:
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "timeout": DB_POOL_TIMEOUT,
+    }
+    if isinstance(pool, _TimedPoolMixin):
+        status.update(pool.wait_stats.as_dict())
+    return status
+
+
+# Sync engine: scripts, migrations and anything running outside the event loop
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs(SQLALCHEMY_DATABASE_URL, TimedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine)
+enforce_foreign_keys(engine)
+
+# Async engine: used by the API routers
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, **_engine_kwargs(SQLALCHEMY_ASYNC_DATABASE_URL, TimedAsyncQueuePool))
+# expire_on_commit=False so returning an object after commit never triggers lazy IO
+instrument_engine(async_engine.sync_engine)
+enforce_foreign_keys(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_async_engine(_async_url(url), **_engine_kwargs(url, TimedAsyncQueuePool))
+        self.down_until = 0.0
+        self.failures = 0
+        instrument_engine(self.engine.sync_engine)
+        enforce_foreign_keys(self.engine.sync_engine)
+        event.listen(self.engine.sync_engine, "handle_error", self._on_error)
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def mark_down(self):
+        self.failures += 1
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def mark_up(self):
+        self.down_until = 0.0
+
+    def _on_error(self, context):
+        # connection refused / lost: stop sending reads here for a while; the next pick
+        # after REPLICA_RETRY_SECONDS tries it again
+        if context.is_disconnect or (context.connection is None and isinstance(context.original_exception, exc.OperationalError)):
+            self.mark_down()
+
+
+class ReplicaSet:
+    """Picks the engine a read-only session binds to: a healthy replica, else the primary."""
+
+    def __init__(self, urls: list[str], primary, strategy: str = REPLICA_STRATEGY):
+        self.replicas = [Replica(f"replica-{i}", url) for i, url in enumerate(urls)]
+        self.primary = primary
+        self.strategy = strategy
+        self._turn = itertools.count()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def pick(self):
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return self.primary
+        if self.strategy == "round_robin":
+            return healthy[next(self._turn) % len(healthy)].engine
+        # least connections, ties broken in turn so an idle set still spreads the load
+        start = next(self._turn)
+        order = healthy[start % len(healthy):] + healthy[:start % len(healthy)]
+        return min(order, key=lambda r: r.engine.pool.checkedout()).engine
+
+    async def check(self) -> dict:
+        """Ping every replica, updating its health; the /health/db report."""
+        report = {}
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception as e:
+                replica.mark_down()
+                report[replica.name] = {"status": "error", "detail": str(e)}
+            else:
+                replica.mark_up()
+                report[replica.name] = {"status": "ok"}
+            report[replica.name]["failures"] = replica.failures
+            report[replica.name]["pool"] = pool_status(replica.engine.pool)
+        return report
+
+
+# GET handlers read through replicas (dependencies.db.get_db); the primary takes writes
+replicas = ReplicaSet(REPLICA_DATABASE_URLS, async_engine)
 Base = declarative_base()
@@ -1,31 +1,65 @@
+import os
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 
-from database import SessionLocal
+from database import AsyncSessionLocal
 from models.user import User
+from utils.cache import MemoryCache
 from utils.security import decode_token
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# trust the username/email/roles signed into the token instead of reading the user row
+AUTH_TRUST_CLAIMS = os.getenv("AUTH_TRUST_CLAIMS", "false").lower() in ("1", "true", "yes")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# per-process on purpose: this sits on every authenticated request, a network hop would
+# cost what it saves. Other workers see a user change within AUTH_CACHE_TTL.
+principal_cache = MemoryCache(max_entries=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    username: str
+    email: str | None = None
+    roles: tuple[str, ...] = ()
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate(f"user:{user_id}")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def _load_principal(user_id: int) -> Principal | None:
+    # own short-lived session: requests answered from the cache never check one out
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+    if not user:
+        return None
+    return Principal(id=user.id, username=user.username, email=user.email)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     try:
         payload = decode_token(token)
         user_id: int = int(payload.get("sub"))
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide ou expiré")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Utilisateur introuvable")
-    return user
+    if AUTH_TRUST_CLAIMS and payload.get("username"):
+        return Principal(
+            id=user_id, username=payload["username"], email=payload.get("email"), roles=tuple(payload.get("roles", ())),
+        )
+
+    key = str(user_id)
+    principal = principal_cache.get(key)
+    if principal is None:
+        principal = await _load_principal(user_id)
+        if not principal:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Utilisateur introuvable")
+        principal_cache.set(key, principal, tags=[f"user:{user_id}"])
+    return principal
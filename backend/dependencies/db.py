@@ -0,0 +1,19 @@
+from fastapi import Request
+
+from database import AsyncSessionLocal, async_engine, replicas
+from utils.replicas import reads_primary
+
+
+# 🔹 Crée une session DB pour chaque requête (partagée par tous les routers)
+# Lectures (GET) sur un réplica quand il y en a, écritures et read-your-writes sur le primaire
+async def get_db(request: Request):
+    bind = replicas.pick() if replicas and not reads_primary(request) else async_engine
+    request.state.read_replica = bind is not async_engine
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+
+# Lectures qui ne tolèrent pas le retard d'un réplica (file des tâches)
+async def get_primary_db():
+    async with AsyncSessionLocal() as db:
+        yield db
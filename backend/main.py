@@ -1,11 +1,24 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
-from models import artist, album, song, genre, user
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from database import engine, async_engine, pool_status, replicas
+from models import artist, album, song, genre, user, table_version, catalog_stats, idempotency_key, job
 from routers import artists, albums, songs, genres, users
-from routers import simple_auth
+from routers import auth, search, imports, export, jobs
+from services.snapshot import CATALOG_SNAPSHOT, snapshot
+from utils.compression import CompressionMiddleware
+from utils.conditional import seed_versions
+from utils.metrics import MetricsMiddleware, registry
+from utils.migrations import DB_AUTO_MIGRATE, upgrade_database
+from utils.replicas import ReadYourWritesMiddleware
+from utils.security import hashing_stats
 
-Base.metadata.create_all(bind=engine)
+if DB_AUTO_MIGRATE:
+    upgrade_database(engine)
+seed_versions(engine)
+if CATALOG_SNAPSHOT:
+    snapshot.start(engine)
 
 app = FastAPI(
     title="Spotilike API",
@@ -25,14 +38,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing", "Location"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(CompressionMiddleware)
+# after CORS so it wraps it: the timing covers the whole request
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(artists.router)
 app.include_router(albums.router)
 app.include_router(songs.router)
 app.include_router(genres.router)
+# before users.router: /api/users/login and /signup are aliases of /api/auth/*
+app.include_router(auth.alias_router)
 app.include_router(users.router)
-app.include_router(simple_auth.router)
+app.include_router(auth.router)
+app.include_router(search.router)
+app.include_router(imports.router)
+app.include_router(export.router)
+app.include_router(jobs.router)
 
 @app.get("/")
 def root():
@@ -42,3 +66,46 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/health/db")
+async def health_db():
+    # pool numbers are per process: multiply by the worker count to get MySQL connections
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        error = str(e)
+    else:
+        error = None
+    pools = {"async": pool_status(async_engine.pool), "sync": pool_status(engine.pool)}
+    # a replica that fails its ping stops taking reads; the primary answers them meanwhile
+    replica_report = await replicas.check()
+    if error:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": error, "pools": pools, "replicas": replica_report})
+    return {"status": "ok", "pools": pools, "replicas": replica_report}
+
+
+@app.get("/health/hashing")
+def health_hashing():
+    # password hashing pool: queue depth and waits tell a login storm apart from a slow DB
+    return hashing_stats.as_dict()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text format; pool and hashing numbers are per process like the histograms
+    gauges = {}
+    pools = {"async": pool_status(async_engine.pool), "sync": pool_status(engine.pool)}
+    pools.update((r.name, pool_status(r.engine.pool)) for r in replicas.replicas)
+    for key in ("checked_out", "idle", "overflow", "timeouts", "wait_seconds_total"):
+        for name, status in pools.items():
+            gauges[f'db_pool_{key}{{pool="{name}"}}'] = status[key]
+    for key, value in hashing_stats.as_dict().items():
+        if isinstance(value, (int, float)):
+            gauges[f"password_hashing_{key}"] = value
+    for r in replicas.replicas:
+        gauges[f'db_replica_healthy{{replica="{r.name}"}}'] = int(r.healthy)
+    if CATALOG_SNAPSHOT:
+        gauges.update(snapshot.gauges())
+    return PlainTextResponse(registry.render(gauges), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import Base, engine
+from models import artist, album, song, genre, user, table_version, catalog_stats, idempotency_key, job  # noqa: F401 (metadata)
+
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=engine.url.render_as_string(hide_password=False), target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection):
+    # SQLite changes a foreign key by rebuilding the table (batch mode): with the keys
+    # enforced (database.enforce_foreign_keys) dropping the old copy would cascade. The
+    # pragma is ignored inside a transaction, so end the one inspection may have opened;
+    # commit after it too, or alembic takes the connection's autobegun transaction for the
+    # caller's and leaves it uncommitted.
+    sqlite = connection.dialect.name == "sqlite"
+    if sqlite:
+        connection.commit()
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.commit()
+    try:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        if sqlite:
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+            connection.commit()
+
+
+def run_migrations_online():
+    # an open connection can be handed in by utils.migrations.upgrade_database()
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,75 @@
+"""baseline: catalog and users tables as first created by create_all
+
+Databases created before migrations existed are stamped at this revision by
+utils.migrations.upgrade_database() and then upgraded from here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "artists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("avatar", sa.String(255)),
+        sa.Column("bio", sa.Text()),
+    )
+    op.create_index("ix_artists_id", "artists", ["id"])
+    op.create_table(
+        "albums",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(100), nullable=False),
+        sa.Column("cover", sa.String(255)),
+        sa.Column("release_date", sa.Date()),
+        sa.Column("artist_id", sa.Integer(), sa.ForeignKey("artists.id"), nullable=False),
+    )
+    op.create_index("ix_albums_id", "albums", ["id"])
+    op.create_table(
+        "genres",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text()),
+    )
+    op.create_index("ix_genres_id", "genres", ["id"])
+    op.create_table(
+        "songs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(100), nullable=False),
+        sa.Column("duration", sa.Float()),
+        sa.Column("artist_id", sa.Integer(), sa.ForeignKey("artists.id")),
+        sa.Column("album_id", sa.Integer(), sa.ForeignKey("albums.id")),
+    )
+    op.create_index("ix_songs_id", "songs", ["id"])
+    op.create_table(
+        "song_genres",
+        sa.Column("song_id", sa.Integer(), sa.ForeignKey("songs.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("genre_id", sa.Integer(), sa.ForeignKey("genres.id", ondelete="CASCADE"), primary_key=True),
+    )
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(100), nullable=False, unique=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("password", sa.String(255), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+
+
+def downgrade():
+    op.drop_table("users")
+    op.drop_table("song_genres")
+    op.drop_table("songs")
+    op.drop_table("genres")
+    op.drop_table("albums")
+    op.drop_table("artists")
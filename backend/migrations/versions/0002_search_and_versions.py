@@ -0,0 +1,44 @@
+"""FULLTEXT search indexes and table_versions
+
+Both used to be created by create_all on fresh databases only (existing ones needed the
+manual CREATE FULLTEXT INDEX from the README), so each step is skipped when present.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SEARCH_INDEXES = (
+    ("ft_songs_title", "songs", "title"),
+    ("ft_albums_title", "albums", "title"),
+    ("ft_artists_name", "artists", "name"),
+)
+
+
+def upgrade():
+    # offline (--sql) there is nothing to inspect: emit everything
+    inspector = None if op.get_context().as_sql else sa.inspect(op.get_bind())
+    for name, table, column in SEARCH_INDEXES:
+        if not inspector or name not in {ix["name"] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column], mysql_prefix="FULLTEXT")
+    if not inspector or not inspector.has_table("table_versions"):
+        op.create_table(
+            "table_versions",
+            sa.Column("name", sa.String(50), primary_key=True),
+            sa.Column("version", sa.BigInteger(), nullable=False),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+
+
+def downgrade():
+    op.drop_table("table_versions")
+    for name, table, _ in SEARCH_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,39 @@
+"""secondary indexes for relation lookups, genre filters and sorted lists
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_songs_artist_id", "songs", ["artist_id", "id"]),
+    ("ix_songs_album_id", "songs", ["album_id", "id"]),
+    ("ix_songs_title", "songs", ["title", "id"]),
+    ("ix_albums_artist_id", "albums", ["artist_id", "id"]),
+    ("ix_albums_title", "albums", ["title", "id"]),
+    ("ix_artists_name", "artists", ["name", "id"]),
+    ("ix_song_genres_genre_id", "song_genres", ["genre_id", "song_id"]),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ("mysql", "mariadb"):
+        # InnoDB dropped its implicit foreign key indexes once ours covered them and will
+        # not drop an index a foreign key depends on: give those back a plain one first
+        for name, table, columns in INDEXES:
+            if columns[0].endswith("_id"):
+                op.create_index(f"{name}_fk", table, columns[:1])
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
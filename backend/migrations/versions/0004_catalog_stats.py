@@ -0,0 +1,47 @@
+"""catalog_stats: maintained song counts, durations and album counts
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "catalog_stats",
+        sa.Column("scope", sa.String(10), primary_key=True),
+        sa.Column("scope_id", sa.Integer(), primary_key=True),
+        sa.Column("song_count", sa.Integer(), nullable=False),
+        sa.Column("total_duration", sa.Float(), nullable=False),
+        sa.Column("album_count", sa.Integer(), nullable=False),
+    )
+    # backfill from the catalog as it stands; same numbers as scripts/rebuild_stats.py
+    op.execute(
+        "INSERT INTO catalog_stats (scope, scope_id, song_count, total_duration, album_count) "
+        "SELECT 'artist', a.id, COALESCE(s.n, 0), COALESCE(s.d, 0), COALESCE(al.n, 0) FROM artists a "
+        "LEFT JOIN (SELECT artist_id, COUNT(*) AS n, SUM(duration) AS d FROM songs GROUP BY artist_id) s ON s.artist_id = a.id "
+        "LEFT JOIN (SELECT artist_id, COUNT(*) AS n FROM albums GROUP BY artist_id) al ON al.artist_id = a.id"
+    )
+    op.execute(
+        "INSERT INTO catalog_stats (scope, scope_id, song_count, total_duration, album_count) "
+        "SELECT 'album', a.id, COALESCE(s.n, 0), COALESCE(s.d, 0), 0 FROM albums a "
+        "LEFT JOIN (SELECT album_id, COUNT(*) AS n, SUM(duration) AS d FROM songs GROUP BY album_id) s ON s.album_id = a.id"
+    )
+    op.execute(
+        "INSERT INTO catalog_stats (scope, scope_id, song_count, total_duration, album_count) "
+        "SELECT 'genre', g.id, COALESCE(s.n, 0), COALESCE(s.d, 0), 0 FROM genres g "
+        "LEFT JOIN (SELECT sg.genre_id, COUNT(*) AS n, SUM(songs.duration) AS d FROM song_genres sg "
+        "JOIN songs ON songs.id = sg.song_id GROUP BY sg.genre_id) s ON s.genre_id = g.id"
+    )
+
+
+def downgrade():
+    op.drop_table("catalog_stats")
@@ -0,0 +1,62 @@
+"""ON DELETE actions on the catalog foreign keys, deleted_at tombstones
+
+Deleting an artist or an album used to load every album and song below it so the ORM
+could delete them one by one. The foreign keys now cascade (albums -> artist, songs ->
+album) or let go (songs -> artist), and the routers issue one DELETE. SQLite rebuilds
+albums and songs to change their keys (batch mode, with foreign keys off: see env.py).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import itertools
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# table, column, referred table, ON DELETE, MySQL's name for the 0001 key
+FOREIGN_KEYS = (
+    ("albums", "artist_id", "artists", "CASCADE", "albums_ibfk_1"),
+    ("songs", "artist_id", "artists", "SET NULL", "songs_ibfk_1"),
+    ("songs", "album_id", "albums", "CASCADE", "songs_ibfk_2"),
+)
+# SQLite keys are unnamed: batch mode names them this way when it reflects the table
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s"}
+
+
+def _existing_name(inspector, table: str, column: str, default: str) -> str:
+    # offline (--sql) there is nothing to inspect: assume MySQL's generated names
+    if inspector is None:
+        return default
+    for fk in inspector.get_foreign_keys(table):
+        if fk["constrained_columns"] == [column]:
+            return fk["name"] or f"fk_{table}_{column}"
+    return default
+
+
+def _replace_foreign_keys(ondelete_of):
+    inspector = None if op.get_context().as_sql else sa.inspect(op.get_bind())
+    for table, keys in itertools.groupby(FOREIGN_KEYS, key=lambda k: k[0]):
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch:
+            for _, column, referred, ondelete, default in keys:
+                batch.drop_constraint(_existing_name(inspector, table, column, default), type_="foreignkey")
+                batch.create_foreign_key(f"fk_{table}_{column}", referred, [column], ["id"], ondelete=ondelete_of(ondelete))
+
+
+def upgrade():
+    for table in ("artists", "albums", "songs"):
+        op.add_column(table, sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    _replace_foreign_keys(lambda ondelete: ondelete)
+
+
+def downgrade():
+    _replace_foreign_keys(lambda ondelete: None)
+    for table in ("songs", "albums", "artists"):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("deleted_at")
@@ -1,15 +1,22 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Date, ForeignKey
 from sqlalchemy.orm import relationship
 from database import Base
+from .tombstone import Tombstoned
 
-class Album(Base):
+class Album(Tombstoned, Base):
     __tablename__ = "albums"
+    __table_args__ = (
+        # served by MATCH ... AGAINST in utils/search.py
+        Index("ft_albums_title", "title", mysql_prefix="FULLTEXT"),
+        Index("ix_albums_artist_id", "artist_id", "id"),
+        Index("ix_albums_title", "title", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
     cover = Column(String(255))
     release_date = Column(Date)
-    artist_id = Column(Integer, ForeignKey("artists.id"), nullable=False)
+    artist_id = Column(Integer, ForeignKey("artists.id", ondelete="CASCADE"), nullable=False)
 
     artist = relationship("Artist", back_populates="albums")
-    songs = relationship("Song", back_populates="album", cascade="all, delete")
+    songs = relationship("Song", back_populates="album", cascade="all, delete", passive_deletes=True)
@@ -1,13 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 from database import Base
+from .tombstone import Tombstoned
 
-class Artist(Base):
+class Artist(Tombstoned, Base):
     __tablename__ = "artists"
+    __table_args__ = (
+        # served by MATCH ... AGAINST in utils/search.py
+        Index("ft_artists_name", "name", mysql_prefix="FULLTEXT"),
+        Index("ix_artists_name", "name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     avatar = Column(String(255))
     bio = Column(Text)
 
-    albums = relationship("Album", back_populates="artist", cascade="all, delete")
+    # the database deletes the albums (ON DELETE CASCADE): nothing is loaded to delete them
+    albums = relationship("Album", back_populates="artist", cascade="all, delete", passive_deletes=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey
+from sqlalchemy import Table, Column, Index, Integer, ForeignKey
 from database import Base
 
 
@@ -7,4 +7,6 @@ song_genres = Table(
     Base.metadata,
     Column("song_id", Integer, ForeignKey("songs.id", ondelete="CASCADE"), primary_key=True),
     Column("genre_id", Integer, ForeignKey("genres.id", ondelete="CASCADE"), primary_key=True),
+    # the primary key covers song -> genres; this covers genre -> songs
+    Index("ix_song_genres_genre_id", "genre_id", "song_id"),
 )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Float, Integer, String
+from database import Base
+
+class CatalogStats(Base):
+    __tablename__ = "catalog_stats"
+
+    # one row per artist / album / genre, moved by the song and album writes in their own
+    # transaction (services/stats.py); scripts/rebuild_stats.py recomputes it from scratch
+    scope = Column(String(10), primary_key=True)  # "artist", "album" or "genre"
+    scope_id = Column(Integer, primary_key=True)
+    song_count = Column(Integer, nullable=False, default=0)
+    total_duration = Column(Float, nullable=False, default=0.0)
+    album_count = Column(Integer, nullable=False, default=0)  # artist rows only
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Idempotency-Key header of a write, stored in the write's own transaction with the
+    # response it produced; a retry with the same key gets that response back
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of route + payload
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
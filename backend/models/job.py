@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # the worker's claim: oldest queued job that is due
+        Index("ix_jobs_status_run_after", "status", "run_after", "id"),
+    )
+
+    # a long operation queued by the API and run by worker.py (services/jobs.py)
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)  # queued, running, succeeded, failed
+    payload = Column(Text, nullable=False)  # JSON arguments of the handler
+    result = Column(Text)  # JSON returned by the handler
+    error = Column(Text)  # last failure, kept when a retry succeeds
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer)
+    worker = Column(String(100))
+    created_at = Column(DateTime, nullable=False)
+    run_after = Column(DateTime, nullable=False)  # pushed back on each retry
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # moved by progress reports; a stale one means a lost worker
+    finished_at = Column(DateTime)
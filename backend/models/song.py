@@ -1,17 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Float, ForeignKey
 from sqlalchemy.orm import relationship
 from database import Base
 from .associations import song_genres
+from .tombstone import Tombstoned
 
-class Song(Base):
+class Song(Tombstoned, Base):
     __tablename__ = "songs"
+    __table_args__ = (
+        # served by MATCH ... AGAINST in utils/search.py
+        Index("ft_songs_title", "title", mysql_prefix="FULLTEXT"),
+        # (fk, id): relation pages filter on the fk and walk the id keyset
+        Index("ix_songs_artist_id", "artist_id", "id"),
+        Index("ix_songs_album_id", "album_id", "id"),
+        Index("ix_songs_title", "title", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
     duration = Column(Float)
-    artist_id = Column(Integer, ForeignKey("artists.id"))
-    album_id = Column(Integer, ForeignKey("albums.id"))
+    # an artist's songs on other artists' albums outlive it, uncredited
+    artist_id = Column(Integer, ForeignKey("artists.id", ondelete="SET NULL"))
+    album_id = Column(Integer, ForeignKey("albums.id", ondelete="CASCADE"))
 
     artist = relationship("Artist")
     album = relationship("Album", back_populates="songs")
-    genres = relationship("Genre", secondary=song_genres, backref="songs")
+    genres = relationship("Genre", secondary=song_genres, backref="songs", passive_deletes=True)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from database import Base
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    # one row per catalog table, bumped in the same transaction as every write to it
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime)
@@ -0,0 +1,37 @@
+"""Tombstones: artists, albums and songs removed now and deleted later.
+
+A delete that would take at least SOFT_DELETE_MIN_SONGS songs with it only stamps
+`deleted_at` on the rows (services/tombstones.py); scripts/purge_deleted.py deletes them
+afterwards in small batches. While the option is on, every ORM statement on those models
+gets `deleted_at IS NULL` added, joins and subqueries included, so tombstoned rows are
+gone for the API from the moment they are stamped. Statements built on the Core tables
+(`Song.__table__`, song_genres) are not filtered: those have to join Song themselves
+(services/catalog.py genre_facets).
+
+Off by default: the filter costs a column read on every catalog query. Purge the
+tombstones before turning it off again, or they come back.
+"""
+import os
+
+from sqlalchemy import Column, DateTime, event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+
+SOFT_DELETE_MIN_SONGS = int(os.getenv("SOFT_DELETE_MIN_SONGS", "0"))  # 0: every delete is immediate
+
+
+class Tombstoned:
+    deleted_at = Column(DateTime, nullable=True)
+
+
+def _hide_tombstones(state):
+    # the purge reads and deletes tombstoned rows: include_deleted=True
+    if state.execution_options.get("include_deleted") or state.is_column_load or state.is_relationship_load:
+        return
+    state.statement = state.statement.options(
+        with_loader_criteria(Tombstoned, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+    )
+
+
+if SOFT_DELETE_MIN_SONGS:
+    event.listen(Session, "do_orm_execute", _hide_tombstones)
@@ -1,38 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
 
-from database import SessionLocal
+from dependencies.db import get_db
 from models.album import Album
 from models.artist import Artist
-from schemas.album import AlbumCreate, AlbumResponse, AlbumWithArtistResponse
+from schemas.album import AlbumCreate, AlbumResponse, AlbumUpdate, AlbumWithArtistResponse
+from schemas.batch import BatchRequest, BatchResponse
 from models.song import Song
 from schemas.song import SongCreate, SongResponse
+from schemas.stats import AlbumStats
+from services.catalog import albums_with_artist
+from services.jobs import JOBS_ENABLED, accepted, enqueue_once
+from services.snapshot import snapshot
+from services.stats import StatsDelta, apply_stats, songs_delta, stats_of
+from services.tombstones import check_parents, remove_album
+from utils.batch import order_by_ids
+from utils.cache import cache_response, cached_response, invalidate
+from utils.conditional import bump_versions, not_modified
+from utils.fields import FIELDS_DESCRIPTION, columns, parse_fields, pick, sparse_response, with_fields
+from utils.pagination import paginate
+from utils.writes import commit_checked
 
 
 router = APIRouter(prefix="/api/albums", tags=["Albums"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _assert_artist_exists(db: AsyncSession, artist_id: int):
+    # run after the foreign key rejected the write (utils/writes.py), or before it while
+    # tombstones are on (services/tombstones.py check_parents)
+    if not await db.get(Artist, artist_id):
+        raise HTTPException(status_code=404, detail="Artiste associé introuvable")
 
 
-def _assert_artist_exists(db: Session, artist_id: int):
-    if not db.query(Artist).filter(Artist.id == artist_id).first():
-        raise HTTPException(status_code=404, detail="Artiste associé introuvable")
+async def _update_album(db: AsyncSession, album_id: int, values: dict) -> Album:
+    # the one read: the old artist_id moves album counts and picks the caches to evict
+    album = await db.get(Album, album_id)
+    if not album:
+        raise HTTPException(status_code=404, detail="Album introuvable")
+    old_artist_id = album.artist_id
+    if values.get("artist_id", old_artist_id) != old_artist_id:
+        await check_parents(lambda: _assert_artist_exists(db, values["artist_id"]))
+    for k, v in values.items():
+        setattr(album, k, v)
+    delta = StatsDelta()
+    if album.artist_id != old_artist_id:
+        delta.albums(old_artist_id, -1)
+        delta.albums(album.artist_id, 1)
+        await apply_stats(db, delta)
+    await bump_versions(db, "albums")
+    # a rollback expires `album`: check the value as written
+    artist_id = album.artist_id
+    await commit_checked(db, missing=lambda: _assert_artist_exists(db, artist_id))
+    invalidate(f"album:{album_id}", "albums", f"artist:{old_artist_id}:albums", f"artist:{album.artist_id}:albums", *delta.tags())
+    return album
 
 
 @router.get("/", response_model=List[AlbumWithArtistResponse])
-def list_albums(db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    albums = db.query(Album).offset(offset).limit(limit).all()
+async def list_albums(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor (replaces offset)"),
+    sort: Literal["id", "title"] = Query("id"),
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+):
+    selected = parse_fields(fields, AlbumWithArtistResponse)
+    if (not_mod := await not_modified(request, response, db, "albums", "artists")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    order_by = [Album.title, Album.id] if sort == "title" else [Album.id]
+    if selected:
+        return await _list_album_fields(db, request, response, selected, limit=limit, offset=offset, cursor=cursor, order_by=order_by, sort=sort)
+    albums = await paginate(
+        db, select(Album), response, limit=limit, offset=offset, cursor=cursor, order_by=order_by, sort=sort,
+        key=lambda al: [al.title, al.id] if sort == "title" else [al.id],
+    )
     results: list[AlbumWithArtistResponse] = []
     # Preload artists by ids to minimize queries
     artist_ids = {al.artist_id for al in albums}
-    artists_map = {a.id: a.name for a in db.query(Artist).filter(Artist.id.in_(artist_ids)).all()} if artist_ids else {}
+    artists_map = dict((await db.execute(select(Artist.id, Artist.name).where(Artist.id.in_(artist_ids)))).all()) if artist_ids else {}
     for al in albums:
         results.append(
             AlbumWithArtistResponse(
@@ -44,16 +95,59 @@ def list_albums(db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=2
                 artist_name=artists_map.get(al.artist_id),
             )
         )
-    return results
+    return cache_response(request, results, ["albums", *(f"artist:{a}" for a in artist_ids)], response)
+
+
+async def _list_album_fields(db, request, response, selected: list[str], **page):
+    with_artist = "artist_name" in selected
+    needed = with_fields(selected, *(["title"] if page["sort"] == "title" else []), *(["artist_id"] if with_artist else []))
+    stmt = select(*columns(Album, [n for n in needed if n != "artist_name"]))
+    if with_artist:
+        stmt = stmt.add_columns(Artist.name.label("artist_name")).outerjoin(Artist, Album.artist_id == Artist.id)
+    rows = await paginate(db, stmt, response, key=lambda al: [al.title, al.id] if page["sort"] == "title" else [al.id], **page)
+    tags = ["albums", *{f"artist:{r.artist_id}" for r in rows}] if with_artist else ["albums"]
+    return sparse_response(cache_response(request, pick(rows, selected), tags, response), response)
+
+
+@router.post("/batch", response_model=BatchResponse[AlbumWithArtistResponse])
+async def get_albums_batch(payload: BatchRequest, db: AsyncSession = Depends(get_db)):
+    rows = (await db.execute(albums_with_artist().where(Album.id.in_(payload.ids)))).all()
+    found, missing = order_by_ids(payload.ids, rows, key=lambda row: row[0].id)
+    items = [
+        AlbumWithArtistResponse(
+            id=al.id,
+            title=al.title,
+            cover=al.cover,
+            release_date=al.release_date,
+            artist_id=al.artist_id,
+            artist_name=artist_name,
+        )
+        for al, artist_name in found
+    ]
+    return BatchResponse[AlbumWithArtistResponse](items=items, missing=missing)
 
 
 @router.get("/{album_id}", response_model=AlbumWithArtistResponse)
-def get_album(album_id: int, db: Session = Depends(get_db)):
-    album = db.query(Album).filter(Album.id == album_id).first()
+async def get_album(album_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), fields: str | None = Query(None, description=FIELDS_DESCRIPTION)):
+    selected = parse_fields(fields, AlbumWithArtistResponse)
+    if (not_mod := await not_modified(request, response, db, "albums", "artists")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    if selected:
+        with_artist = "artist_name" in selected
+        needed = [n for n in with_fields(selected, *(["artist_id"] if with_artist else [])) if n != "artist_name"]
+        stmt = albums_with_artist(*columns(Album, needed)) if with_artist else select(*columns(Album, needed))
+        row = (await db.execute(stmt.where(Album.id == album_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Album introuvable")
+        tags = [f"album:{album_id}", *([f"artist:{row.artist_id}"] if with_artist else [])]
+        return sparse_response(cache_response(request, pick([row], selected)[0], tags), response)
+    album = await db.get(Album, album_id)
     if not album:
         raise HTTPException(status_code=404, detail="Album introuvable")
-    artist = db.query(Artist).filter(Artist.id == album.artist_id).first()
-    return AlbumWithArtistResponse(
+    artist = await db.get(Artist, album.artist_id)
+    result = AlbumWithArtistResponse(
         id=album.id,
         title=album.title,
         cover=album.cover,
@@ -61,60 +155,109 @@ def get_album(album_id: int, db: Session = Depends(get_db)):
         artist_id=album.artist_id,
         artist_name=artist.name if artist else None,
     )
+    return cache_response(request, result, [f"album:{album_id}", f"artist:{album.artist_id}"])
 
 
 @router.post("/", response_model=AlbumResponse, status_code=status.HTTP_201_CREATED)
-def create_album(payload: AlbumCreate, db: Session = Depends(get_db)):
-    _assert_artist_exists(db, payload.artist_id)
-    album = Album(**payload.dict())
+async def create_album(payload: AlbumCreate, db: AsyncSession = Depends(get_db)):
+    await check_parents(lambda: _assert_artist_exists(db, payload.artist_id))
+    album = Album(**payload.model_dump())
     db.add(album)
-    db.commit()
-    db.refresh(album)
+    delta = StatsDelta()
+    delta.albums(album.artist_id, 1)
+    await apply_stats(db, delta)
+    await bump_versions(db, "albums")
+    await commit_checked(db, missing=lambda: _assert_artist_exists(db, payload.artist_id))
+    invalidate("albums", f"artist:{album.artist_id}:albums", *delta.tags())
     return album
 
 
 @router.put("/{album_id}", response_model=AlbumResponse)
-def update_album(album_id: int, payload: AlbumCreate, db: Session = Depends(get_db)):
-    album = db.query(Album).filter(Album.id == album_id).first()
-    if not album:
-        raise HTTPException(status_code=404, detail="Album introuvable")
-    _assert_artist_exists(db, payload.artist_id)
-    for k, v in payload.dict().items():
-        setattr(album, k, v)
-    db.commit()
-    db.refresh(album)
-    return album
+async def update_album(album_id: int, payload: AlbumCreate, db: AsyncSession = Depends(get_db)):
+    return await _update_album(db, album_id, payload.model_dump())
+
 
+@router.patch("/{album_id}", response_model=AlbumResponse)
+async def patch_album(album_id: int, payload: AlbumUpdate, db: AsyncSession = Depends(get_db)):
+    return await _update_album(db, album_id, payload.values())
 
-@router.delete("/{album_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_album(album_id: int, db: Session = Depends(get_db)):
-    album = db.query(Album).filter(Album.id == album_id).first()
+
+@router.delete("/{album_id}", status_code=status.HTTP_204_NO_CONTENT, responses={202: {"description": "Tombstoned, purge queued"}})
+async def delete_album(album_id: int, db: AsyncSession = Depends(get_db)):
+    album = await db.get(Album, album_id)
     if not album:
         raise HTTPException(status_code=404, detail="Album introuvable")
-    db.delete(album)
-    db.commit()
+    songs = (await db.execute(select(Song.id, Song.artist_id).where(Song.album_id == album_id))).all()
+    # read before the cascade removes the songs
+    delta = await songs_delta(db, Song.album_id == album_id)
+    delta.albums(album.artist_id, -1)
+    delta.drop("album", album_id)
+    buried = await remove_album(db, album_id, [s.id for s in songs])
+    # tombstoned: gone from the API now, the rows go with the queued purge (or purge_deleted.py)
+    job = await enqueue_once(db, "purge_deleted", {}) if buried and JOBS_ENABLED else None
+    await apply_stats(db, delta)
+    await bump_versions(db, "albums", "songs", "song_genres")
+    await db.commit()
+    invalidate(
+        f"album:{album_id}", f"album:{album_id}:songs", "albums", "songs", f"artist:{album.artist_id}:albums",
+        *{f"artist:{s.artist_id}:songs" for s in songs if s.artist_id}, *(f"song:{s.id}" for s in songs),
+        *(f"song:{s.id}:genres" for s in songs), *delta.tags(),
+    )
+    if job:
+        return accepted(job)
     return
 
 
+async def _assert_song_parents(db: AsyncSession, album_id: int, artist_id: int | None):
+    if not await db.get(Album, album_id):
+        raise HTTPException(status_code=404, detail="Album introuvable")
+    if artist_id is not None:
+        await _assert_artist_exists(db, artist_id)
+
+
 # Relations: songs of an album
 @router.get("/{album_id}/songs", response_model=List[SongResponse])
-def list_songs_of_album(album_id: int, db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    album = db.query(Album).filter(Album.id == album_id).first()
-    if not album:
-        raise HTTPException(status_code=404, detail="Album introuvable")
-    return db.query(Song).filter(Song.album_id == album_id).offset(offset).limit(limit).all()
+async def list_songs_of_album(album_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0), cursor: str | None = Query(None)):
+    if (not_mod := await not_modified(request, response, db, "albums", "songs")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return hit
+    songs = snapshot.songs_of(request, response, "album", album_id, "Album introuvable", limit=limit, offset=offset, cursor=cursor)
+    if songs is None:
+        album = await db.get(Album, album_id)
+        if not album:
+            raise HTTPException(status_code=404, detail="Album introuvable")
+        q = select(Song).where(Song.album_id == album_id)
+        songs = await paginate(db, q, response, limit=limit, offset=offset, cursor=cursor, order_by=[Song.id], sort="id", key=lambda s: [s.id])
+    return cache_response(request, [SongResponse.model_validate(s) for s in songs], [f"album:{album_id}:songs"], response)
 
 
 @router.post("/{album_id}/songs", response_model=SongResponse, status_code=status.HTTP_201_CREATED)
-def create_song_in_album(album_id: int, payload: SongCreate, db: Session = Depends(get_db)):
-    album = db.query(Album).filter(Album.id == album_id).first()
-    if not album:
-        raise HTTPException(status_code=404, detail="Album introuvable")
+async def create_song_in_album(album_id: int, payload: SongCreate, db: AsyncSession = Depends(get_db)):
+    await check_parents(lambda: _assert_song_parents(db, album_id, payload.artist_id))
     # enforce album_id
-    data = payload.dict()
+    data = payload.model_dump()
     data["album_id"] = album_id
     song = Song(**data)
     db.add(song)
-    db.commit()
-    db.refresh(song)
+    delta = StatsDelta()
+    delta.song(song.artist_id, album_id, song.duration)
+    await apply_stats(db, delta)
+    await bump_versions(db, "songs")
+    await commit_checked(db, missing=lambda: _assert_song_parents(db, album_id, payload.artist_id))
+    invalidate("songs", f"album:{album_id}:songs", f"artist:{song.artist_id}:songs", *delta.tags())
     return song
+
+
+@router.get("/{album_id}/stats", response_model=AlbumStats)
+async def get_album_stats(album_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    # maintained counters (services/stats.py): one row read, however many songs
+    if (not_mod := await not_modified(request, response, db, "albums", "songs")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return hit
+    row = (await db.execute(stats_of("album", Album, album_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Album introuvable")
+    result = AlbumStats(album_id=row.id, song_count=row.song_count, total_duration=round(row.total_duration, 3))
+    return cache_response(request, result, [f"album:{album_id}:stats"])
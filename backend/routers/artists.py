@@ -1,106 +1,202 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dependencies.db import get_db
 from models.artist import Artist
 from models.album import Album
 from models.song import Song
-from schemas.artist import ArtistCreate, ArtistResponse
+from schemas.artist import ArtistCreate, ArtistResponse, ArtistUpdate
+from schemas.batch import BatchRequest, BatchResponse
 from schemas.album import AlbumResponse
 from schemas.song import SongResponse, SongWithAlbumResponse
-from typing import List
+from schemas.stats import ArtistStats
+from services.catalog import SONG_COLUMNS
+from services.jobs import JOBS_ENABLED, accepted, enqueue_once
+from services.snapshot import snapshot
+from services.stats import apply_stats, songs_delta, stats_of
+from services.tombstones import artist_songs, remove_artist
+from utils.batch import order_by_ids
+from utils.cache import cache_response, cached_response, invalidate
+from utils.conditional import bump_versions, not_modified
+from utils.fields import FIELDS_DESCRIPTION, columns, parse_fields, pick, sparse_response, with_fields
+from utils.pagination import paginate
+from utils.writes import patch_row, update_row
+from typing import List, Literal
 
 router = APIRouter(prefix="/api/artists", tags=["Artists"])
 
-# 🔹 Crée une session DB pour chaque requête
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # 🟢 GET - Liste de tous les artistes
 @router.get("/", response_model=List[ArtistResponse])
-def get_all_artists(db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    return db.query(Artist).offset(offset).limit(limit).all()
+async def get_all_artists(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor (replaces offset)"),
+    sort: Literal["id", "name"] = Query("id"),
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+):
+    selected = parse_fields(fields, ArtistResponse)
+    if (not_mod := await not_modified(request, response, db, "artists")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    order_by = [Artist.name, Artist.id] if sort == "name" else [Artist.id]
+    stmt = select(Artist) if selected is None else select(*columns(Artist, with_fields(selected, *(["name"] if sort == "name" else []))))
+    artists = await paginate(
+        db, stmt, response, limit=limit, offset=offset, cursor=cursor, order_by=order_by, sort=sort,
+        key=lambda a: [a.name, a.id] if sort == "name" else [a.id],
+    )
+    if selected:
+        return sparse_response(cache_response(request, pick(artists, selected), ["artists"], response), response)
+    return cache_response(request, [ArtistResponse.model_validate(a) for a in artists], ["artists"], response)
+
+# 🟢 POST - Plusieurs artistes par IDs (une seule requête IN)
+@router.post("/batch", response_model=BatchResponse[ArtistResponse])
+async def get_artists_batch(payload: BatchRequest, db: AsyncSession = Depends(get_db)):
+    artists = (await db.scalars(select(Artist).where(Artist.id.in_(payload.ids)))).all()
+    items, missing = order_by_ids(payload.ids, artists)
+    return BatchResponse[ArtistResponse](items=[ArtistResponse.model_validate(a) for a in items], missing=missing)
 
 # 🟢 GET - Détails d’un artiste par ID
 @router.get("/{artist_id}", response_model=ArtistResponse)
-def get_artist(artist_id: int, db: Session = Depends(get_db)):
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
+async def get_artist(artist_id: int, request: Request,  response: Response,db: AsyncSession = Depends(get_db), fields: str | None = Query(None, description=FIELDS_DESCRIPTION)):
+    selected = parse_fields(fields, ArtistResponse)
+    if (not_mod := await not_modified(request, response, db, "artists")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    if selected:
+        row = (await db.execute(select(*columns(Artist, selected)).where(Artist.id == artist_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Artiste non trouvé")
+        return sparse_response(cache_response(request, row._asdict(), [f"artist:{artist_id}"]), response)
+    artist = await db.get(Artist, artist_id)
     if not artist:
         raise HTTPException(status_code=404, detail="Artiste non trouvé")
-    return artist
+    return cache_response(request, ArtistResponse.model_validate(artist), [f"artist:{artist_id}"])
 
 # 🟠 POST - Ajout d’un artiste
 @router.post("/", response_model=ArtistResponse, status_code=status.HTTP_201_CREATED)
-def create_artist(artist: ArtistCreate, db: Session = Depends(get_db)):
-    new_artist = Artist(**artist.dict())
+async def create_artist(artist: ArtistCreate, db: AsyncSession = Depends(get_db)):
+    new_artist = Artist(**artist.model_dump())
     db.add(new_artist)
-    db.commit()
-    db.refresh(new_artist)
+    await bump_versions(db, "artists")
+    await db.commit()
+    invalidate("artists")
     return new_artist
 
 # 🔵 PUT - Modification d’un artiste
 @router.put("/{artist_id}", response_model=ArtistResponse)
-def update_artist(artist_id: int, updated_artist: ArtistCreate, db: Session = Depends(get_db)):
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
+async def update_artist(artist_id: int, updated_artist: ArtistCreate, db: AsyncSession = Depends(get_db)):
+    # the body is the whole row: one UPDATE, no read before or after
+    values = updated_artist.model_dump()
+    if not await update_row(db, Artist, artist_id, values):
+        raise HTTPException(status_code=404, detail="Artiste non trouvé")
+    await bump_versions(db, "artists")
+    await db.commit()
+    # evicts every view showing this artist's name (album lists, songs with names...)
+    invalidate(f"artist:{artist_id}", "artists")
+    return {"id": artist_id, **values}
+
+# 🟣 PATCH - Modification partielle d’un artiste
+@router.patch("/{artist_id}", response_model=ArtistResponse)
+async def patch_artist(artist_id: int, payload: ArtistUpdate, db: AsyncSession = Depends(get_db)):
+    artist = await patch_row(db, Artist, artist_id, payload.values())
     if not artist:
         raise HTTPException(status_code=404, detail="Artiste non trouvé")
-
-    for key, value in updated_artist.dict().items():
-        setattr(artist, key, value)
-
-    db.commit()
-    db.refresh(artist)
+    await bump_versions(db, "artists")
+    await db.commit()
+    invalidate(f"artist:{artist_id}", "artists")
     return artist
 
 # 🔴 DELETE - Suppression d’un artiste
-@router.delete("/{artist_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_artist(artist_id: int, db: Session = Depends(get_db)):
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
+@router.delete("/{artist_id}", status_code=status.HTTP_204_NO_CONTENT, responses={202: {"description": "Tombstoned, purge queued"}})
+async def delete_artist(artist_id: int, db: AsyncSession = Depends(get_db)):
+    artist = await db.get(Artist, artist_id)
     if not artist:
         raise HTTPException(status_code=404, detail="Artiste non trouvé")
 
-    db.delete(artist)
-    db.commit()
+    # ids only, for the cache tags: the rows themselves are deleted by the database
+    album_ids = (await db.scalars(select(Album.id).where(Album.artist_id == artist_id))).all()
+    removed = artist_songs(artist_id, album_ids)
+    songs = (await db.execute(select(Song.id, removed).where(removed | (Song.artist_id == artist_id)))).all()
+    song_ids = [s for s, gone in songs if gone]
+    credited = [s for s, gone in songs if not gone]  # on other artists' albums: kept, uncredited
+    # songs of the cascaded albums may be credited to other artists: take them off too
+    delta = await songs_delta(db, removed)
+    delta.drop("artist", artist_id)
+    delta.drop("album", *album_ids)
+    buried = await remove_artist(db, artist_id, album_ids, song_ids, credited)
+    # tombstoned: gone from the API now, the rows go with the queued purge (or purge_deleted.py)
+    job = await enqueue_once(db, "purge_deleted", {}) if buried and JOBS_ENABLED else None
+    await apply_stats(db, delta)
+    await bump_versions(db, "artists", "albums", "songs", "song_genres")
+    await db.commit()
+    invalidate(
+        f"artist:{artist_id}", f"artist:{artist_id}:albums", f"artist:{artist_id}:songs", "artists", "albums", "songs",
+        *(f"album:{a}" for a in album_ids), *(f"album:{a}:songs" for a in album_ids), *(f"song:{s}" for s in (*song_ids, *credited)),
+        *(f"song:{s}:genres" for s in song_ids), *delta.tags(),
+    )
+    if job:
+        return accepted(job)
     return
 
 
 # Relations helpers
 @router.get("/{artist_id}/albums", response_model=List[AlbumResponse])
-def list_albums_for_artist(artist_id: int, db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
-    if not artist:
-        raise HTTPException(status_code=404, detail="Artiste non trouvé")
-    return db.query(Album).filter(Album.artist_id == artist_id).offset(offset).limit(limit).all()
+async def list_albums_for_artist(artist_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0), cursor: str | None = Query(None)):
+    if (not_mod := await not_modified(request, response, db, "artists", "albums")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return hit
+    albums = snapshot.albums_of_artist(request, response, artist_id, "Artiste non trouvé", limit=limit, offset=offset, cursor=cursor)
+    if albums is None:
+        artist = await db.get(Artist, artist_id)
+        if not artist:
+            raise HTTPException(status_code=404, detail="Artiste non trouvé")
+        stmt = select(Album).where(Album.artist_id == artist_id)
+        albums = await paginate(db, stmt, response, limit=limit, offset=offset, cursor=cursor, order_by=[Album.id], sort="id", key=lambda al: [al.id])
+    return cache_response(request, [AlbumResponse.model_validate(al) for al in albums], [f"artist:{artist_id}:albums"], response)
 
 
 @router.get("/{artist_id}/songs", response_model=List[SongWithAlbumResponse])
-def list_songs_for_artist(artist_id: int, db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
-    if not artist:
+async def list_songs_for_artist(artist_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0), cursor: str | None = Query(None)):
+    if (not_mod := await not_modified(request, response, db, "artists", "albums", "songs")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return hit
+    # plain dicts, validated once against SongWithAlbumResponse by the response_model
+    results = snapshot.songs_of(request, response, "artist", artist_id, "Artiste non trouvé", limit=limit, offset=offset, cursor=cursor)
+    if results is None:
+        artist = await db.get(Artist, artist_id)
+        if not artist:
+            raise HTTPException(status_code=404, detail="Artiste non trouvé")
+
+        # Join albums to get album titles alongside songs
+        q = (
+            select(*SONG_COLUMNS, Album.title.label("album_title"))
+            .outerjoin(Album, Song.album_id == Album.id)
+            .where(Song.artist_id == artist_id)
+        )
+        rows = await paginate(db, q, response, limit=limit, offset=offset, cursor=cursor, order_by=[Song.id], sort="id", key=lambda row: [row.id])
+        results = [row._asdict() for row in rows]
+    tags = [f"artist:{artist_id}:songs", *{f"album:{r['album_id']}" for r in results if r["album_id"]}]
+    return cache_response(request, results, tags, response)
+
+
+@router.get("/{artist_id}/stats", response_model=ArtistStats)
+async def get_artist_stats(artist_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    # maintained counters (services/stats.py): one row read, however many songs
+    if (not_mod := await not_modified(request, response, db, "artists", "albums", "songs")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return hit
+    row = (await db.execute(stats_of("artist", Artist, artist_id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Artiste non trouvé")
-
-    # Join albums to get album titles alongside songs
-    q = (
-        db.query(Song, Album.title.label("album_title"))
-        .outerjoin(Album, Song.album_id == Album.id)
-        .filter(Song.artist_id == artist_id)
-        .offset(offset)
-        .limit(limit)
+    result = ArtistStats(
+        artist_id=row.id, song_count=row.song_count, album_count=row.album_count, total_duration=round(row.total_duration, 3),
     )
-
-    results = []
-    for song, album_title in q.all():
-        results.append(
-            SongWithAlbumResponse(
-                id=song.id,
-                title=song.title,
-                duration=song.duration,
-                artist_id=song.artist_id,
-                album_id=song.album_id,
-                album_title=album_title,
-            )
-        )
-    return results
+    return cache_response(request, result, [f"artist:{artist_id}:stats"])
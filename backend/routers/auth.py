@@ -1,55 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import SessionLocal
+from dependencies.auth import Principal, get_current_user
+from dependencies.db import get_db
 from models.user import User
-from schemas.auth import SignupRequest, TokenResponse
-from utils.security import hash_password, verify_password, create_access_token
+from schemas.auth import LoginRequest, LoginResponse, PrincipalResponse, SignupRequest, TokenResponse
+from utils.security import hash_password_async, verify_and_update_password_async, create_access_token, user_claims
+from utils.writes import commit_checked
 
 
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
 alias_router = APIRouter(prefix="/api/users", tags=["Auth"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def signup(payload: SignupRequest, db: Session = Depends(get_db)):
-    if db.query(User).filter((User.username == payload.username) | (User.email == payload.email)).first():
-        raise HTTPException(status_code=400, detail="Nom d'utilisateur ou email déjà utilisé")
-
-    user = User(username=payload.username, email=payload.email, password=hash_password(payload.password))
+async def signup(payload: SignupRequest, db: AsyncSession = Depends(get_db)):
+    user = User(username=payload.username, email=payload.email, password=await hash_password_async(payload.password))
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await commit_checked(db, duplicate="Nom d'utilisateur ou email déjà utilisé")
 
-    token = create_access_token({"sub": str(user.id)})
+    token = create_access_token(user_claims(user))
     return TokenResponse(access_token=token)
 
 
-@router.post("/login", response_model=TokenResponse)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form.username).first()
-    if not user or not verify_password(form.password, user.password):
-        raise HTTPException(status_code=400, detail="Identifiants invalides")
+async def credentials(request: Request) -> LoginRequest:
+    """username / password from a JSON body (the web app) or an OAuth2 form (docs, curl -d)."""
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+    else:
+        data = dict(await request.form())
+    if not isinstance(data, dict) or not data.get("username") or not data.get("password"):
+        raise HTTPException(status_code=400, detail="username et password requis")
+    return LoginRequest(username=str(data["username"]), password=str(data["password"]))
 
-    token = create_access_token({"sub": str(user.id)})
-    return TokenResponse(access_token=token)
+
+@router.post("/login", response_model=LoginResponse)
+async def login(form: LoginRequest = Depends(credentials), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.username == form.username))
+    valid, new_hash = await verify_and_update_password_async(form.password, user.password) if user else (False, None)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Identifiants invalides")
+    if new_hash:
+        # stored hash predates the current scheme or cost (or is a clear password): upgrade it
+        user.password = new_hash
+        await db.commit()
+
+    token = create_access_token(user_claims(user))
+    return LoginResponse(access_token=token, user=user)
+
+
+@router.get("/me", response_model=PrincipalResponse)
+async def me(current: Principal = Depends(get_current_user)):
+    return {"id": current.id, "username": current.username, "email": current.email, "roles": list(current.roles)}
 
 
 # Aliases to match requested spec (/api/users/*)
 @alias_router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def signup_alias(payload: SignupRequest, db: Session = Depends(get_db)):
-    return signup(payload, db)
+async def signup_alias(payload: SignupRequest, db: AsyncSession = Depends(get_db)):
+    return await signup(payload, db)
 
 
-@alias_router.post("/login", response_model=TokenResponse)
-def login_alias(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    return login(form, db)
+@alias_router.post("/login", response_model=LoginResponse)
+async def login_alias(form: LoginRequest = Depends(credentials), db: AsyncSession = Depends(get_db)):
+    return await login(form, db)
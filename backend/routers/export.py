@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import Literal
+
+from database import AsyncSessionLocal, replicas
+from models.album import Album
+from models.artist import Artist
+from models.song import Song
+from services.catalog import SONG_COLUMNS, albums_with_artist, songs_with_names
+from sqlalchemy import select
+
+
+router = APIRouter(prefix="/api/export", tags=["Export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _ndjson(fields: list[str], rows) -> str:
+    return "".join(json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=str) + "\n" for row in rows)
+
+
+def _csv(rows) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+async def _stream(stmt, fmt: str, batch_size: int):
+    """Yield the rows of stmt as NDJSON or CSV, one chunk per fetched batch.
+
+    The query runs on a server-side cursor (stream_results + yield_per), so only one
+    batch of rows is held at a time whatever the size of the catalog. The session is
+    opened here rather than through get_db: it has to live as long as the response body.
+    Exports are the longest reads there are, so they go to a replica when one is configured.
+    """
+    fields = [c["name"] for c in stmt.column_descriptions]
+    if fmt == "csv":
+        yield _csv([fields])
+    async with AsyncSessionLocal(bind=replicas.pick()) as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield _csv(rows) if fmt == "csv" else _ndjson(fields, rows)
+
+
+def _export(name: str, stmt, fmt: str, batch_size: int) -> StreamingResponse:
+    return StreamingResponse(
+        _stream(stmt, fmt, batch_size),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/songs")
+async def export_songs(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    batch_size: int = Query(2000, ge=100, le=50000),
+):
+    stmt = songs_with_names(*SONG_COLUMNS).order_by(Song.id)
+    return _export("songs", stmt, format, batch_size)
+
+
+@router.get("/artists")
+async def export_artists(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    batch_size: int = Query(2000, ge=100, le=50000),
+):
+    stmt = select(Artist.id, Artist.name, Artist.avatar, Artist.bio).order_by(Artist.id)
+    return _export("artists", stmt, format, batch_size)
+
+
+@router.get("/albums")
+async def export_albums(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    batch_size: int = Query(2000, ge=100, le=50000),
+):
+    stmt = albums_with_artist(Album.id, Album.title, Album.cover, Album.release_date, Album.artist_id).order_by(Album.id)
+    return _export("albums", stmt, format, batch_size)
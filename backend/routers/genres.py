@@ -1,62 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
 
-from database import SessionLocal
+from dependencies.db import get_db
 from models.genre import Genre
-from schemas.genre import GenreCreate, GenreResponse
+from schemas.batch import BatchRequest, BatchResponse
+from schemas.genre import GenreCreate, GenreResponse, GenreUpdate
+from schemas.stats import GenreStats
+from services.stats import StatsDelta, apply_stats, stats_of
+from utils.batch import order_by_ids
+from utils.cache import cache_response, cached_response, invalidate
+from utils.conditional import bump_versions, not_modified
+from utils.fields import FIELDS_DESCRIPTION, columns, parse_fields, pick, sparse_response, with_fields
+from utils.pagination import paginate
+from utils.writes import patch_row, update_row
 
 
 router = APIRouter(prefix="/api/genres", tags=["Genres"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.get("/", response_model=List[GenreResponse])
+async def list_genres(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor (replaces offset)"),
+    sort: Literal["id", "title"] = Query("id"),
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+):
+    selected = parse_fields(fields, GenreResponse)
+    if (not_mod := await not_modified(request, response, db, "genres")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    order_by = [Genre.title, Genre.id] if sort == "title" else [Genre.id]
+    stmt = select(Genre) if selected is None else select(*columns(Genre, with_fields(selected, *(["title"] if sort == "title" else []))))
+    genres = await paginate(
+        db, stmt, response, limit=limit, offset=offset, cursor=cursor, order_by=order_by, sort=sort,
+        key=lambda g: [g.title, g.id] if sort == "title" else [g.id],
+    )
+    if selected:
+        return sparse_response(cache_response(request, pick(genres, selected), ["genres"], response), response)
+    return cache_response(request, [GenreResponse.model_validate(g) for g in genres], ["genres"], response)
 
 
-@router.get("/", response_model=List[GenreResponse])
-def list_genres(db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    return db.query(Genre).offset(offset).limit(limit).all()
+@router.get("/stats", response_model=List[GenreStats])
+async def list_genre_stats(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """Song count and total duration of every genre, from the maintained counters."""
+    if (not_mod := await not_modified(request, response, db, "genres", "songs", "song_genres")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return hit
+    rows = (await db.execute(stats_of("genre", Genre).order_by(Genre.id))).all()
+    results = [GenreStats(genre_id=r.id, song_count=r.song_count, total_duration=round(r.total_duration, 3)) for r in rows]
+    return cache_response(request, results, ["genres", "genre_stats"])
+
+
+@router.post("/batch", response_model=BatchResponse[GenreResponse])
+async def get_genres_batch(payload: BatchRequest, db: AsyncSession = Depends(get_db)):
+    genres = (await db.scalars(select(Genre).where(Genre.id.in_(payload.ids)))).all()
+    items, missing = order_by_ids(payload.ids, genres)
+    return BatchResponse[GenreResponse](items=[GenreResponse.model_validate(g) for g in items], missing=missing)
 
 
 @router.get("/{genre_id}", response_model=GenreResponse)
-def get_genre(genre_id: int, db: Session = Depends(get_db)):
-    genre = db.query(Genre).filter(Genre.id == genre_id).first()
+async def get_genre(genre_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), fields: str | None = Query(None, description=FIELDS_DESCRIPTION)):
+    selected = parse_fields(fields, GenreResponse)
+    if (not_mod := await not_modified(request, response, db, "genres")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    if selected:
+        row = (await db.execute(select(*columns(Genre, selected)).where(Genre.id == genre_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Genre introuvable")
+        return sparse_response(cache_response(request, row._asdict(), [f"genre:{genre_id}"]), response)
+    genre = await db.get(Genre, genre_id)
     if not genre:
         raise HTTPException(status_code=404, detail="Genre introuvable")
-    return genre
+    return cache_response(request, GenreResponse.model_validate(genre), [f"genre:{genre_id}"])
 
 
 @router.post("/", response_model=GenreResponse, status_code=status.HTTP_201_CREATED)
-def create_genre(payload: GenreCreate, db: Session = Depends(get_db)):
-    genre = Genre(**payload.dict())
+async def create_genre(payload: GenreCreate, db: AsyncSession = Depends(get_db)):
+    genre = Genre(**payload.model_dump())
     db.add(genre)
-    db.commit()
-    db.refresh(genre)
+    await bump_versions(db, "genres")
+    await db.commit()
+    invalidate("genres")
     return genre
 
 
 @router.put("/{genre_id}", response_model=GenreResponse)
-def update_genre(genre_id: int, payload: GenreCreate, db: Session = Depends(get_db)):
-    genre = db.query(Genre).filter(Genre.id == genre_id).first()
+async def update_genre(genre_id: int, payload: GenreCreate, db: AsyncSession = Depends(get_db)):
+    values = payload.model_dump()
+    if not await update_row(db, Genre, genre_id, values):
+        raise HTTPException(status_code=404, detail="Genre introuvable")
+    await bump_versions(db, "genres")
+    await db.commit()
+    invalidate(f"genre:{genre_id}", "genres")
+    return {"id": genre_id, **values}
+
+
+@router.patch("/{genre_id}", response_model=GenreResponse)
+async def patch_genre(genre_id: int, payload: GenreUpdate, db: AsyncSession = Depends(get_db)):
+    genre = await patch_row(db, Genre, genre_id, payload.values())
     if not genre:
         raise HTTPException(status_code=404, detail="Genre introuvable")
-    for k, v in payload.dict().items():
-        setattr(genre, k, v)
-    db.commit()
-    db.refresh(genre)
+    await bump_versions(db, "genres")
+    await db.commit()
+    invalidate(f"genre:{genre_id}", "genres")
     return genre
 
 
 @router.delete("/{genre_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_genre(genre_id: int, db: Session = Depends(get_db)):
-    genre = db.query(Genre).filter(Genre.id == genre_id).first()
+async def delete_genre(genre_id: int, db: AsyncSession = Depends(get_db)):
+    genre = await db.get(Genre, genre_id)
     if not genre:
         raise HTTPException(status_code=404, detail="Genre introuvable")
-    db.delete(genre)
-    db.commit()
+    delta = StatsDelta()
+    delta.drop("genre", genre_id)
+    await db.delete(genre)
+    await apply_stats(db, delta)
+    await bump_versions(db, "genres", "song_genres")
+    await db.commit()
+    invalidate(f"genre:{genre_id}", f"genre:{genre_id}:songs", "genres", *delta.tags())
     return
+
+
+@router.get("/{genre_id}/stats", response_model=GenreStats)
+async def get_genre_stats(genre_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    if (not_mod := await not_modified(request, response, db, "genres", "songs", "song_genres")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return hit
+    row = (await db.execute(stats_of("genre", Genre, genre_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Genre introuvable")
+    result = GenreStats(genre_id=row.id, song_count=row.song_count, total_duration=round(row.total_duration, 3))
+    return cache_response(request, result, [f"genre:{genre_id}:stats"])
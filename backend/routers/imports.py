@@ -0,0 +1,44 @@
+import codecs
+from fastapi import APIRouter, Query, Request
+from starlette.concurrency import run_in_threadpool
+from typing import Literal
+
+from database import SessionLocal
+from schemas.imports import ImportReport
+from services.catalog_import import SongImporter
+
+
+router = APIRouter(prefix="/api/import", tags=["Import"])
+
+
+@router.post("/songs", response_model=ImportReport)
+async def import_songs(
+    request: Request,
+    format: Literal["ndjson", "csv"] | None = Query(None, description="Defaults from Content-Type (text/csv or NDJSON)"),
+    chunk_size: int = Query(5000, ge=100, le=50000),
+):
+    """Stream an NDJSON or CSV body of songs into the catalog.
+
+    The body is read incrementally and handed to the sync importer chunk by chunk in the
+    threadpool, so memory stays bounded and the event loop is never blocked by parsing.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    db = SessionLocal()
+    try:
+        importer = await run_in_threadpool(SongImporter, db, fmt, chunk_size)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        batch: list[str] = []
+        async for chunk in request.stream():
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            batch.extend(lines)
+            if len(batch) >= chunk_size:
+                await run_in_threadpool(importer.feed_lines, batch)
+                batch = []
+        pending += decoder.decode(b"", final=True)
+        batch.append(pending)
+        await run_in_threadpool(importer.feed_lines, batch)
+        return await run_in_threadpool(importer.close)
+    finally:
+        db.close()
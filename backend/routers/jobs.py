@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from dependencies.db import get_primary_db
+from models.job import Job
+from schemas.job import JobCreate, JobKind, JobResponse, JobStatus
+from services.jobs import JOBS_ENABLED, accepted, enqueue, enqueue_once, job_dict
+from utils.pagination import paginate
+
+
+# never cached, read on the primary: a status is polled until it changes
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    response: Response,
+    db: AsyncSession = Depends(get_primary_db),
+    status: JobStatus | None = Query(None),
+    kind: JobKind | None = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor (replaces offset)"),
+):
+    q = select(Job)
+    if status:
+        q = q.where(Job.status == status)
+    if kind:
+        q = q.where(Job.kind == kind)
+    jobs = await paginate(db, q, response, limit=limit, offset=offset, cursor=cursor, order_by=[Job.id], sort="id", key=lambda j: [j.id])
+    return [job_dict(j) for j in jobs]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_primary_db)):
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job_dict(job)
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(payload: JobCreate, db: AsyncSession = Depends(get_primary_db)):
+    """Queue a maintenance job for worker.py; follow it at the Location returned.
+
+    A purge already waiting in the queue is returned instead of a second one.
+    """
+    if not JOBS_ENABLED:
+        raise HTTPException(status_code=503, detail="File des tâches désactivée (JOBS_ENABLED)")
+    if payload.kind == "purge_deleted":
+        job = await enqueue_once(db, payload.kind, payload.payload)
+    else:
+        job = await enqueue(db, payload.kind, payload.payload)
+    await db.commit()
+    return accepted(job)
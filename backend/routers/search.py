@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import Float, cast, literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
+
+from dependencies.db import get_db
+from models.album import Album
+from models.artist import Artist
+from models.song import Song
+from schemas.search import SearchResult
+from utils.search import relevance, search_terms, text_filter
+
+
+router = APIRouter(prefix="/api/search", tags=["Search"])
+
+
+def _ranked(db: AsyncSession, kind: str, model, column, artist_column, q: str):
+    return (
+        select(
+            literal(kind).label("type"),
+            model.id.label("id"),
+            column.label("title"),
+            cast(relevance(db, column, q), Float).label("score"),
+            (artist_column if artist_column is not None else null()).label("artist_id"),
+        )
+        .where(text_filter(db, column, q))
+    )
+
+
+@router.get("/", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, description="Search text in song, album and artist names"),
+    types: List[Literal["song", "album", "artist"]] = Query(["song", "album", "artist"]),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    if not search_terms(q):
+        return []
+
+    sources = {
+        "song": (Song, Song.title, Song.artist_id),
+        "album": (Album, Album.title, Album.artist_id),
+        "artist": (Artist, Artist.name, None),
+    }
+    selects = [_ranked(db, kind, *sources[kind], q) for kind in dict.fromkeys(types)]
+    ranked = union_all(*selects).subquery()
+    stmt = (
+        select(ranked)
+        .order_by(ranked.c.score.desc(), ranked.c.type, ranked.c.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return [SearchResult(**row) for row in (await db.execute(stmt)).mappings()]
@@ -1,28 +0,0 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from database import SessionLocal
-from models.user import User
-
-router = APIRouter(prefix="/api/auth", tags=["Auth"])
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-@router.post("/login")
-def login(payload: dict, db: Session = Depends(get_db)):
-    username = payload.get("username")
-    password = payload.get("password")
-    if not username or not password:
-        raise HTTPException(status_code=400, detail="username et password requis")
-    user = db.query(User).filter(User.username == username).first()
-    if not user or user.password != password:
-        raise HTTPException(status_code=401, detail="Identifiants invalides")
-    # Return minimal auth info; no token/JWT
-    return {"ok": True, "user": {"id": user.id, "username": user.username, "email": user.email}}
@@ -1,199 +1,496 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Literal
 
-from database import SessionLocal
+from dependencies.db import get_db
 from models.song import Song
 from models.artist import Artist
 from models.album import Album
-from schemas.song import SongCreate, SongResponse, SongWithNamesResponse
+from schemas.album import AlbumResponse
+from schemas.artist import ArtistResponse
+from schemas.batch import BatchRequest, BatchResponse
+from schemas.genre import GenreResponse
+from schemas.song_genres import BULK_TAG_ASYNC_PAIRS, BulkTagRequest, BulkTagResponse
+from schemas.song import (
+    SongBrowseResponse, SongCreate, SongExpandedResponse, SongResponse, SongUpdate, SongWithNamesExpandedResponse,
+    SongWithNamesResponse,
+)
+from services.catalog import SONG_COLUMNS, filter_by_genres, genre_facets, songs_with_fields, songs_with_names
+from models.associations import song_genres
 from models.genre import Genre
- 
+from services.jobs import JOB_PATH, JOBS_ENABLED, accepted, enqueue, job_dict
+from services.snapshot import snapshot
+from services.song_genres import bulk_tag_sync, changed_tags
+from services.stats import StatsDelta, apply_stats
+from services.tombstones import check_parents
+from utils.batch import order_by_ids
+from utils.cache import cache_response, cached_response, invalidate
+from utils.conditional import bump_versions, not_modified
+from utils.idempotency import IDEMPOTENCY_HEADER, check_key, commit_once, fingerprint, remember, replay
+from utils.fields import FIELDS_DESCRIPTION, columns, parse_fields, sparse_response, with_fields
+from utils.pagination import CURSOR_HEADER, paginate
+from utils.search import text_filter
+from utils.writes import commit_checked
 
 
 router = APIRouter(prefix="/api/songs", tags=["Songs"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def _assert_fk_exists(db: Session, artist_id: int | None, album_id: int | None):
-    if artist_id is not None and not db.query(Artist).filter(Artist.id == artist_id).first():
+async def _assert_fk_exists(db: AsyncSession, artist_id: int | None, album_id: int | None):
+    # run after the foreign key rejected the write (utils/writes.py), or before it while
+    # tombstones are on (services/tombstones.py check_parents)
+    if artist_id is not None and not await db.get(Artist, artist_id):
         raise HTTPException(status_code=404, detail="Artiste associé introuvable")
-    if album_id is not None and not db.query(Album).filter(Album.id == album_id).first():
+    if album_id is not None and not await db.get(Album, album_id):
         raise HTTPException(status_code=404, detail="Album associé introuvable")
 
 
-@router.get("/", response_model=List[SongWithNamesResponse])
-def list_songs(
-    db: Session = Depends(get_db),
+def _collection_tags(artist_id: int | None, album_id: int | None) -> list[str]:
+    # song collections a song with these foreign keys shows up in
+    tags = ["songs"]
+    if artist_id is not None:
+        tags.append(f"artist:{artist_id}:songs")
+    if album_id is not None:
+        tags.append(f"album:{album_id}:songs")
+    return tags
+
+
+def _name_tags(rows: list[dict]) -> set[str]:
+    # sparse rows only carry the ids when the matching name was selected
+    return {f"artist:{r['artist_id']}" for r in rows if r.get("artist_id")} | {f"album:{r['album_id']}" for r in rows if r.get("album_id")}
+
+
+def _song_filters(db: AsyncSession, q: str | None, artist_id: int | None, album_id: int | None) -> list:
+    filters = []
+    if q:
+        filters.append(text_filter(db, Song.title, q))
+    if artist_id is not None:
+        filters.append(Song.artist_id == artist_id)
+    if album_id is not None:
+        filters.append(Song.album_id == album_id)
+    return filters
+
+
+EXPANSIONS = ("artist", "album", "genres")
+
+
+def _parse_expand(expand: str | None, fields: str | None = None) -> set[str]:
+    expanded = {f.strip() for f in (expand or "").split(",") if f.strip()}
+    if unknown := expanded - set(EXPANSIONS):
+        raise HTTPException(status_code=400, detail=f"expand inconnu: {', '.join(sorted(unknown))}")
+    if expanded and fields is not None:
+        raise HTTPException(status_code=400, detail="fields et expand ne peuvent pas être combinés")
+    return expanded
+
+
+def _expand_options(expand: set[str], collection_loader=selectinload) -> list:
+    # many-to-one relations ride along in the same SELECT; genres come from one extra
+    # IN query for the whole page (a join would multiply rows under LIMIT)
+    options = [joinedload(getattr(Song, rel)) for rel in ("artist", "album") if rel in expand]
+    if "genres" in expand:
+        options.append(collection_loader(Song.genres))
+    return options
+
+
+def _expanded_fields(song: Song, expand: set[str]) -> dict:
+    fields = {}
+    if "artist" in expand:
+        fields["artist"] = ArtistResponse.model_validate(song.artist) if song.artist else None
+    if "album" in expand:
+        fields["album"] = AlbumResponse.model_validate(song.album) if song.album else None
+    if "genres" in expand:
+        fields["genres"] = [GenreResponse.model_validate(g) for g in song.genres]
+    return fields
+
+
+def _expand_tags(songs: list[dict], expand: set[str]) -> set[str]:
+    tags = set()
+    for s in songs:
+        if "artist" in expand and s["artist_id"]:
+            tags.add(f"artist:{s['artist_id']}")
+        if "album" in expand and s["album_id"]:
+            tags.add(f"album:{s['album_id']}")
+        if "genres" in expand:
+            tags.add(f"song:{s['id']}:genres")
+            tags.update(f"genre:{g['id']}" for g in s["genres"])
+    return tags
+
+
+def _expand_tables(expand: set[str]) -> tuple[str, ...]:
+    return tuple(t for rel, t in (("artist", "artists"), ("album", "albums"), ("genres", "genres"), ("genres", "song_genres")) if rel in expand)
+
+
+async def _list_song_rows(db, response, *, limit, offset, cursor, sort, filters, genre_ids, genre_match, expand=frozenset(), selected=None) -> list[dict]:
+    """One page of songs with names, as plain dicts validated once by response_model.
+
+    Without expand the page is selected as column tuples: no ORM instances and no
+    per-row pydantic model, which is most of the CPU of a 200-row page. With selected
+    (?fields=) only those columns, plus the sort key and the ids behind selected names,
+    are read; the caller trims the extra ones.
+    """
+    order_by = [Song.title, Song.id] if sort == "title" else [Song.id]
+    if not expand:
+        if selected:
+            needed = with_fields(
+                selected, *(["title"] if sort == "title" else []),
+                *(["artist_id"] if "artist_name" in selected else []), *(["album_id"] if "album_title" in selected else []),
+            )
+            base = songs_with_fields(needed)
+        else:
+            base = songs_with_names(*SONG_COLUMNS)
+        query = filter_by_genres(base.where(*filters), genre_ids or [], genre_match)
+        rows = await paginate(
+            db, query, response, limit=limit, offset=offset, cursor=cursor, order_by=order_by, sort=sort,
+            key=lambda row: [row.title, row.id] if sort == "title" else [row.id],
+        )
+        return [row._asdict() for row in rows]
+
+    query = filter_by_genres(songs_with_names().where(*filters), genre_ids or [], genre_match).options(*_expand_options(expand))
+    rows = await paginate(
+        db, query, response, limit=limit, offset=offset, cursor=cursor, order_by=order_by, sort=sort,
+        key=lambda row: [row[0].title, row[0].id] if sort == "title" else [row[0].id],
+    )
+    return [
+        SongWithNamesExpandedResponse(
+            id=song.id,
+            title=song.title,
+            duration=song.duration,
+            artist_id=song.artist_id,
+            artist_name=artist_name,
+            album_id=song.album_id,
+            album_title=album_title,
+            **_expanded_fields(song, expand),
+        ).model_dump(exclude_unset=True)
+        for song, artist_name, album_title in rows
+    ]
+
+
+@router.get("/", response_model=List[SongWithNamesExpandedResponse], response_model_exclude_unset=True)
+async def list_songs(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor (replaces offset)"),
+    sort: Literal["id", "title"] = Query("id"),
+    q: str | None = Query(None, description="Search text in song title"),
+    artist_id: int | None = Query(None),
+    album_id: int | None = Query(None),
+    genre_id: List[int] | None = Query(None, description="Repeat to filter on several genres"),
+    genre_match: Literal["any", "all"] = Query("any", description="Songs in any or in all of the genre_id values"),
+    expand: str | None = Query(None, description="Comma-separated relations to embed: artist,album,genres"),
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+):
+    expanded = _parse_expand(expand, fields)
+    selected = parse_fields(fields, SongWithNamesResponse)
+    tables = ("songs", "artists", "albums", "song_genres", *_expand_tables(expanded))
+    if (not_mod := await not_modified(request, response, db, *dict.fromkeys(tables))) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    results = None
+    if sort == "id" and not q and not expanded:
+        results = snapshot.songs(
+            request, response, artist_id=artist_id, album_id=album_id, genre_ids=genre_id, genre_match=genre_match,
+            limit=limit, offset=offset, cursor=cursor,
+        )
+    if results is None:
+        results = await _list_song_rows(
+            db, response, limit=limit, offset=offset, cursor=cursor, sort=sort,
+            filters=_song_filters(db, q, artist_id, album_id), genre_ids=genre_id, genre_match=genre_match, expand=expanded,
+            selected=selected,
+        )
+    tags = {"songs"} | _name_tags(results) | {f"genre:{g}:songs" for g in genre_id or []} | _expand_tags(results, expanded)
+    if selected:
+        results = [{name: r[name] for name in selected} for r in results]
+        return sparse_response(cache_response(request, results, tags, response), response)
+    return cache_response(request, results, tags, response)
+
+
+@router.get("/browse", response_model=SongBrowseResponse)
+async def browse_songs(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from next_cursor (replaces offset)"),
+    sort: Literal["id", "title"] = Query("id"),
     q: str | None = Query(None, description="Search text in song title"),
     artist_id: int | None = Query(None),
     album_id: int | None = Query(None),
-    genre_id: int | None = Query(None),
+    genre_id: List[int] | None = Query(None, description="Repeat to filter on several genres"),
+    genre_match: Literal["any", "all"] = Query("any", description="Songs in any or in all of the genre_id values"),
+    facets: bool = Query(True, description="Include per-genre song counts"),
 ):
-    query = (
-        db.query(Song, Artist.name.label("artist_name"), Album.title.label("album_title"))
-        .outerjoin(Artist, Song.artist_id == Artist.id)
-        .outerjoin(Album, Song.album_id == Album.id)
+    """list_songs plus per-genre counts for the same filters, in one response.
+
+    Facets ignore the genre filter in "any" mode, so every genre shows how many songs
+    selecting it would add; in "all" mode they count within the current selection.
+    """
+    if (not_mod := await not_modified(request, response, db, "songs", "artists", "albums", "genres", "song_genres")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return hit
+    filters = _song_filters(db, q, artist_id, album_id)
+    items = await _list_song_rows(
+        db, response, limit=limit, offset=offset, cursor=cursor, sort=sort,
+        filters=filters, genre_ids=genre_id, genre_match=genre_match,
     )
+    counts = None
+    if facets:
+        song_filter = None
+        if filters or (genre_id and genre_match == "all"):
+            song_filter = select(Song.id).where(*filters)
+            if genre_match == "all":
+                song_filter = filter_by_genres(song_filter, genre_id or [], "all")
+        counts = [row._asdict() for row in (await db.execute(genre_facets(song_filter))).all()]
+    result = {"items": items, "facets": counts, "next_cursor": response.headers.get(CURSOR_HEADER)}
+    tags = {"songs", "song_genres"} | _name_tags(items) | {f"genre:{f['genre_id']}" for f in counts or []}
+    return cache_response(request, result, tags, response)
 
-    if q:
-        query = query.filter(Song.title.ilike(f"%{q}%"))
-    if artist_id is not None:
-        query = query.filter(Song.artist_id == artist_id)
-    if album_id is not None:
-        query = query.filter(Song.album_id == album_id)
-    if genre_id is not None:
-        # filter via relationship without explicit join
-        query = query.filter(Song.genres.any(Genre.id == genre_id))
-
-    query = query.offset(offset).limit(limit)
-    results: list[SongWithNamesResponse] = []
-    for song, artist_name, album_title in query.all():
-        results.append(
-            SongWithNamesResponse(
-                id=song.id,
-                title=song.title,
-                duration=song.duration,
-                artist_id=song.artist_id,
-                artist_name=artist_name,
-                album_id=song.album_id,
-                album_title=album_title,
-            )
-        )
-    return results
 
+@router.post("/batch", response_model=BatchResponse[SongExpandedResponse], response_model_exclude_unset=True)
+async def get_songs_batch(
+    payload: BatchRequest,
+    db: AsyncSession = Depends(get_db),
+    expand: str | None = Query(None, description="Comma-separated relations to embed: artist,album,genres"),
+):
+    fields = _parse_expand(expand)
+    songs = (await db.scalars(select(Song).where(Song.id.in_(payload.ids)).options(*_expand_options(fields)))).all()
+    found, missing = order_by_ids(payload.ids, songs)
+    items = [SongExpandedResponse(**SongResponse.model_validate(s).model_dump(), **_expanded_fields(s, fields)) for s in found]
+    return BatchResponse[SongExpandedResponse](items=items, missing=missing)
 
-@router.get("/{song_id}", response_model=SongResponse)
-def get_song(song_id: int, db: Session = Depends(get_db)):
-    song = db.query(Song).filter(Song.id == song_id).first()
+
+@router.get("/{song_id}", response_model=SongExpandedResponse, response_model_exclude_unset=True)
+async def get_song(
+    song_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    expand: str | None = Query(None, description="Comma-separated relations to embed: artist,album,genres"),
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+):
+    expanded = _parse_expand(expand, fields)
+    selected = parse_fields(fields, SongResponse)
+    if (not_mod := await not_modified(request, response, db, "songs", *_expand_tables(expanded))) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return sparse_response(hit, response) if selected else hit
+    if selected:
+        row = (await db.execute(select(*columns(Song, selected)).where(Song.id == song_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Morceau introuvable")
+        return sparse_response(cache_response(request, row._asdict(), [f"song:{song_id}"]), response)
+    # a single row: the genres join as well, so the whole detail is one SELECT
+    song = await db.get(Song, song_id, options=_expand_options(expanded, collection_loader=joinedload))
     if not song:
         raise HTTPException(status_code=404, detail="Morceau introuvable")
-    return song
+    result = SongExpandedResponse(**SongResponse.model_validate(song).model_dump(), **_expanded_fields(song, expanded))
+    # exclude_unset: only the requested expansions appear in the payload
+    result = result.model_dump(exclude_unset=True)
+    return cache_response(request, result, [f"song:{song_id}", *_expand_tags([result], expanded)])
 
 
 @router.post("/", response_model=SongResponse, status_code=status.HTTP_201_CREATED)
-def create_song(payload: SongCreate, db: Session = Depends(get_db)):
-    _assert_fk_exists(db, payload.artist_id, payload.album_id)
-    song = Song(**payload.dict())
+async def create_song(payload: SongCreate, db: AsyncSession = Depends(get_db)):
+    await check_parents(lambda: _assert_fk_exists(db, payload.artist_id, payload.album_id))
+    song = Song(**payload.model_dump())
     db.add(song)
-    db.commit()
-    db.refresh(song)
+    delta = StatsDelta()
+    delta.song(song.artist_id, song.album_id, song.duration)
+    await apply_stats(db, delta)
+    await bump_versions(db, "songs")
+    await commit_checked(db, missing=lambda: _assert_fk_exists(db, payload.artist_id, payload.album_id))
+    invalidate(*_collection_tags(song.artist_id, song.album_id), *delta.tags())
     return song
 
 
-@router.put("/{song_id}", response_model=SongResponse)
-def update_song(song_id: int, payload: SongCreate, db: Session = Depends(get_db)):
-    song = db.query(Song).filter(Song.id == song_id).first()
+async def _update_song(db: AsyncSession, song_id: int, values: dict) -> Song:
+    # the one read: the old foreign keys and duration move the stats and pick the caches to evict
+    song = await db.get(Song, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Morceau introuvable")
-    _assert_fk_exists(db, payload.artist_id, payload.album_id)
-    for k, v in payload.dict().items():
+    old_tags = _collection_tags(song.artist_id, song.album_id)
+    old = (song.artist_id, song.album_id, song.duration)
+    # only the parents the song moves to: burying its current ones buries or uncredits it
+    moved = [values[k] if values.get(k, current) != current else None for k, current in (("artist_id", old[0]), ("album_id", old[1]))]
+    await check_parents(lambda: _assert_fk_exists(db, *moved))
+    for k, v in values.items():
         setattr(song, k, v)
-    db.commit()
-    db.refresh(song)
+    delta = StatsDelta()
+    genre_ids = []
+    if (song.artist_id, song.album_id, song.duration) != old:
+        # the genre totals only move with the duration
+        if song.duration != old[2]:
+            genre_ids = (await db.scalars(select(song_genres.c.genre_id).where(song_genres.c.song_id == song_id))).all()
+        delta.song(*old, genre_ids, sign=-1)
+        delta.song(song.artist_id, song.album_id, song.duration, genre_ids)
+        await apply_stats(db, delta)
+    await bump_versions(db, "songs")
+    # a rollback expires `song`: check the values as written
+    new = (song.artist_id, song.album_id)
+    await commit_checked(db, missing=lambda: _assert_fk_exists(db, *new))
+    invalidate(
+        f"song:{song_id}", *old_tags, *_collection_tags(song.artist_id, song.album_id),
+        *(f"genre:{g}:songs" for g in genre_ids), *delta.tags(),
+    )
     return song
 
 
+@router.put("/{song_id}", response_model=SongResponse)
+async def update_song(song_id: int, payload: SongCreate, db: AsyncSession = Depends(get_db)):
+    return await _update_song(db, song_id, payload.model_dump())
+
+
+@router.patch("/{song_id}", response_model=SongResponse)
+async def patch_song(song_id: int, payload: SongUpdate, db: AsyncSession = Depends(get_db)):
+    return await _update_song(db, song_id, payload.values())
+
+
 @router.delete("/{song_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_song(song_id: int, db: Session = Depends(get_db)):
-    song = db.query(Song).filter(Song.id == song_id).first()
+async def delete_song(song_id: int, db: AsyncSession = Depends(get_db)):
+    song = await db.get(Song, song_id, options=[selectinload(Song.genres)])
     if not song:
         raise HTTPException(status_code=404, detail="Morceau introuvable")
-    db.delete(song)
-    db.commit()
+    genre_tags = [f"genre:{g.id}:songs" for g in song.genres]
+    delta = StatsDelta()
+    delta.song(song.artist_id, song.album_id, song.duration, [g.id for g in song.genres], sign=-1)
+    await db.delete(song)
+    await apply_stats(db, delta)
+    await bump_versions(db, "songs", "song_genres")
+    await db.commit()
+    invalidate(
+        f"song:{song_id}", f"song:{song_id}:genres", *genre_tags, *_collection_tags(song.artist_id, song.album_id), *delta.tags(),
+    )
     return
 
 
 # Helpers routes for relations
 @router.get("/by-artist/{artist_id}", response_model=List[SongWithNamesResponse])
-def list_songs_by_artist(artist_id: int, db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    if not db.query(Artist).filter(Artist.id == artist_id).first():
-        raise HTTPException(status_code=404, detail="Artiste introuvable")
-    q = (
-        db.query(Song, Artist.name.label("artist_name"), Album.title.label("album_title"))
-        .outerjoin(Artist, Song.artist_id == Artist.id)
-        .outerjoin(Album, Song.album_id == Album.id)
-        .filter(Song.artist_id == artist_id)
-        .offset(offset)
-        .limit(limit)
-    )
-    return [
-        SongWithNamesResponse(
-            id=s.id,
-            title=s.title,
-            duration=s.duration,
-            artist_id=s.artist_id,
-            artist_name=an,
-            album_id=s.album_id,
-            album_title=aln,
-        )
-        for (s, an, aln) in q.all()
-    ]
+async def list_songs_by_artist(artist_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0), cursor: str | None = Query(None)):
+    if (not_mod := await not_modified(request, response, db, "songs", "artists", "albums")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return hit
+    results = snapshot.songs_of(request, response, "artist", artist_id, "Artiste introuvable", limit=limit, offset=offset, cursor=cursor)
+    if results is None:
+        if not await db.get(Artist, artist_id):
+            raise HTTPException(status_code=404, detail="Artiste introuvable")
+        q = songs_with_names(*SONG_COLUMNS).where(Song.artist_id == artist_id)
+        rows = await paginate(db, q, response, limit=limit, offset=offset, cursor=cursor, order_by=[Song.id], sort="id", key=lambda row: [row.id])
+        results = [row._asdict() for row in rows]
+    return cache_response(request, results, {f"artist:{artist_id}:songs"} | _name_tags(results), response)
 
 
 @router.get("/by-album/{album_id}", response_model=List[SongWithNamesResponse])
-def list_songs_by_album(album_id: int, db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    if not db.query(Album).filter(Album.id == album_id).first():
-        raise HTTPException(status_code=404, detail="Album introuvable")
-    q = (
-        db.query(Song, Artist.name.label("artist_name"), Album.title.label("album_title"))
-        .outerjoin(Artist, Song.artist_id == Artist.id)
-        .outerjoin(Album, Song.album_id == Album.id)
-        .filter(Song.album_id == album_id)
-        .offset(offset)
-        .limit(limit)
-    )
-    return [
-        SongWithNamesResponse(
-            id=s.id,
-            title=s.title,
-            duration=s.duration,
-            artist_id=s.artist_id,
-            artist_name=an,
-            album_id=s.album_id,
-            album_title=aln,
-        )
-        for (s, an, aln) in q.all()
-    ]
+async def list_songs_by_album(album_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0), cursor: str | None = Query(None)):
+    if (not_mod := await not_modified(request, response, db, "songs", "artists", "albums")) is not None:
+        return not_mod
+    if (hit := cached_response(request, response)) is not None:
+        return hit
+    results = snapshot.songs_of(request, response, "album", album_id, "Album introuvable", limit=limit, offset=offset, cursor=cursor)
+    if results is None:
+        if not await db.get(Album, album_id):
+            raise HTTPException(status_code=404, detail="Album introuvable")
+        q = songs_with_names(*SONG_COLUMNS).where(Song.album_id == album_id)
+        rows = await paginate(db, q, response, limit=limit, offset=offset, cursor=cursor, order_by=[Song.id], sort="id", key=lambda row: [row.id])
+        results = [row._asdict() for row in rows]
+    return cache_response(request, results, {f"album:{album_id}:songs"} | _name_tags(results), response)
 
 
 # Genre linking endpoints
+@router.post("/genres/bulk", response_model=BulkTagResponse, responses={202: {"description": "Queued as a bulk_tag job"}})
+async def bulk_tag_songs(
+    payload: BulkTagRequest,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias=IDEMPOTENCY_HEADER),
+    prefer: str | None = Header(None),
+):
+    """Add or remove many song-genre links in one transaction.
+
+    Pairs already in the requested state and unknown ids are skipped and reported. With an
+    Idempotency-Key header a retry returns the first response instead of running again.
+    With `Prefer: respond-async` (or BULK_TAG_ASYNC_PAIRS pairs and more) the links are
+    queued for worker.py instead: 202, and the report becomes the job's result. Without a
+    job queue (JOBS_ENABLED) the preference is ignored.
+    """
+    key = check_key(idempotency_key)
+    fp = fingerprint("POST /api/songs/genres/bulk", payload)
+    # a replayed 202 gets the Location of its job back
+    if key and (replayed := await replay(db, key, fp, JOB_PATH)):
+        return replayed
+    pairs = payload.link_pairs()
+    if JOBS_ENABLED and ("respond-async" in (prefer or "") or (BULK_TAG_ASYNC_PAIRS and len(pairs) >= BULK_TAG_ASYNC_PAIRS)):
+        job = await enqueue(db, "bulk_tag", {"action": payload.action, "pairs": pairs})
+        if key:
+            # a retry gets the same job back, not a second one
+            await remember(db, key, fp, status.HTTP_202_ACCEPTED, job_dict(job))
+        if (replayed := await commit_once(db, key, fp, JOB_PATH)) is not None:
+            return replayed
+        return accepted(job, {"Preference-Applied": "respond-async"})
+    result, changed = await db.run_sync(bulk_tag_sync, payload.action, pairs)
+    if changed:
+        await bump_versions(db, "song_genres")
+    if key:
+        await remember(db, key, fp, status.HTTP_200_OK, result)
+    if (replayed := await commit_once(db, key, fp)) is not None:
+        return replayed
+    if changed:
+        invalidate(*changed_tags(changed))
+    return result
+
+
 @router.post("/{song_id}/genres/{genre_id}", status_code=status.HTTP_204_NO_CONTENT)
-def add_genre_to_song(song_id: int, genre_id: int, db: Session = Depends(get_db)):
-    song = db.query(Song).filter(Song.id == song_id).first()
-    genre = db.query(Genre).filter(Genre.id == genre_id).first()
+async def add_genre_to_song(song_id: int, genre_id: int, db: AsyncSession = Depends(get_db)):
+    # genres are loaded up front: lazy loading is not available on an AsyncSession
+    song = await db.get(Song, song_id, options=[selectinload(Song.genres)])
+    genre = await db.get(Genre, genre_id)
     if not song or not genre:
         raise HTTPException(status_code=404, detail="Song ou Genre introuvable")
     if genre not in song.genres:
         song.genres.append(genre)
-        db.commit()
+        delta = StatsDelta()
+        delta.songs("genre", genre_id, 1, song.duration)
+        await apply_stats(db, delta)
+        await bump_versions(db, "song_genres")
+        await db.commit()
+        invalidate(f"song:{song_id}:genres", f"genre:{genre_id}:songs", "song_genres", *delta.tags())
     return
 
 
 @router.delete("/{song_id}/genres/{genre_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_genre_from_song(song_id: int, genre_id: int, db: Session = Depends(get_db)):
-    song = db.query(Song).filter(Song.id == song_id).first()
-    genre = db.query(Genre).filter(Genre.id == genre_id).first()
+async def remove_genre_from_song(song_id: int, genre_id: int, db: AsyncSession = Depends(get_db)):
+    song = await db.get(Song, song_id, options=[selectinload(Song.genres)])
+    genre = await db.get(Genre, genre_id)
     if not song or not genre:
         raise HTTPException(status_code=404, detail="Song ou Genre introuvable")
     if genre in song.genres:
         song.genres.remove(genre)
-        db.commit()
+        delta = StatsDelta()
+        delta.songs("genre", genre_id, -1, -(song.duration or 0.0))
+        await apply_stats(db, delta)
+        await bump_versions(db, "song_genres")
+        await db.commit()
+        invalidate(f"song:{song_id}:genres", f"genre:{genre_id}:songs", "song_genres", *delta.tags())
     return
 
 
 @router.get("/{song_id}/genres", response_model=List[str])
-def list_genres_of_song(song_id: int, db: Session = Depends(get_db)):
-    song = db.query(Song).filter(Song.id == song_id).first()
-    if not song:
-        raise HTTPException(status_code=404, detail="Morceau introuvable")
-    return [g.title for g in song.genres]
+async def list_genres_of_song(song_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    if (not_mod := await not_modified(request, response, db, "songs", "genres", "song_genres")) is not None:
+        return not_mod
+    if (hit := cached_response(request)) is not None:
+        return hit
+    genres = snapshot.genres_of_song(request, song_id, "Morceau introuvable")
+    if genres is None:
+        song = await db.get(Song, song_id, options=[selectinload(Song.genres)])
+        if not song:
+            raise HTTPException(status_code=404, detail="Morceau introuvable")
+        genres = [(g.id, g.title) for g in song.genres]
+    tags = [f"song:{song_id}:genres", *(f"genre:{g}" for g, _ in genres)]
+    return cache_response(request, [title for _, title in genres], tags)
@@ -1,72 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from database import SessionLocal
+from dependencies.auth import invalidate_principal
+from dependencies.db import get_db
 from models.user import User
-from schemas.user import UserCreate, UserResponse
-# Plain CRUD without auth for now
+from schemas.user import UserCreate, UserResponse, UserUpdate
+from utils.pagination import paginate
+from utils.security import hash_password_async
+from utils.writes import commit_checked, constraint_errors, patch_row, update_row
+# passwords are stored hashed, like /api/auth/signup does (utils/security.py)
 
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+DUPLICATE = "Nom d'utilisateur ou email déjà utilisé"
 
 
 @router.get("/", response_model=List[UserResponse])
-def list_users(db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    return db.query(User).offset(offset).limit(limit).all()
+async def list_users(response: Response, db: AsyncSession = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0), cursor: str | None = Query(None)):
+    return await paginate(db, select(User), response, limit=limit, offset=offset, cursor=cursor, order_by=[User.id], sort="id", key=lambda u: [u.id])
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur introuvable")
     return user
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(payload: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter((User.username == payload.username) | (User.email == payload.email)).first():
-        raise HTTPException(status_code=400, detail="Nom d'utilisateur ou email déjà utilisé")
-    new_user = User(username=payload.username, email=payload.email, password=payload.password)
+async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    # username / email uniqueness is left to the constraints (utils/writes.py)
+    new_user = User(username=payload.username, email=payload.email, password=await hash_password_async(payload.password))
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await commit_checked(db, duplicate=DUPLICATE)
     return new_user
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(user_id: int, payload: UserCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Utilisateur introuvable")
-
-    # Basic unique checks
-    existing = db.query(User).filter((User.username == payload.username) | (User.email == payload.email), User.id != user_id).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Nom d'utilisateur ou email déjà utilisé")
-
-    user.username = payload.username
-    user.email = payload.email
-    user.password = payload.password
-    db.commit()
-    db.refresh(user)
+async def update_user(user_id: int, payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    values = payload.model_dump()
+    values["password"] = await hash_password_async(values["password"])
+    async with constraint_errors(db, duplicate=DUPLICATE):
+        if not await update_row(db, User, user_id, values):
+            raise HTTPException(status_code=404, detail="Utilisateur introuvable")
+        await db.commit()
+    invalidate_principal(user_id)
+    return {"id": user_id, **values}
+
+
+@router.patch("/{user_id}", response_model=UserResponse)
+async def patch_user(user_id: int, payload: UserUpdate, db: AsyncSession = Depends(get_db)):
+    values = payload.values()
+    if "password" in values:
+        values["password"] = await hash_password_async(values["password"])
+    async with constraint_errors(db, duplicate=DUPLICATE):
+        user = await patch_row(db, User, user_id, values)
+        if not user:
+            raise HTTPException(status_code=404, detail="Utilisateur introuvable")
+        await db.commit()
+    invalidate_principal(user_id)
     return user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur introuvable")
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    invalidate_principal(user_id)
     return
@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import date
 
+from schemas.update import PartialUpdate
+
 
 class AlbumBase(BaseModel):
     title: str
@@ -14,6 +16,15 @@ class AlbumCreate(AlbumBase):
     pass
 
 
+class AlbumUpdate(PartialUpdate):
+    required = ("title", "artist_id")
+
+    title: Optional[str] = None
+    cover: Optional[str] = None
+    release_date: Optional[date] = None
+    artist_id: Optional[int] = None
+
+
 class AlbumResponse(AlbumBase):
     id: int
 
@@ -1,6 +1,8 @@
 from pydantic import BaseModel
 from typing import Optional
 
+from schemas.update import PartialUpdate
+
 # 🔹 Modèle de base (champs communs)
 class ArtistBase(BaseModel):
     name: str
@@ -11,6 +13,14 @@ class ArtistBase(BaseModel):
 class ArtistCreate(ArtistBase):
     pass
 
+# 🔹 Pour la modification partielle (PATCH)
+class ArtistUpdate(PartialUpdate):
+    required = ("name",)
+
+    name: Optional[str] = None
+    avatar: Optional[str] = None
+    bio: Optional[str] = None
+
 # 🔹 Pour la réponse (GET)
 class ArtistResponse(ArtistBase):
     id: int
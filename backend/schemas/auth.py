@@ -1,4 +1,7 @@
 from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+
+from schemas.user import UserResponse
 
 
 class SignupRequest(BaseModel):
@@ -15,3 +18,17 @@ class LoginRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+
+
+class LoginResponse(TokenResponse):
+    # ok and user: what the web app reads since the first (tokenless) login
+    ok: bool = True
+    user: UserResponse
+
+
+class PrincipalResponse(BaseModel):
+    # the cached principal (dependencies/auth.py), not the users row
+    id: int
+    username: str
+    email: Optional[str] = None
+    roles: List[str] = []
@@ -0,0 +1,18 @@
+import os
+from pydantic import BaseModel, Field
+from typing import Generic, List, TypeVar
+
+
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "500"))
+
+T = TypeVar("T")
+
+
+class BatchRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BATCH_MAX_IDS)
+
+
+class BatchResponse(BaseModel, Generic[T]):
+    # items follow the order of the requested ids (duplicates dropped)
+    items: List[T]
+    missing: List[int]
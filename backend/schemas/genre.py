@@ -1,6 +1,8 @@
 from pydantic import BaseModel
 from typing import Optional
 
+from schemas.update import PartialUpdate
+
 
 class GenreBase(BaseModel):
     title: str
@@ -11,6 +13,13 @@ class GenreCreate(GenreBase):
     pass
 
 
+class GenreUpdate(PartialUpdate):
+    required = ("title",)
+
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+
 class GenreResponse(GenreBase):
     id: int
 
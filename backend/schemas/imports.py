@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class ImportRowError(BaseModel):
+    line: Optional[int] = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    lines: int
+    inserted: int
+    failed: int
+    genre_links: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[ImportRowError]
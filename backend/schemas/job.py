@@ -0,0 +1,31 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Literal, Optional
+
+
+JobKind = Literal["bulk_tag", "purge_deleted", "rebuild_stats", "reindex_search"]
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class JobCreate(BaseModel):
+    """Maintenance jobs started by hand; bulk_tag is queued by POST /api/songs/genres/bulk."""
+
+    kind: Literal["purge_deleted", "rebuild_stats", "reindex_search"]
+    payload: dict[str, Any] = Field(default_factory=dict)
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: JobKind
+    status: JobStatus
+    payload: dict[str, Any]
+    result: Optional[Any] = None  # what the handler returned, once succeeded
+    error: Optional[str] = None  # last failure, kept when a retry succeeds
+    attempts: int
+    max_attempts: int
+    progress_done: int
+    progress_total: Optional[int] = None
+    created_at: datetime
+    run_after: datetime  # pushed back on each retry
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
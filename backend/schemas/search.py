@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+
+class SearchResult(BaseModel):
+    type: Literal["song", "album", "artist"]
+    id: int
+    title: str
+    score: float
+    artist_id: Optional[int] = None
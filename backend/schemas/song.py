@@ -1,5 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+
+from schemas.album import AlbumResponse
+from schemas.artist import ArtistResponse
+from schemas.genre import GenreResponse
+from schemas.update import PartialUpdate
 
 
 class SongBase(BaseModel):
@@ -13,6 +18,15 @@ class SongCreate(SongBase):
     pass
 
 
+class SongUpdate(PartialUpdate):
+    required = ("title",)
+
+    title: Optional[str] = None
+    duration: Optional[float] = None
+    artist_id: Optional[int] = None
+    album_id: Optional[int] = None
+
+
 class SongResponse(SongBase):
     id: int
 
@@ -43,3 +57,28 @@ class SongWithNamesResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class GenreFacet(BaseModel):
+    genre_id: int
+    title: str
+    count: int
+
+
+class SongBrowseResponse(BaseModel):
+    items: List[SongWithNamesResponse]
+    facets: Optional[List[GenreFacet]] = None
+    next_cursor: Optional[str] = None
+
+
+class SongExpandedResponse(SongResponse):
+    # filled only for the relations named in ?expand=
+    artist: Optional[ArtistResponse] = None
+    album: Optional[AlbumResponse] = None
+    genres: Optional[List[GenreResponse]] = None
+
+
+class SongWithNamesExpandedResponse(SongWithNamesResponse):
+    artist: Optional[ArtistResponse] = None
+    album: Optional[AlbumResponse] = None
+    genres: Optional[List[GenreResponse]] = None
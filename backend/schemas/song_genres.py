@@ -0,0 +1,47 @@
+import os
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal
+
+
+BULK_TAG_MAX_PAIRS = int(os.getenv("BULK_TAG_MAX_PAIRS", "10000"))
+# requests of at least this many pairs are queued as a job (202) even without Prefer; 0: never
+BULK_TAG_ASYNC_PAIRS = int(os.getenv("BULK_TAG_ASYNC_PAIRS", "0"))
+
+
+class SongGenrePair(BaseModel):
+    song_id: int
+    genre_id: int
+
+
+class BulkTagRequest(BaseModel):
+    """Either explicit pairs, or every genre of genre_ids on every song of song_ids."""
+
+    action: Literal["add", "remove"] = "add"
+    pairs: List[SongGenrePair] = Field(default_factory=list)
+    song_ids: List[int] = Field(default_factory=list)
+    genre_ids: List[int] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def _one_shape(self):
+        if self.pairs and (self.song_ids or self.genre_ids):
+            raise ValueError("pairs ou song_ids/genre_ids, pas les deux")
+        if not self.pairs and not (self.song_ids and self.genre_ids):
+            raise ValueError("pairs, ou song_ids et genre_ids, requis")
+        if len(self.pairs) + len(set(self.song_ids)) * len(set(self.genre_ids)) > BULK_TAG_MAX_PAIRS:
+            raise ValueError(f"au plus {BULK_TAG_MAX_PAIRS} liens par requête")
+        return self
+
+    def link_pairs(self) -> list[tuple[int, int]]:
+        if self.pairs:
+            return list(dict.fromkeys((p.song_id, p.genre_id) for p in self.pairs))
+        genre_ids = list(dict.fromkeys(self.genre_ids))
+        return [(s, g) for s in dict.fromkeys(self.song_ids) for g in genre_ids]
+
+
+class BulkTagResponse(BaseModel):
+    action: Literal["add", "remove"]
+    requested: int
+    changed: int  # links added or removed
+    unchanged: int  # already linked (add) or not linked (remove)
+    missing_song_ids: List[int]
+    missing_genre_ids: List[int]
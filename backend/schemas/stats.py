@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+
+
+class AlbumStats(BaseModel):
+    album_id: int
+    song_count: int
+    total_duration: float  # seconds
+
+
+class ArtistStats(BaseModel):
+    artist_id: int
+    song_count: int
+    album_count: int
+    total_duration: float
+
+
+class GenreStats(BaseModel):
+    genre_id: int
+    song_count: int
+    total_duration: float
@@ -0,0 +1,21 @@
+from typing import ClassVar
+
+from pydantic import BaseModel, model_validator
+
+
+class PartialUpdate(BaseModel):
+    """PATCH body: every field optional, only the ones sent are written.
+
+    Columns that cannot be NULL are listed in `required`: omitting them is fine, sending
+    null for them is a 422 rather than a constraint error at commit.
+    """
+    required: ClassVar[tuple[str, ...]] = ()
+
+    @model_validator(mode="after")
+    def _not_null(self):
+        if nulls := [name for name in self.required if name in self.model_fields_set and getattr(self, name) is None]:
+            raise ValueError(f"ne peut pas être null: {', '.join(nulls)}")
+        return self
+
+    def values(self) -> dict:
+        return self.model_dump(exclude_unset=True)
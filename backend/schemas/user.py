@@ -1,4 +1,7 @@
 from pydantic import BaseModel, EmailStr
+from typing import Optional
+
+from schemas.update import PartialUpdate
 
 
 class UserBase(BaseModel):
@@ -10,6 +13,14 @@ class UserCreate(UserBase):
     password: str
 
 
+class UserUpdate(PartialUpdate):
+    required = ("username", "email", "password")
+
+    username: Optional[str] = None
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+
+
 class UserResponse(UserBase):
     id: int
 
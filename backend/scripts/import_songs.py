@@ -0,0 +1,45 @@
+"""Bulk-load songs from an NDJSON or CSV file.
+
+    cd backend && python -m scripts.import_songs catalog.ndjson
+    cd backend && python -m scripts.import_songs catalog.csv --chunk-size 10000
+
+Progress goes to stderr, the final report (with per-line errors) to stdout as JSON.
+"""
+import argparse
+import json
+import sys
+
+from database import SessionLocal
+from models import artist, album, song, genre, table_version  # noqa: F401 (mappers)
+from services.catalog_import import SongImporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load songs from an NDJSON or CSV file")
+    parser.add_argument("path", help="file to import, '-' for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="defaults from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--max-errors", type=int, default=1000, help="errors kept in the report")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    def progress(report: dict):
+        print(
+            f"\r{report['inserted']} inserted, {report['failed']} failed, {report['rows_per_second']:.0f} rows/s",
+            end="", file=sys.stderr, flush=True,
+        )
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    with source, SessionLocal() as db:
+        importer = SongImporter(db, fmt=fmt, chunk_size=args.chunk_size, max_errors=args.max_errors, progress=progress)
+        importer.feed_lines(source)
+        report = importer.close()
+    print(file=sys.stderr)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
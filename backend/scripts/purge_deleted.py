@@ -0,0 +1,32 @@
+"""Delete the artists, albums and songs tombstoned by large deletes (SOFT_DELETE_MIN_SONGS).
+
+The rows already left the API, the stats and the caches when they were stamped; this
+only reclaims them, one short transaction per batch. Run it from cron or after a bulk
+removal:
+
+    cd backend && python -m scripts.purge_deleted
+    cd backend && python -m scripts.purge_deleted --batch-size 500
+"""
+import argparse
+import json
+import sys
+
+from database import SessionLocal
+from models import artist, album, song, genre, table_version  # noqa: F401 (mappers)
+from services.tombstones import PURGE_BATCH_SIZE, purge_sync
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete tombstoned artists, albums and songs in batches")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        counts = purge_sync(db, args.batch_size)
+    json.dump({"deleted": counts}, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Recompute catalog_stats (song counts, durations, album counts) from the catalog.
+
+The API keeps the counters in step with every write; run this after loading rows behind
+its back (SQL dumps, manual fixes) or to check for drift:
+
+    cd backend && python -m scripts.rebuild_stats
+    cd backend && python -m scripts.rebuild_stats --check   # report drift, change nothing
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import artist, album, song, genre, table_version, catalog_stats  # noqa: F401 (mappers)
+from models.catalog_stats import CatalogStats
+from services.stats import rebuild_stats_sync
+from utils.cache import cache
+from utils.conditional import bump_versions_sync
+
+ZERO = (0, 0.0, 0)
+
+
+def _snapshot(db) -> dict:
+    return {
+        (r.scope, r.scope_id): (r.song_count, round(r.total_duration, 3), r.album_count)
+        for r in db.scalars(select(CatalogStats))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute catalog_stats from the catalog")
+    parser.add_argument("--check", action="store_true", help="only report the rows that differ")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        before = _snapshot(db)
+        counts = rebuild_stats_sync(db)
+        after = _snapshot(db)
+        # a missing row reads as zeros
+        drift = sorted(k for k in before.keys() | after.keys() if before.get(k, ZERO) != after.get(k, ZERO))
+        if args.check:
+            db.rollback()
+        else:
+            # new ETags for the stats views; cached copies expire with CACHE_TTL
+            bump_versions_sync(db, "songs")
+            db.commit()
+            cache.clear()
+    json.dump({"rows": counts, "drifted": len(drift), "sample": [f"{s}:{i}" for s, i in drift[:20]]}, sys.stdout, indent=2)
+    print()
+    return 1 if args.check and drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
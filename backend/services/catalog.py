@@ -0,0 +1,80 @@
+"""Catalog queries shared by the song list endpoints and the exports."""
+from typing import Literal
+
+from sqlalchemy import Select, func, select
+
+from models.album import Album
+from models.artist import Artist
+from models.associations import song_genres
+from models.genre import Genre
+from models.song import Song
+from models.tombstone import SOFT_DELETE_MIN_SONGS
+
+
+# the SongWithNamesResponse fields, selected as plain columns (no ORM instances)
+SONG_COLUMNS = (Song.id, Song.title, Song.duration, Song.artist_id, Song.album_id)
+
+
+def songs_with_names(*columns) -> Select:
+    """Songs with their artist name and album title (outer joins: both are optional).
+
+    Selects the Song entity by default; pass song columns to get plain row tuples.
+    """
+    return (
+        select(*(columns or (Song,)), Artist.name.label("artist_name"), Album.title.label("album_title"))
+        .outerjoin(Artist, Song.artist_id == Artist.id)
+        .outerjoin(Album, Song.album_id == Album.id)
+    )
+
+
+def songs_with_fields(names: list[str]) -> Select:
+    """Only the named SongWithNamesResponse fields, joining artists / albums only for their names."""
+    named = {"artist_name": Artist.name.label("artist_name"), "album_title": Album.title.label("album_title")}
+    stmt = select(*(named.get(name) if name in named else getattr(Song, name) for name in names)).select_from(Song)
+    if "artist_name" in names:
+        stmt = stmt.outerjoin(Artist, Song.artist_id == Artist.id)
+    if "album_title" in names:
+        stmt = stmt.outerjoin(Album, Song.album_id == Album.id)
+    return stmt
+
+
+def albums_with_artist(*columns) -> Select:
+    return select(*(columns or (Album,)), Artist.name.label("artist_name")).outerjoin(Artist, Album.artist_id == Artist.id)
+
+
+def filter_by_genres(stmt: Select, genre_ids: list[int], match: Literal["any", "all"] = "any") -> Select:
+    """Restrict a songs query to songs in any (or all) of genre_ids.
+
+    Runs on song_genres(genre_id, song_id): a plain join for one genre (the primary key
+    makes it one row per song), an IN semi-join for several. The links of tombstoned songs
+    match too, but stmt selects from Song, whose rows models/tombstone.py filters.
+    """
+    genre_ids = list(dict.fromkeys(genre_ids))
+    if not genre_ids:
+        return stmt
+    if len(genre_ids) == 1:
+        return stmt.join(song_genres, song_genres.c.song_id == Song.id).where(song_genres.c.genre_id == genre_ids[0])
+    linked = select(song_genres.c.song_id).where(song_genres.c.genre_id.in_(genre_ids))
+    if match == "all":
+        linked = linked.group_by(song_genres.c.song_id).having(func.count() == len(genre_ids))
+    return stmt.where(Song.id.in_(linked))
+
+
+def genre_facets(song_filter: Select | None = None) -> Select:
+    """(genre_id, title, count) of songs per genre, most populated first.
+
+    song_filter, a select of song ids, narrows the counted songs; without it every link
+    is counted straight from the song_genres index, unless tombstoned songs keep links
+    there (SOFT_DELETE_MIN_SONGS): then the songs are joined to leave theirs out.
+    """
+    stmt = (
+        select(Genre.id.label("genre_id"), Genre.title, func.count().label("count"))
+        .join(song_genres, song_genres.c.genre_id == Genre.id)
+        .group_by(Genre.id, Genre.title)
+        .order_by(func.count().desc(), Genre.id)
+    )
+    if song_filter is not None:
+        stmt = stmt.where(song_genres.c.song_id.in_(song_filter))
+    elif SOFT_DELETE_MIN_SONGS:
+        stmt = stmt.join(Song, Song.id == song_genres.c.song_id).where(Song.deleted_at.is_(None))
+    return stmt
@@ -0,0 +1,239 @@
+"""Bulk song import shared by POST /api/import/songs and scripts/import_songs.py.
+
+Rows are validated against artist/album/genre id sets loaded once, inserted with one
+multi-row INSERT per chunk, and their genres linked with one bulk song_genres INSERT per
+chunk. Each chunk is committed on its own, and the cache entries it affects are evicted
+right after, so an interrupted import keeps what it already inserted, shows it, and the
+report says how far it went.
+
+Row fields: title, duration, artist_id, album_id, genre_ids. In NDJSON genre_ids is a
+list; in CSV (header line required) it is a "|"-separated string.
+"""
+import csv
+import json
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from models.album import Album
+from models.artist import Artist
+from models.associations import song_genres
+from models.genre import Genre
+from models.song import Song
+from services.stats import StatsDelta, apply_stats_sync
+from utils.cache import invalidate
+from utils.conditional import bump_versions_sync
+
+
+songs_table = Song.__table__
+TITLE_MAX = songs_table.c.title.type.length
+
+
+class RowError(ValueError):
+    pass
+
+
+def _optional_int(value, field: str):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise RowError(f"{field} doit être un entier")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field} doit être un entier")
+
+
+class SongImporter:
+    def __init__(
+        self,
+        db: Session,
+        fmt: str = "ndjson",
+        chunk_size: int = 5000,
+        max_errors: int = 1000,
+        progress: Callable[[dict], None] | None = None,
+    ):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"format inconnu: {fmt}")
+        self.db = db
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.progress = progress
+
+        self.artist_ids = set(db.scalars(select(Artist.id)))
+        self.album_ids = set(db.scalars(select(Album.id)))
+        self.genre_ids = set(db.scalars(select(Genre.id)))
+
+        self._header: list[str] | None = None
+        self._rows: list[dict] = []
+        self._genres: list[list[int]] = []
+        self._lines: list[int] = []
+        self._started = time.perf_counter()
+        self.line_no = 0
+        self.inserted = 0
+        self.genre_links = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def feed_lines(self, lines: Iterable[str]):
+        for line in lines:
+            self.line_no += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = self._parse(line)
+                if record is None:
+                    continue
+                self._add(record)
+            except RowError as e:
+                self._error(str(e))
+            if len(self._rows) >= self.chunk_size:
+                self._flush()
+
+    def _parse(self, line: str) -> dict | None:
+        if self.fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise RowError("JSON invalide")
+            if not isinstance(record, dict):
+                raise RowError("objet JSON attendu")
+            return record
+        values = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [v.strip() for v in values]
+            if "title" not in self._header:
+                raise RowError("en-tête CSV sans colonne title")
+            return None
+        record = dict(zip(self._header, values))
+        genres = record.get("genre_ids")
+        record["genre_ids"] = [g for g in genres.split("|") if g.strip()] if genres else []
+        return record
+
+    def _add(self, record: dict):
+        title = record.get("title")
+        if not isinstance(title, str) or not title.strip():
+            raise RowError("title requis")
+        if len(title) > TITLE_MAX:
+            raise RowError(f"title dépasse {TITLE_MAX} caractères")
+        duration = record.get("duration")
+        if duration == "":
+            duration = None
+        if duration is not None:
+            try:
+                duration = float(duration)
+            except (TypeError, ValueError):
+                raise RowError("duration doit être un nombre")
+        artist_id = _optional_int(record.get("artist_id"), "artist_id")
+        if artist_id is not None and artist_id not in self.artist_ids:
+            raise RowError(f"artiste {artist_id} introuvable")
+        album_id = _optional_int(record.get("album_id"), "album_id")
+        if album_id is not None and album_id not in self.album_ids:
+            raise RowError(f"album {album_id} introuvable")
+        raw_genres = record.get("genre_ids") or []
+        if not isinstance(raw_genres, list):
+            raise RowError("genre_ids doit être une liste")
+        genre_ids = list(dict.fromkeys(g for g in (_optional_int(g, "genre_ids") for g in raw_genres) if g is not None))
+        unknown = [g for g in genre_ids if g not in self.genre_ids]
+        if unknown:
+            raise RowError(f"genres introuvables: {unknown}")
+
+        self._rows.append({"title": title, "duration": duration, "artist_id": artist_id, "album_id": album_id})
+        self._genres.append(genre_ids)
+        self._lines.append(self.line_no)
+
+    def _error(self, message: str, line: int | None = None, count: int = 1):
+        self.failed += count
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line or self.line_no, "error": message})
+
+    def _insert_songs(self, rows: list[dict]) -> list[int]:
+        db = self.db
+        if getattr(db.get_bind().dialect, "insert_executemany_returning_sort_by_parameter_order", False):
+            stmt = insert(songs_table).returning(songs_table.c.id, sort_by_parameter_order=True)
+            return list(db.scalars(stmt, rows))
+        # MySQL has no RETURNING: one multi-row INSERT, LAST_INSERT_ID() is the first id
+        result = db.execute(insert(songs_table).values(rows))
+        return self._resolve_ids(result.lastrowid, rows)
+
+    def _resolve_ids(self, first_id: int, rows: list[dict]) -> list[int]:
+        # ids of a multi-row INSERT are consecutive unless concurrent inserts interleaved
+        # (innodb_autoinc_lock_mode=2); match our rows in insertion order to be safe
+        cols = (songs_table.c.id, songs_table.c.title, songs_table.c.artist_id, songs_table.c.album_id)
+        found = iter(self.db.execute(
+            select(*cols).where(songs_table.c.id >= first_id).order_by(songs_table.c.id).limit(len(rows) * 4)
+        ))
+        ids = []
+        for row in rows:
+            key = (row["title"], row["artist_id"], row["album_id"])
+            for candidate in found:
+                if (candidate.title, candidate.artist_id, candidate.album_id) == key:
+                    ids.append(candidate.id)
+                    break
+            else:
+                raise RuntimeError("impossible de retrouver les ids insérés")
+        return ids
+
+    def _flush(self):
+        if not self._rows:
+            return
+        rows, genres, lines = self._rows, self._genres, self._lines
+        self._rows, self._genres, self._lines = [], [], []
+
+        # only rows carrying genres need their generated ids back
+        tagged = [(row, gids) for row, gids in zip(rows, genres) if gids]
+        plain = [row for row, gids in zip(rows, genres) if not gids]
+        needs_ids = bool(tagged)
+        try:
+            links = []
+            if plain:
+                self.db.execute(insert(songs_table), plain)
+            if tagged:
+                ids = self._insert_songs([row for row, _ in tagged])
+                links = [{"song_id": sid, "genre_id": g} for sid, (_, gids) in zip(ids, tagged) for g in gids]
+                self.db.execute(insert(song_genres), links)
+            delta = StatsDelta()
+            for row, gids in zip(rows, genres):
+                delta.song(row["artist_id"], row["album_id"], row["duration"], gids)
+            apply_stats_sync(self.db, delta)
+            bump_versions_sync(self.db, *(("songs", "song_genres") if needs_ids else ("songs",)))
+            self.db.commit()
+        except DBAPIError as e:
+            # e.g. an artist deleted since the ids were preloaded: the whole chunk is rejected
+            self.db.rollback()
+            self._error(f"lot rejeté (lignes {lines[0]}-{lines[-1]}): {e.orig}", line=lines[0], count=len(rows))
+            return
+
+        invalidate(
+            "songs",
+            *{f"artist:{r['artist_id']}:songs" for r in rows if r["artist_id"] is not None},
+            *{f"album:{r['album_id']}:songs" for r in rows if r["album_id"] is not None},
+            *{f"genre:{g}:songs" for gids in genres for g in gids},
+            *(("song_genres",) if links else ()),
+            *delta.tags(),
+        )
+        self.inserted += len(rows)
+        self.genre_links += len(links)
+        if self.progress:
+            self.progress(self.report())
+
+    def close(self) -> dict:
+        self._flush()
+        return self.report()
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "lines": self.line_no,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "genre_links": self.genre_links,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.inserted / elapsed, 1) if elapsed else 0.0,
+            "errors": self.errors,
+        }
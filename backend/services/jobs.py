@@ -0,0 +1,320 @@
+"""Queue of long maintenance operations, kept in the `jobs` table and run by worker.py.
+
+The API only records the work: `enqueue` adds a queued row in the request's transaction
+(so the job exists exactly when the write that asked for it committed) and the handler
+answers 202 with `accepted`, pointing at GET /api/jobs/{id}. A separate process
+(`python worker.py`) does the rest with the sync engine:
+
+    queued  --claim_sync-->  running  --finish_sync-->  succeeded
+                               |  fail_sync: attempts left -> queued again, run_after
+                               |             pushed back JOB_RETRY_SECONDS * 2^(n-1)
+                               |             none left     -> failed
+                               |  no heartbeat for JOB_STALE_SECONDS (worker killed)
+                               +--requeue_stale_sync--> queued, or failed
+
+Handlers get a session, the JSON payload and a `Progress`; they commit their own work
+(in batches where it is big) and return a JSON-able result. A retried handler runs from
+the start again, so each one must be safe to repeat: the batches it already committed
+are skipped as unchanged.
+
+JOB_CONCURRENCY caps how many jobs of a kind run at once across every worker process;
+the total per process is its thread count (JOB_WORKERS).
+
+Handlers that change what the API shows bump table_versions in the transaction, like the
+synchronous paths. The worker's own evictions do not reach the API processes through the
+per-process `memory` cache, but the bumped versions retire their cached copies anyway
+(utils/cache.py request_key), within CACHE_VERSIONS_TTL.
+
+JOBS_ENABLED=false turns the queue off: worker.py refuses to start, bulk tagging answers
+synchronously, tombstones wait for scripts/purge_deleted.py and POST /api/jobs/ is a 503.
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from models.job import Job
+from services.song_genres import bulk_tag_sync, changed_tags
+from services.stats import rebuild_stats_sync
+from services.tombstones import PURGE_BATCH_SIZE, purge_sync
+from utils.cache import cache, invalidate
+from utils.conditional import bump_versions_sync
+from utils.search import uses_fulltext
+
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # threads per worker process
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", "30"))  # first retry delay, doubled each time
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))  # running without a heartbeat this long: requeued
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))  # finished jobs kept this long
+JOB_PROGRESS_SECONDS = float(os.getenv("JOB_PROGRESS_SECONDS", "1"))  # at most one progress write per interval
+log = logging.getLogger("spotilike.jobs")
+
+
+def _concurrency_limits(raw: str) -> dict[str, int]:
+    """Parse JOB_CONCURRENCY; an entry that is not kind=N (N >= 1) is skipped with a warning."""
+    limits = {}
+    for pair in filter(None, (p.strip() for p in raw.split(","))):
+        kind, _, limit = (part.strip() for part in pair.partition("="))
+        if kind and limit.isdigit() and int(limit) > 0:
+            limits[kind] = int(limit)
+        else:
+            log.warning("JOB_CONCURRENCY: ignoring %r, expected kind=N with N >= 1", pair)
+    return limits
+
+
+# kind=limit pairs; kinds not listed are only bounded by the worker threads
+JOB_CONCURRENCY = _concurrency_limits(os.getenv("JOB_CONCURRENCY", "purge_deleted=1,rebuild_stats=1,reindex_search=1"))
+BULK_TAG_BATCH_SIZE = 1000  # pairs per transaction in a bulk_tag job
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+JOB_PATH = "/api/jobs/{}"
+
+
+def _payload(payload: dict) -> str:
+    return json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+
+
+def job_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "payload": json.loads(job.payload),
+        "result": json.loads(job.result) if job.result is not None else None,
+        "error": job.error,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress_done": job.progress_done,
+        "progress_total": job.progress_total,
+        "created_at": job.created_at,
+        "run_after": job.run_after,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# API side (AsyncSession, caller commits)
+
+async def enqueue(db, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+    now = datetime.utcnow()
+    job = Job(
+        kind=kind, status=QUEUED, payload=_payload(payload), attempts=0, max_attempts=max_attempts,
+        progress_done=0, created_at=now, run_after=now,
+    )
+    db.add(job)
+    await db.flush()  # the id, for the Location header
+    return job
+
+
+async def enqueue_once(db, kind: str, payload: dict) -> Job:
+    """Like enqueue, unless the same job is already waiting: one purge covers every tombstone."""
+    job = await db.scalar(
+        select(Job).where(Job.status == QUEUED, Job.kind == kind, Job.payload == _payload(payload)).order_by(Job.id).limit(1)
+    )
+    return job or await enqueue(db, kind, payload)
+
+
+def accepted(job: Job, headers: dict | None = None) -> JSONResponse:
+    """202 with the job, and where to follow it."""
+    return JSONResponse(
+        jsonable_encoder(job_dict(job)), status_code=202, headers={"Location": JOB_PATH.format(job.id), **(headers or {})},
+    )
+
+
+# worker side (sync Session)
+
+class Progress:
+    """progress(done, total): records how far the job got, at most every JOB_PROGRESS_SECONDS.
+
+    Writes through its own session so the handler's transaction is left alone. Each
+    write also moves the heartbeat.
+    """
+
+    def __init__(self, session_factory, job_id: int, worker: str):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker = worker
+        self._last = 0.0
+
+    def __call__(self, done: int, total: int | None = None, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last < JOB_PROGRESS_SECONDS:
+            return
+        self._last = now
+        values = {"progress_done": done, "heartbeat_at": datetime.utcnow()}
+        if total is not None:
+            values["progress_total"] = total
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == self.job_id, Job.worker == self.worker, Job.status == RUNNING).values(**values))
+            db.commit()
+
+
+def claim_sync(db: Session, worker: str) -> Job | None:
+    """Take the oldest due job whose kind is under its JOB_CONCURRENCY limit."""
+    now = datetime.utcnow()
+    running = dict(db.execute(select(Job.kind, func.count()).where(Job.status == RUNNING).group_by(Job.kind)).tuples().all())
+    full = [kind for kind, limit in JOB_CONCURRENCY.items() if running.get(kind, 0) >= limit]
+    q = select(Job.id).where(Job.status == QUEUED, Job.run_after <= now)
+    if full:
+        q = q.where(Job.kind.not_in(full))
+    q = q.order_by(Job.run_after, Job.id).limit(1)
+    if db.get_bind().dialect.name in ("mysql", "mariadb"):
+        # other workers skip the row instead of queueing behind this transaction
+        q = q.with_for_update(skip_locked=True)
+    job_id = db.scalar(q)
+    if job_id is None:
+        db.rollback()
+        return None
+    # conditional: on SQLite (no row locks) another worker may have claimed it meanwhile
+    claimed = db.execute(
+        update(Job).where(Job.id == job_id, Job.status == QUEUED)
+        .values(status=RUNNING, attempts=Job.attempts + 1, worker=worker, started_at=now, heartbeat_at=now)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    job = db.get(Job, job_id)
+    limit = JOB_CONCURRENCY.get(job.kind)
+    if limit is not None and db.scalar(
+        select(func.count()).select_from(Job).where(Job.kind == job.kind, Job.status == RUNNING, Job.id != job_id)
+    ) >= limit:
+        # another worker claimed one of this kind between our count and our claim: hand it back
+        db.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker)
+            .values(status=QUEUED, attempts=Job.attempts - 1, worker=None, started_at=None, heartbeat_at=None)
+        )
+        db.commit()
+        return None
+    return job
+
+
+def heartbeat_sync(db: Session, worker: str, job_ids: list[int]):
+    """Keep the jobs a worker is still running from looking abandoned."""
+    if job_ids:
+        db.execute(
+            update(Job).where(Job.id.in_(job_ids), Job.worker == worker, Job.status == RUNNING).values(heartbeat_at=datetime.utcnow())
+        )
+        db.commit()
+
+
+def finish_sync(db: Session, job: Job, worker: str, result):
+    db.execute(
+        update(Job).where(Job.id == job.id, Job.worker == worker, Job.status == RUNNING).values(
+            status=SUCCEEDED, result=json.dumps(jsonable_encoder(result)), finished_at=datetime.utcnow(),
+            progress_done=func.coalesce(Job.progress_total, Job.progress_done),
+        )
+    )
+    db.commit()
+
+
+def fail_sync(db: Session, job: Job, worker: str, error: str):
+    now = datetime.utcnow()
+    if job.attempts < job.max_attempts:
+        values = dict(status=QUEUED, worker=None, run_after=now + timedelta(seconds=JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)))
+    else:
+        values = dict(status=FAILED, finished_at=now)
+    db.execute(update(Job).where(Job.id == job.id, Job.worker == worker, Job.status == RUNNING).values(error=error, **values))
+    db.commit()
+
+
+def requeue_stale_sync(db: Session) -> int:
+    """Give the jobs of a worker that stopped heartbeating to someone else (or fail them)."""
+    now = datetime.utcnow()
+    stale = (Job.status == RUNNING) & (Job.heartbeat_at < now - timedelta(seconds=JOB_STALE_SECONDS))
+    error = "Tâche abandonnée par son worker"
+    count = db.execute(
+        update(Job).where(stale, Job.attempts < Job.max_attempts).values(status=QUEUED, worker=None, run_after=now, error=error)
+    ).rowcount
+    count += db.execute(
+        update(Job).where(stale, Job.attempts >= Job.max_attempts).values(status=FAILED, finished_at=now, error=error)
+    ).rowcount
+    db.commit()
+    return count
+
+
+def prune_sync(db: Session) -> int:
+    """Delete the finished jobs older than JOB_RETENTION_SECONDS."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_RETENTION_SECONDS)
+    count = db.execute(delete(Job).where(Job.status.in_((SUCCEEDED, FAILED)), Job.finished_at < cutoff)).rowcount
+    db.commit()
+    return count
+
+
+# handlers: (session, payload, progress) -> result
+
+def _bulk_tag(db: Session, payload: dict, progress: Callable) -> dict:
+    pairs = [tuple(p) for p in payload["pairs"]]
+    report = {"action": payload["action"], "requested": 0, "changed": 0, "unchanged": 0, "missing_song_ids": {}, "missing_genre_ids": {}}
+    for start in range(0, len(pairs), BULK_TAG_BATCH_SIZE):
+        chunk = pairs[start:start + BULK_TAG_BATCH_SIZE]
+        batch, changed = bulk_tag_sync(db, payload["action"], chunk)
+        if changed:
+            bump_versions_sync(db, "song_genres")
+        db.commit()
+        if changed:
+            invalidate(*changed_tags(changed))
+        for field in ("requested", "changed", "unchanged"):
+            report[field] += batch[field]
+        for field in ("missing_song_ids", "missing_genre_ids"):
+            report[field].update(dict.fromkeys(batch[field]))
+        progress(start + len(chunk), len(pairs))
+    report["missing_song_ids"] = list(report["missing_song_ids"])
+    report["missing_genre_ids"] = list(report["missing_genre_ids"])
+    return report
+
+
+def _purge_deleted(db: Session, payload: dict, progress: Callable) -> dict:
+    return {"deleted": purge_sync(db, payload.get("batch_size", PURGE_BATCH_SIZE), progress)}
+
+
+def _rebuild_stats(db: Session, payload: dict, progress: Callable) -> dict:
+    counts = rebuild_stats_sync(db)
+    # new ETags for the stats views, and a new cache key in every process
+    bump_versions_sync(db, "songs")
+    db.commit()
+    cache.clear()
+    return {"rows": counts}
+
+
+def _reindex_search(db: Session, payload: dict, progress: Callable) -> dict:
+    if not uses_fulltext(db):
+        return {"skipped": "pas d'index FULLTEXT sur ce moteur"}
+    tables = ("artists", "albums", "songs")
+    for done, table in enumerate(tables):
+        progress(done, len(tables), force=True)
+        # with innodb_optimize_fulltext_only=ON this only rebuilds the FULLTEXT indexes
+        db.execute(text(f"OPTIMIZE TABLE {table}")).all()
+    db.commit()
+    return {"optimized": list(tables)}
+
+
+HANDLERS: dict[str, Callable[[Session, dict, Callable], dict]] = {
+    "bulk_tag": _bulk_tag,
+    "purge_deleted": _purge_deleted,
+    "rebuild_stats": _rebuild_stats,
+    "reindex_search": _reindex_search,
+}
+
+
+def run_sync(session_factory, job: Job, worker: str):
+    """Run a claimed job to its next state; the worker's threads call this."""
+    progress = Progress(session_factory, job.id, worker)
+    with session_factory() as db:
+        try:
+            handler = HANDLERS[job.kind]
+            result = handler(db, json.loads(job.payload), progress)
+        except Exception as e:
+            db.rollback()
+            fail_sync(db, job, worker, f"{type(e).__name__}: {e}")
+            return
+        finish_sync(db, job, worker, result)
@@ -0,0 +1,555 @@
+"""In-process snapshot of the catalog for the hot list and relation endpoints.
+
+With CATALOG_SNAPSHOT=true each worker loads artists, albums, songs, genres and
+song_genres at startup. Rows are `__slots__` objects keyed by id, and each relation has
+sorted id arrays (artist -> albums, artist -> songs, album -> songs, genre -> songs,
+song -> genres). These endpoints then page through the arrays instead of querying the
+database:
+
+    GET /api/songs/  (sort=id, no q, no expand)   GET /api/songs/by-artist/{id}
+    GET /api/songs/by-album/{id}                  GET /api/albums/{id}/songs
+    GET /api/artists/{id}/albums                  GET /api/artists/{id}/songs
+    GET /api/songs/{id}/genres
+
+The snapshot answers only while its table_versions equal the ones the request read in
+`not_modified`. Otherwise the endpoint runs its query as before, so a stale snapshot
+never shows.
+
+Every commit in this process hands the ids it touched to a refresher thread. The thread
+re-reads those rows in one transaction. A full reload of a table happens in the
+background when:
+
+- a bulk statement wrote that table, or
+- its version moved more than the local commits explain (another worker, a script).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from models.album import Album
+from models.artist import Artist
+from models.associations import song_genres
+from models.genre import Genre
+from models.song import Song
+from models.table_version import TableVersion
+from models.tombstone import SOFT_DELETE_MIN_SONGS
+from services.catalog import SONG_COLUMNS
+from utils.pagination import CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "false").lower() in ("1", "true", "yes")
+
+TABLES = ("artists", "albums", "songs", "genres", "song_genres")
+TRACKED = {Artist: "artists", Album: "albums", Song: "songs", Genre: "genres"}
+CHUNK_SIZE = 500
+
+log = logging.getLogger("spotilike.snapshot")
+
+
+class ArtistRow:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id, self.name = id, name
+
+
+class AlbumRow:
+    __slots__ = ("id", "title", "cover", "release_date", "artist_id")
+
+    def __init__(self, id, title, cover, release_date, artist_id):
+        self.id, self.title, self.cover, self.release_date, self.artist_id = id, title, cover, release_date, artist_id
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "cover": self.cover, "release_date": self.release_date, "artist_id": self.artist_id}
+
+
+class SongRow:
+    __slots__ = ("id", "title", "duration", "artist_id", "album_id")
+
+    def __init__(self, id, title, duration, artist_id, album_id):
+        self.id, self.title, self.duration, self.artist_id, self.album_id = id, title, duration, artist_id, album_id
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "duration": self.duration, "artist_id": self.artist_id, "album_id": self.album_id}
+
+
+def _ids() -> array:
+    # 4-byte ids, a quarter of a list of int objects
+    return array("i")
+
+
+def _add(ids: array, value: int):
+    pos = bisect_left(ids, value)
+    if pos == len(ids) or ids[pos] != value:
+        ids.insert(pos, value)
+
+
+def _discard(ids: array, value: int):
+    pos = bisect_left(ids, value)
+    if pos < len(ids) and ids[pos] == value:
+        del ids[pos]
+
+
+def _link(index: dict, key: int | None, value: int):
+    if key is not None:
+        ids = index.get(key)
+        if ids is None:
+            ids = index[key] = _ids()
+        _add(ids, value)
+
+
+def _unlink(index: dict, key: int | None, value: int):
+    ids = index.get(key)
+    if ids is not None:
+        _discard(ids, value)
+        if not ids:
+            del index[key]
+
+
+class CatalogTables:
+    """The rows and relation indexes. Mutated by the refresher thread only, under the snapshot lock."""
+
+    def __init__(self):
+        self.artists: dict[int, ArtistRow] = {}
+        self.genres: dict[int, str] = {}
+        self.albums: dict[int, AlbumRow] = {}
+        self.albums_of_artist: dict[int, array] = {}
+        self.songs: dict[int, SongRow] = {}
+        self.song_ids = _ids()
+        self.songs_of_artist: dict[int, array] = {}
+        self.songs_of_album: dict[int, array] = {}
+        self.genres_of_song: dict[int, array] = {}
+        self.songs_of_genre: dict[int, array] = {}
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "artists": len(self.artists), "albums": len(self.albums), "songs": len(self.songs), "genres": len(self.genres),
+            "song_genres": sum(len(ids) for ids in self.genres_of_song.values()),
+        }
+
+    # full loads, rows in id order so every array is appended already sorted
+
+    def load_artists(self, rows):
+        self.artists = {id: ArtistRow(id, name) for id, name in rows}
+
+    def load_genres(self, rows):
+        self.genres = {id: title for id, title in rows}
+
+    def load_albums(self, rows):
+        self.albums, self.albums_of_artist = {}, {}
+        for row in rows:
+            album = self.albums[row[0]] = AlbumRow(*row)
+            self.albums_of_artist.setdefault(album.artist_id, _ids()).append(album.id)
+
+    def load_songs(self, rows):
+        self.songs, self.song_ids, self.songs_of_artist, self.songs_of_album = {}, _ids(), {}, {}
+        for row in rows:
+            song = self.songs[row[0]] = SongRow(*row)
+            self.song_ids.append(song.id)
+            if song.artist_id is not None:
+                self.songs_of_artist.setdefault(song.artist_id, _ids()).append(song.id)
+            if song.album_id is not None:
+                self.songs_of_album.setdefault(song.album_id, _ids()).append(song.id)
+
+    def load_links(self, rows):
+        # rows ordered by (song_id, genre_id): genres_of_song appends sorted, songs_of_genre
+        # sees each genre's songs in id order too
+        self.genres_of_song, self.songs_of_genre = {}, {}
+        for song_id, genre_id in rows:
+            self.genres_of_song.setdefault(song_id, _ids()).append(genre_id)
+            self.songs_of_genre.setdefault(genre_id, _ids()).append(song_id)
+
+    # incremental changes
+
+    def put_artist(self, id: int, name: str):
+        self.artists[id] = ArtistRow(id, name)
+
+    def drop_artist(self, id: int):
+        self.artists.pop(id, None)
+
+    def put_genre(self, id: int, title: str):
+        self.genres[id] = title
+
+    def drop_genre(self, id: int):
+        self.genres.pop(id, None)
+        for song_id in self.songs_of_genre.pop(id, ()):
+            _unlink(self.genres_of_song, song_id, id)
+
+    def put_album(self, row):
+        album = AlbumRow(*row)
+        if (old := self.albums.get(album.id)) is not None:
+            _unlink(self.albums_of_artist, old.artist_id, old.id)
+        self.albums[album.id] = album
+        _link(self.albums_of_artist, album.artist_id, album.id)
+
+    def drop_album(self, id: int):
+        if (old := self.albums.pop(id, None)) is not None:
+            _unlink(self.albums_of_artist, old.artist_id, id)
+
+    def put_song(self, row):
+        song = SongRow(*row)
+        if (old := self.songs.get(song.id)) is not None:
+            _unlink(self.songs_of_artist, old.artist_id, old.id)
+            _unlink(self.songs_of_album, old.album_id, old.id)
+        else:
+            _add(self.song_ids, song.id)
+        self.songs[song.id] = song
+        _link(self.songs_of_artist, song.artist_id, song.id)
+        _link(self.songs_of_album, song.album_id, song.id)
+
+    def drop_song(self, id: int):
+        if (old := self.songs.pop(id, None)) is not None:
+            _discard(self.song_ids, id)
+            _unlink(self.songs_of_artist, old.artist_id, id)
+            _unlink(self.songs_of_album, old.album_id, id)
+        self.set_song_genres(id, ())
+
+    def set_song_genres(self, song_id: int, genre_ids):
+        old = set(self.genres_of_song.get(song_id, ()))
+        new = set(genre_ids)
+        for genre_id in old - new:
+            _unlink(self.songs_of_genre, genre_id, song_id)
+            _unlink(self.genres_of_song, song_id, genre_id)
+        for genre_id in new - old:
+            _link(self.songs_of_genre, genre_id, song_id)
+            _link(self.genres_of_song, song_id, genre_id)
+
+    # reads
+
+    def song_with_names(self, song_id: int) -> dict:
+        song = self.songs[song_id]
+        artist = self.artists.get(song.artist_id)
+        album = self.albums.get(song.album_id)
+        return {
+            "id": song.id, "title": song.title, "duration": song.duration, "artist_id": song.artist_id,
+            "artist_name": artist.name if artist else None, "album_id": song.album_id, "album_title": album.title if album else None,
+        }
+
+
+ALBUM_COLUMNS = (Album.id, Album.title, Album.cover, Album.release_date, Album.artist_id)
+
+# tombstoned songs keep their genre links until the purge: read the links through Song,
+# which models/tombstone.py filters, when there can be any
+_LINKS = (
+    select(Song.id, song_genres.c.genre_id).join(song_genres, song_genres.c.song_id == Song.id)
+    if SOFT_DELETE_MIN_SONGS else select(song_genres.c.song_id, song_genres.c.genre_id)
+)
+
+# table -> (full select, CatalogTables loader); song_genres rows feed load_links
+FULL_LOADS = {
+    "artists": (select(Artist.id, Artist.name).order_by(Artist.id), CatalogTables.load_artists),
+    "genres": (select(Genre.id, Genre.title).order_by(Genre.id), CatalogTables.load_genres),
+    "albums": (select(*ALBUM_COLUMNS).order_by(Album.id), CatalogTables.load_albums),
+    "songs": (select(*SONG_COLUMNS).order_by(Song.id), CatalogTables.load_songs),
+    "song_genres": (
+        _LINKS.order_by(song_genres.c.song_id, song_genres.c.genre_id),
+        CatalogTables.load_links,
+    ),
+}
+
+
+def _page(ids, response: Response, limit: int, offset: int, after: int | None) -> list[int]:
+    # same contract as utils.pagination.paginate on an id-sorted query
+    start = bisect_right(ids, after) if after is not None else offset
+    page = list(ids[start:start + limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers[CURSOR_HEADER] = encode_cursor("id", [page[-1]])
+    return page
+
+
+def _after(cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+    values = decode_cursor(cursor, "id")
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise HTTPException(status_code=400, detail="Curseur invalide pour ce tri")
+    return values[0]
+
+
+def _intersect(lists: list) -> list:
+    smallest, *others = sorted(lists, key=len)
+    others = [set(ids) for ids in others]
+    return [i for i in smallest if all(i in ids for ids in others)]
+
+
+class CatalogSnapshot:
+    def __init__(self):
+        self.tables: CatalogTables | None = None
+        self.versions: dict[str, int] = {}
+        self.engine = None
+        self.refreshes = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._check_pending = threading.Event()
+
+    # lifecycle
+
+    def start(self, engine):
+        """Load the catalog (blocking, at startup) and follow this process's commits."""
+        self.engine = engine
+        for model in TRACKED:
+            for kind in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, kind, _track_row)
+        event.listen(Session, "do_orm_execute", _track_statement)
+        event.listen(Session, "before_commit", _capture_bumps)
+        event.listen(Session, "after_commit", _submit_changes)
+        event.listen(Session, "after_rollback", _forget_changes)
+        started = time.perf_counter()
+        self._refresh([])
+        log.info("catalog snapshot loaded in %.1fs: %s", time.perf_counter() - started, self.tables.counts())
+        threading.Thread(target=self._run, name="catalog-snapshot", daemon=True).start()
+
+    def submit(self, bumped: set[str], touched: dict[str, set[int]], opaque: set[str]):
+        self._queue.put((bumped, touched, opaque))
+
+    def request_check(self):
+        # another process moved a version: one check at a time, however many readers noticed
+        if not self._check_pending.is_set():
+            self._check_pending.set()
+            self._queue.put((set(), {}, set()))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._check_pending.clear()
+            try:
+                self._refresh(batch)
+            except Exception:
+                log.exception("catalog snapshot refresh failed, reloading on the next change")
+                with self._lock:
+                    self.versions = {}
+
+    def _refresh(self, batch: list):
+        """Apply a batch of local commits, reloading the tables they do not account for."""
+        expected = dict(self.versions)
+        touched: dict[str, set[int]] = defaultdict(set)
+        reload = set()
+        for bumped, ids, opaque in batch:
+            for table in bumped:
+                expected[table] = expected.get(table, 0) + 1
+            for table, table_ids in ids.items():
+                touched[table] |= table_ids
+            reload |= opaque
+        # one transaction: the versions and every row read below come from the same state
+        with Session(self.engine) as db:
+            current = dict(db.execute(select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(TABLES))).all())
+            if self.tables is None:
+                reload = set(TABLES)
+            else:
+                reload |= {t for t in TABLES if current.get(t, 0) != expected.get(t, 0)}
+            if current == self.versions and not reload and not touched:
+                return
+            # full reloads build fresh tables off the lock, readers keep using the old ones
+            fresh = CatalogTables()
+            for table in reload:
+                stmt, loader = FULL_LOADS[table]
+                loader(fresh, db.execute(stmt.execution_options(yield_per=20000)))
+            rows = self._read_touched(db, touched, reload)
+        with self._lock:
+            if self.tables is None:
+                self.tables = fresh
+            else:
+                self._swap(fresh, reload)
+                self._apply(rows)
+            self.versions = current
+            self.refreshes += 1
+            self.reloads += bool(reload)
+
+    def _read_touched(self, db, touched: dict[str, set[int]], reload: set[str]) -> dict:
+        rows = {}
+        sources = {
+            "artists": (Artist.id, (Artist.id, Artist.name)),
+            "genres": (Genre.id, (Genre.id, Genre.title)),
+            "albums": (Album.id, ALBUM_COLUMNS),
+            "songs": (Song.id, SONG_COLUMNS),
+        }
+        for table, (key, columns) in sources.items():
+            if table in reload or not touched.get(table):
+                continue
+            ids = sorted(touched[table])
+            found = {}
+            for i in range(0, len(ids), CHUNK_SIZE):
+                found.update((row[0], tuple(row)) for row in db.execute(select(*columns).where(key.in_(ids[i:i + CHUNK_SIZE]))))
+            rows[table] = (ids, found)
+        if "songs" in rows and "song_genres" not in reload:
+            ids = rows["songs"][0]
+            links = defaultdict(list)
+            for i in range(0, len(ids), CHUNK_SIZE):
+                stmt = select(song_genres.c.song_id, song_genres.c.genre_id).where(song_genres.c.song_id.in_(ids[i:i + CHUNK_SIZE]))
+                for song_id, genre_id in db.execute(stmt):
+                    links[song_id].append(genre_id)
+            rows["song_genres"] = links
+        return rows
+
+    def _swap(self, fresh: CatalogTables, reload: set[str]):
+        t = self.tables
+        if "artists" in reload:
+            t.artists = fresh.artists
+        if "genres" in reload:
+            t.genres = fresh.genres
+        if "albums" in reload:
+            t.albums, t.albums_of_artist = fresh.albums, fresh.albums_of_artist
+        if "songs" in reload:
+            t.songs, t.song_ids, t.songs_of_artist, t.songs_of_album = fresh.songs, fresh.song_ids, fresh.songs_of_artist, fresh.songs_of_album
+        if "song_genres" in reload:
+            t.genres_of_song, t.songs_of_genre = fresh.genres_of_song, fresh.songs_of_genre
+
+    def _apply(self, rows: dict):
+        t = self.tables
+        for table, put, drop in (
+            ("artists", lambda row: t.put_artist(*row), t.drop_artist),
+            ("genres", lambda row: t.put_genre(*row), t.drop_genre),
+            ("albums", t.put_album, t.drop_album),
+            ("songs", t.put_song, t.drop_song),
+        ):
+            ids, found = rows.get(table, ((), {}))
+            for id in ids:
+                if id in found:
+                    put(found[id])
+                else:
+                    drop(id)
+        for song_id in rows.get("songs", ((), {}))[0]:
+            if song_id in t.songs and "song_genres" in rows:
+                t.set_song_genres(song_id, rows["song_genres"].get(song_id, ()))
+
+    def _fresh(self, request: Request) -> bool:
+        # call with the lock held: the versions the request validated against must be the snapshot's
+        seen = getattr(request.state, "table_versions", None)
+        if self.tables is None or not seen:
+            return False
+        if all(self.versions.get(name) == version for name, version in seen.items()):
+            return True
+        if any(version > self.versions.get(name, -1) for name, version in seen.items()):
+            self.request_check()
+        return False
+
+    # reads: None when the snapshot cannot answer, the caller then queries the database
+
+    def songs(self, request: Request, response: Response, *, artist_id=None, album_id=None, genre_ids=None,
+              genre_match="any", limit: int, offset: int, cursor: str | None) -> list[dict] | None:
+        """A page of list_songs (sort=id): songs with artist name and album title."""
+        after = _after(cursor)
+        with self._lock:
+            if not self._fresh(request):
+                return None
+            t = self.tables
+            lists = []
+            if artist_id is not None:
+                lists.append(t.songs_of_artist.get(artist_id, ()))
+            if album_id is not None:
+                lists.append(t.songs_of_album.get(album_id, ()))
+            genre_ids = list(dict.fromkeys(genre_ids or []))
+            if len(genre_ids) == 1 or genre_match == "all":
+                lists += [t.songs_of_genre.get(g, ()) for g in genre_ids]
+            elif genre_ids:
+                lists.append(sorted(set().union(*(t.songs_of_genre.get(g, ()) for g in genre_ids))))
+            ids = t.song_ids if not lists else lists[0] if len(lists) == 1 else _intersect(lists)
+            return [t.song_with_names(i) for i in _page(ids, response, limit, offset, after)]
+
+    def songs_of(self, request: Request, response: Response, parent: str, parent_id: int, missing: str, *,
+                 limit: int, offset: int, cursor: str | None) -> list[dict] | None:
+        """A page of the songs of an artist or album, with names; 404 `missing` for an unknown parent."""
+        after = _after(cursor)
+        with self._lock:
+            if not self._fresh(request):
+                return None
+            t = self.tables
+            parents, index = (t.artists, t.songs_of_artist) if parent == "artist" else (t.albums, t.songs_of_album)
+            if parent_id not in parents:
+                raise HTTPException(status_code=404, detail=missing)
+            return [t.song_with_names(i) for i in _page(index.get(parent_id, ()), response, limit, offset, after)]
+
+    def albums_of_artist(self, request: Request, response: Response, artist_id: int, missing: str, *,
+                         limit: int, offset: int, cursor: str | None) -> list[dict] | None:
+        after = _after(cursor)
+        with self._lock:
+            if not self._fresh(request):
+                return None
+            t = self.tables
+            if artist_id not in t.artists:
+                raise HTTPException(status_code=404, detail=missing)
+            return [t.albums[i].as_dict() for i in _page(t.albums_of_artist.get(artist_id, ()), response, limit, offset, after)]
+
+    def genres_of_song(self, request: Request, song_id: int, missing: str) -> list[tuple[int, str]] | None:
+        """(id, title) of the genres of a song, by genre id."""
+        with self._lock:
+            if not self._fresh(request):
+                return None
+            t = self.tables
+            if song_id not in t.songs:
+                raise HTTPException(status_code=404, detail=missing)
+            return [(g, t.genres[g]) for g in t.genres_of_song.get(song_id, ()) if g in t.genres]
+
+    def gauges(self) -> dict[str, float]:
+        with self._lock:
+            counts = self.tables.counts() if self.tables is not None else {}
+            gauges = {f'catalog_snapshot_rows{{table="{name}"}}': n for name, n in counts.items()}
+            gauges["catalog_snapshot_refreshes"] = self.refreshes
+            gauges["catalog_snapshot_reloads"] = self.reloads
+            gauges["catalog_snapshot_pending"] = self._queue.qsize()
+        return gauges
+
+
+snapshot = CatalogSnapshot()
+
+
+# session hooks, installed by CatalogSnapshot.start()
+
+def _track_row(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("snapshot_touched", defaultdict(set))[TRACKED[mapper.class_]].add(target.id)
+
+
+def _track_statement(state):
+    # bulk INSERT / UPDATE / DELETE: unless the statement names its rows (row_ids
+    # execution option, see utils/writes.py), the table gets reloaded
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is None or table.name not in TABLES:
+            return
+        if (row_ids := state.execution_options.get("row_ids")) is not None:
+            state.session.info.setdefault("snapshot_touched", defaultdict(set))[table.name].update(row_ids)
+        else:
+            state.session.info.setdefault("snapshot_opaque", set()).add(table.name)
+
+
+def touch(session, table: str, ids):
+    """Name rows a statement changed behind the ORM's back (ON DELETE CASCADE / SET NULL),
+    so the refresh reads them by id instead of reloading the table."""
+    session.info.setdefault("snapshot_touched", defaultdict(set))[table].update(ids)
+
+
+def _capture_bumps(session):
+    # utils.conditional drops bumped_tables in its own after_commit hook
+    if bumped := session.info.get("bumped_tables"):
+        session.info["snapshot_bumped"] = set(bumped) & set(TABLES)
+
+
+def _submit_changes(session):
+    bumped = session.info.pop("snapshot_bumped", set())
+    touched = session.info.pop("snapshot_touched", {})
+    opaque = session.info.pop("snapshot_opaque", set())
+    if bumped or touched or opaque:
+        snapshot.submit(bumped, dict(touched), opaque)
+
+
+def _forget_changes(session):
+    for key in ("snapshot_bumped", "snapshot_touched", "snapshot_opaque"):
+        session.info.pop(key, None)
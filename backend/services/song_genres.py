@@ -0,0 +1,94 @@
+"""Bulk song-genre linking for POST /api/songs/genres/bulk.
+
+The single-link endpoints load the song, the genre and the song's whole genre collection
+per link. Here a batch of pairs costs a fixed handful of statements per chunk of
+CHUNK_SIZE pairs, all in the caller's transaction:
+
+    SELECT id, duration FROM songs WHERE id IN (...)          ids that exist
+    SELECT id FROM genres WHERE id IN (...)
+    SELECT song_id, genre_id FROM song_genres WHERE (song_id, genre_id) IN (...)
+    INSERT IGNORE INTO song_genres ... / DELETE ... WHERE (song_id, genre_id) IN (...)
+
+Reading the existing links first tells which pairs actually change, which is what the
+genre counters (services/stats.py, moved here too) and the cache invalidation need.
+"""
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.associations import song_genres
+from models.genre import Genre
+from models.song import Song
+from services.stats import StatsDelta, apply_stats_sync, recount_genres_sync
+
+
+CHUNK_SIZE = 500
+
+link = tuple_(song_genres.c.song_id, song_genres.c.genre_id)
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _insert_ignore(db: Session, rows: list[dict]):
+    # a concurrent request may link the same pair between our read and this insert
+    dialect = db.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        return db.execute(mysql_insert(song_genres).values(rows).prefix_with("IGNORE"))
+    if dialect == "sqlite":
+        return db.execute(sqlite_insert(song_genres).values(rows).on_conflict_do_nothing())
+    return db.execute(insert(song_genres).values(rows))
+
+
+def bulk_tag_sync(db: Session, action: str, pairs: list[tuple[int, int]]) -> tuple[dict, list[tuple[int, int]]]:
+    """Add or remove pairs and move the genre counters; returns the report and the changed pairs."""
+    song_ids = list(dict.fromkeys(s for s, _ in pairs))
+    genre_ids = list(dict.fromkeys(g for _, g in pairs))
+    durations = {}
+    for chunk in _chunks(song_ids):
+        durations.update(db.execute(select(Song.id, Song.duration).where(Song.id.in_(chunk))).tuples().all())
+    genres = set()
+    for chunk in _chunks(genre_ids):
+        genres.update(db.scalars(select(Genre.id).where(Genre.id.in_(chunk))))
+    valid = [(s, g) for s, g in pairs if s in durations and g in genres]
+
+    existing = set()
+    for chunk in _chunks(valid):
+        existing.update(db.execute(select(song_genres.c.song_id, song_genres.c.genre_id).where(link.in_(chunk))).tuples().all())
+    if action == "add":
+        todo = [p for p in valid if p not in existing]
+        changed = sum(_insert_ignore(db, [{"song_id": s, "genre_id": g} for s, g in chunk]).rowcount for chunk in _chunks(todo))
+    else:
+        todo = [p for p in valid if p in existing]
+        changed = sum(db.execute(delete(song_genres).where(link.in_(chunk))).rowcount for chunk in _chunks(todo))
+
+    if changed == len(todo):
+        sign = 1 if action == "add" else -1
+        delta = StatsDelta()
+        for s, g in todo:
+            delta.songs("genre", g, sign, sign * (durations[s] or 0.0))
+        apply_stats_sync(db, delta)
+    else:
+        # raced with another writer on some pairs: count the touched genres again
+        recount_genres_sync(db, {g for _, g in todo})
+    report = {
+        "action": action,
+        "requested": len(pairs),
+        "changed": changed,
+        "unchanged": len(valid) - changed,
+        "missing_song_ids": [s for s in song_ids if s not in durations],
+        "missing_genre_ids": [g for g in genre_ids if g not in genres],
+    }
+    return report, todo
+
+
+def changed_tags(changed: list[tuple[int, int]]) -> list[str]:
+    """Cache tags evicted by a bulk tagging that changed these pairs."""
+    genre_ids = {g for _, g in changed}
+    return [
+        "song_genres", "genre_stats", *{f"song:{s}:genres" for s, _ in changed},
+        *(f"genre:{g}:songs" for g in genre_ids), *(f"genre:{g}:stats" for g in genre_ids),
+    ]
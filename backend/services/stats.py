@@ -0,0 +1,231 @@
+"""Maintained song counts, total durations and album counts (catalog_stats).
+
+Every write that adds, removes or moves songs or albums builds a `StatsDelta` and applies
+it inside its own transaction, so a stats read is one primary-key lookup whatever the
+size of the catalog:
+
+    delta = StatsDelta()
+    delta.song(song.artist_id, song.album_id, song.duration, genre_ids)
+    await apply_stats(db, delta)
+    await db.commit()
+    invalidate(*delta.tags())
+
+Deltas are applied as `count = count + n` upserts, so concurrent writers never lose an
+update. Writes that cascade (album / artist deletes) read the songs they are about to
+remove with `songs_delta` first. `rebuild_stats_sync` recomputes the whole table from
+the catalog (scripts/rebuild_stats.py), for rows written behind the API's back.
+"""
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import Select, and_, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.album import Album
+from models.artist import Artist
+from models.associations import song_genres
+from models.catalog_stats import CatalogStats
+from models.genre import Genre
+from models.song import Song
+
+
+stats_table = CatalogStats.__table__
+
+
+class StatsDelta:
+    """Changes to catalog_stats accumulated by one write: (scope, id) -> [songs, duration, albums]."""
+
+    def __init__(self):
+        self.rows: dict[tuple[str, int], list] = defaultdict(lambda: [0, 0.0, 0])
+        self.dropped: set[tuple[str, int]] = set()
+
+    def __bool__(self):
+        return bool(self.rows or self.dropped)
+
+    def songs(self, scope: str, scope_id: int | None, count: int, duration: float | None):
+        if scope_id is not None:
+            row = self.rows[(scope, scope_id)]
+            row[0] += count
+            row[1] += duration or 0.0
+
+    def song(self, artist_id: int | None, album_id: int | None, duration: float | None, genre_ids: Iterable[int] = (), sign: int = 1):
+        """Add (sign=1) or take away (sign=-1) one song's contribution."""
+        duration = sign * (duration or 0.0)
+        self.songs("artist", artist_id, sign, duration)
+        self.songs("album", album_id, sign, duration)
+        for genre_id in genre_ids:
+            self.songs("genre", genre_id, sign, duration)
+
+    def albums(self, artist_id: int, count: int):
+        self.rows[("artist", artist_id)][2] += count
+
+    def drop(self, scope: str, *ids: int):
+        """Delete the rows of removed artists / albums / genres."""
+        self.dropped.update((scope, i) for i in ids)
+
+    def merge(self, other: "StatsDelta"):
+        for key, (songs, duration, albums) in other.rows.items():
+            row = self.rows[key]
+            row[0] += songs
+            row[1] += duration
+            row[2] += albums
+        self.dropped |= other.dropped
+
+    def tags(self) -> set[str]:
+        """Cache tags of the stats views this delta changes."""
+        keys = (*self.rows, *self.dropped)
+        tags = {f"{scope}:{scope_id}:stats" for scope, scope_id in keys}
+        if any(scope == "genre" for scope, _ in keys):
+            tags.add("genre_stats")
+        return tags
+
+
+def songs_delta_sync(db: Session, *criteria, sign: int = -1) -> StatsDelta:
+    """The contribution of every song matching criteria, grouped per artist, album and genre.
+
+    Called before a cascading delete (sign=-1) while the songs are still there: three
+    GROUP BY queries on the (fk, id) indexes instead of loading the songs.
+    """
+    delta = StatsDelta()
+    for scope, column in (("artist", Song.artist_id), ("album", Song.album_id)):
+        rows = db.execute(
+            select(column, func.count(), func.sum(Song.duration)).where(*criteria, column.is_not(None)).group_by(column)
+        )
+        for scope_id, count, duration in rows:
+            delta.songs(scope, scope_id, sign * count, sign * (duration or 0.0))
+    rows = db.execute(
+        select(song_genres.c.genre_id, func.count(), func.sum(Song.duration))
+        .join(Song, Song.id == song_genres.c.song_id)
+        .where(*criteria)
+        .group_by(song_genres.c.genre_id)
+    )
+    for genre_id, count, duration in rows:
+        delta.songs("genre", genre_id, sign * count, sign * (duration or 0.0))
+    return delta
+
+
+def apply_stats_sync(db: Session, delta: StatsDelta):
+    if delta.dropped:
+        db.execute(delete(CatalogStats).where(tuple_(CatalogStats.scope, CatalogStats.scope_id).in_(sorted(delta.dropped))))
+    # sorted, so two writers touching the same rows lock them in the same order
+    rows = [
+        {"scope": scope, "scope_id": scope_id, "song_count": songs, "total_duration": duration, "album_count": albums}
+        for (scope, scope_id), (songs, duration, albums) in sorted(delta.rows.items())
+        if (scope, scope_id) not in delta.dropped and (songs or duration or albums)
+    ]
+    if rows:
+        _upsert(db, rows)
+
+
+async def apply_stats(db, delta: StatsDelta):
+    if delta:
+        await db.run_sync(apply_stats_sync, delta)
+
+
+async def songs_delta(db, *criteria, sign: int = -1) -> StatsDelta:
+    return await db.run_sync(songs_delta_sync, *criteria, sign=sign)
+
+
+def _increments(new) -> dict:
+    return {
+        "song_count": stats_table.c.song_count + new.song_count,
+        "total_duration": stats_table.c.total_duration + new.total_duration,
+        "album_count": stats_table.c.album_count + new.album_count,
+    }
+
+
+def _upsert(db: Session, rows: list[dict]):
+    # one multi-row statement; a row missing for a new artist / album / genre is created
+    dialect = db.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql_insert(stats_table).values(rows)
+        db.execute(stmt.on_duplicate_key_update(**_increments(stmt.inserted)))
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(stats_table).values(rows)
+        db.execute(stmt.on_conflict_do_update(index_elements=["scope", "scope_id"], set_=_increments(stmt.excluded)))
+    else:
+        _update_then_insert(db, rows)
+
+
+def _update_then_insert(db: Session, rows: list[dict]):
+    # portable path, same shape as bump_versions_sync
+    missing = []
+    for row in rows:
+        result = db.execute(
+            update(CatalogStats)
+            .where(CatalogStats.scope == row["scope"], CatalogStats.scope_id == row["scope_id"])
+            .values(
+                song_count=CatalogStats.song_count + row["song_count"],
+                total_duration=CatalogStats.total_duration + row["total_duration"],
+                album_count=CatalogStats.album_count + row["album_count"],
+            )
+        )
+        if not result.rowcount:
+            missing.append(row)
+    if missing:
+        db.execute(insert(CatalogStats), missing)
+
+
+def rebuild_stats_sync(db: Session) -> dict:
+    """Recompute catalog_stats from the catalog, one row per artist, album and genre."""
+    db.execute(delete(CatalogStats))
+    columns = ["scope", "scope_id", "song_count", "total_duration", "album_count"]
+    zero = literal(0)
+
+    def totals(column):
+        return select(column.label("scope_id"), func.count().label("n"), func.sum(Song.duration).label("d")).group_by(column)
+
+    by_artist = totals(Song.artist_id).subquery()
+    by_album = totals(Song.album_id).subquery()
+    by_genre = totals(song_genres.c.genre_id).join_from(song_genres, Song, Song.id == song_genres.c.song_id).subquery()
+    album_counts = select(Album.artist_id, func.count().label("n")).group_by(Album.artist_id).subquery()
+
+    sources = {
+        "artist": select(
+            literal("artist"), Artist.id, func.coalesce(by_artist.c.n, 0), func.coalesce(by_artist.c.d, 0.0),
+            func.coalesce(album_counts.c.n, 0),
+        )
+        .outerjoin(by_artist, by_artist.c.scope_id == Artist.id)
+        .outerjoin(album_counts, album_counts.c.artist_id == Artist.id),
+        "album": select(literal("album"), Album.id, func.coalesce(by_album.c.n, 0), func.coalesce(by_album.c.d, 0.0), zero)
+        .outerjoin(by_album, by_album.c.scope_id == Album.id),
+        "genre": select(literal("genre"), Genre.id, func.coalesce(by_genre.c.n, 0), func.coalesce(by_genre.c.d, 0.0), zero)
+        .outerjoin(by_genre, by_genre.c.scope_id == Genre.id),
+    }
+    counts = {}
+    for scope, source in sources.items():
+        counts[scope] = db.execute(insert(CatalogStats).from_select(columns, source)).rowcount
+    return counts
+
+
+def recount_genres_sync(db: Session, genre_ids: Iterable[int]):
+    """Recompute the rows of genre_ids from song_genres, for writes whose exact delta is unknown."""
+    genre_ids = list(genre_ids)
+    db.execute(delete(CatalogStats).where(CatalogStats.scope == "genre", CatalogStats.scope_id.in_(genre_ids)))
+    counts = (
+        select(literal("genre"), song_genres.c.genre_id, func.count(), func.coalesce(func.sum(Song.duration), 0.0), literal(0))
+        .join_from(song_genres, Song, Song.id == song_genres.c.song_id)
+        .where(song_genres.c.genre_id.in_(genre_ids))
+        .group_by(song_genres.c.genre_id)
+    )
+    db.execute(insert(CatalogStats).from_select(["scope", "scope_id", "song_count", "total_duration", "album_count"], counts))
+
+
+def stats_of(scope: str, parent, parent_id: int | None = None) -> Select:
+    """(id, song_count, total_duration, album_count) of one artist / album / genre, or of all.
+
+    Outer-joined from the parent rows, so one lookup also tells a missing parent (no row)
+    from one without songs (zeros).
+    """
+    stmt = (
+        select(
+            parent.id,
+            func.coalesce(CatalogStats.song_count, 0).label("song_count"),
+            func.coalesce(CatalogStats.total_duration, 0.0).label("total_duration"),
+            func.coalesce(CatalogStats.album_count, 0).label("album_count"),
+        )
+        .outerjoin(CatalogStats, and_(CatalogStats.scope == scope, CatalogStats.scope_id == parent.id))
+    )
+    return stmt if parent_id is None else stmt.where(parent.id == parent_id)
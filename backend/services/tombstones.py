@@ -0,0 +1,116 @@
+"""Artist and album deletes: one statement, or a tombstone for the big ones.
+
+The foreign keys do the cascading (migration 0006): deleting an album takes its songs
+and their genre links with it, deleting an artist takes its albums and lets go of the
+songs it is credited on elsewhere (artist_id set to NULL). Songs without an album have
+no key to cascade through and are deleted by artist_id first. The routers read only ids
+and GROUP BY totals beforehand, for the stats and the cache tags.
+
+A delete that would remove at least SOFT_DELETE_MIN_SONGS songs stamps `deleted_at`
+instead (models/tombstone.py hides the rows from then on) and `purge_sync`, run by the
+purge_deleted job the delete queues (worker.py) or by scripts/purge_deleted.py, deletes
+the stamped rows PURGE_BATCH_SIZE at a time, one transaction per batch, so no single
+statement holds the locks of a whole discography.
+"""
+import os
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from models.album import Album
+from models.artist import Artist
+from models.song import Song
+from models.tombstone import SOFT_DELETE_MIN_SONGS
+from services.snapshot import touch
+
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+
+
+def deferred(song_count: int) -> bool:
+    """Whether removing song_count songs is left to the purge."""
+    return bool(SOFT_DELETE_MIN_SONGS) and song_count >= SOFT_DELETE_MIN_SONGS
+
+
+async def check_parents(check: Callable[[], Awaitable]):
+    """Run a write's parent lookup ahead of it while tombstones are on.
+
+    A tombstoned parent still satisfies the foreign key: the write would go in, count in
+    the stats and go with the purge. The lookup is filtered (models/tombstone.py), so it
+    answers the same 404 as for a missing parent.
+    """
+    if SOFT_DELETE_MIN_SONGS:
+        await check()
+
+
+def artist_songs(artist_id: int, album_ids: list[int]):
+    """Criterion for the songs an artist delete removes: those of its albums, and its
+    songs without an album."""
+    return Song.album_id.in_(album_ids) | ((Song.artist_id == artist_id) & Song.album_id.is_(None))
+
+
+async def _bury(db, model, criterion, row_ids, now: datetime):
+    await db.execute(update(model).where(criterion).values(deleted_at=now).execution_options(row_ids=set(row_ids)))
+
+
+async def remove_artist(db, artist_id: int, album_ids: list[int], song_ids: list[int], credited_ids: list[int]) -> bool:
+    """Delete (or tombstone) an artist, its albums and the songs `artist_songs` matches.
+
+    credited_ids: its songs on other artists' albums, which stay, uncredited. Returns
+    whether the rows were only tombstoned.
+    """
+    if deferred(len(song_ids)):
+        now = datetime.utcnow()
+        await _bury(db, Song, artist_songs(artist_id, album_ids), song_ids, now)
+        await _bury(db, Album, Album.id.in_(album_ids), album_ids, now)
+        await _bury(db, Artist, Artist.id == artist_id, [artist_id], now)
+        # the credits go now, as ON DELETE SET NULL would; buried songs are filtered out
+        await db.execute(update(Song).where(Song.artist_id == artist_id).values(artist_id=None).execution_options(row_ids=set(credited_ids)))
+        return True
+    await db.execute(
+        delete(Song).where(Song.artist_id == artist_id, Song.album_id.is_(None)).execution_options(row_ids=set(song_ids))
+    )
+    await db.execute(delete(Artist).where(Artist.id == artist_id).execution_options(row_ids={artist_id}))
+    touch(db.sync_session, "albums", album_ids)
+    touch(db.sync_session, "songs", [*song_ids, *credited_ids])
+    return False
+
+
+async def remove_album(db, album_id: int, song_ids: list[int]) -> bool:
+    """Delete (or tombstone) an album and its songs; whether they were only tombstoned."""
+    if deferred(len(song_ids)):
+        now = datetime.utcnow()
+        await _bury(db, Song, Song.album_id == album_id, song_ids, now)
+        await _bury(db, Album, Album.id == album_id, [album_id], now)
+        return True
+    await db.execute(delete(Album).where(Album.id == album_id).execution_options(row_ids={album_id}))
+    touch(db.sync_session, "songs", song_ids)
+    return False
+
+
+def purge_sync(db: Session, batch_size: int = PURGE_BATCH_SIZE, progress=None) -> dict[str, int]:
+    """Delete every tombstoned song, then album, then artist, batch_size rows per commit.
+
+    The rows were already taken out of the stats and caches when they were stamped.
+    progress(done, total), when given, is called after each batch (services/jobs.py).
+    """
+    models = (Song, Album, Artist)
+    if progress is not None:
+        total = sum(
+            db.scalar(select(func.count()).select_from(model).where(model.deleted_at.is_not(None)).execution_options(include_deleted=True))
+            for model in models
+        )
+    counts = {}
+    for model in models:
+        counts[model.__tablename__] = 0
+        while ids := db.scalars(
+            select(model.id).where(model.deleted_at.is_not(None)).limit(batch_size).execution_options(include_deleted=True)
+        ).all():
+            db.execute(delete(model).where(model.id.in_(ids)).execution_options(include_deleted=True, row_ids=set(ids)))
+            db.commit()
+            counts[model.__tablename__] += len(ids)
+            if progress is not None:
+                progress(sum(counts.values()), total)
+    return counts
@@ -0,0 +1,43 @@
+"""The API in-process on a scratch SQLite database, migrated at import like in production.
+
+The settings below are read when the modules are imported, so they are set before main
+is. SOFT_DELETE_MIN_SONGS is on (3 songs) so the tombstone paths run: the write tests
+delete fewer songs than that and get the immediate deletes.
+
+    cd backend && python -m pytest -q
+"""
+import os
+import re
+import tempfile
+
+import pytest
+
+_DB = os.path.join(tempfile.mkdtemp(prefix="spotilike-tests-"), "test.sqlite")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB}"
+os.environ.pop("DATABASE_ASYNC_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ["METRICS_ENABLED"] = "true"
+os.environ["SERVER_TIMING"] = "true"
+os.environ["SOFT_DELETE_MIN_SONGS"] = "3"
+# cheap hashes, no process pool to start
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["HASH_POOL"] = "thread"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+def statements(response) -> int:
+    """SQL statements the request ran, from its Server-Timing header (utils/metrics.py)."""
+    match = TIMING.search(response.headers.get("server-timing", ""))
+    assert match, "no Server-Timing header"
+    return int(match.group(1))
@@ -0,0 +1,77 @@
+"""Login through the hashing pool (utils/security.py), for the web app's JSON and OAuth2 forms."""
+import uuid
+
+from database import SessionLocal
+from models.user import User
+from tests.conftest import statements
+from utils.security import hashing_stats, pwd_context
+
+
+def _user(client, password="secret") -> dict:
+    name = f"auth-{uuid.uuid4().hex[:8]}"
+    r = client.post("/api/users/", json={"username": name, "email": f"{name}@example.com", "password": password})
+    assert r.status_code == 201, r.text
+    return {**r.json(), "password": password}
+
+
+def _stored_password(user_id: int) -> str:
+    with SessionLocal() as db:
+        return db.get(User, user_id).password
+
+
+def test_created_users_are_hashed(client):
+    user = _user(client)
+    assert pwd_context.identify(_stored_password(user["id"])) == "bcrypt"
+
+
+def test_json_and_form_login(client):
+    user = _user(client)
+    completed = hashing_stats.completed
+    r = client.post("/api/auth/login", json={"username": user["username"], "password": "secret"})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["ok"] and body["user"]["id"] == user["id"] and body["access_token"]
+    r = client.post("/api/users/login", data={"username": user["username"], "password": "secret"})
+    assert r.status_code == 200 and r.json()["token_type"] == "bearer"
+    assert hashing_stats.completed >= completed + 2  # the pool did the verifying
+    assert client.post("/api/auth/login", json={"username": user["username"], "password": "wrong"}).status_code == 401
+    assert client.post("/api/auth/login", json={"username": user["username"]}).status_code == 400
+
+
+def test_clear_password_upgraded_on_login(client):
+    name = f"legacy-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.add(User(username=name, email=f"{name}@example.com", password="old-secret"))
+        db.commit()
+        user_id = db.scalar(User.__table__.select().with_only_columns(User.id).where(User.username == name))
+    assert client.post("/api/auth/login", json={"username": name, "password": "nope"}).status_code == 401
+    assert _stored_password(user_id) == "old-secret"
+    assert client.post("/api/auth/login", json={"username": name, "password": "old-secret"}).status_code == 200
+    assert pwd_context.identify(_stored_password(user_id)) == "bcrypt"
+    assert client.post("/api/auth/login", json={"username": name, "password": "old-secret"}).status_code == 200
+
+
+def _token(client, user) -> dict:
+    r = client.post("/api/auth/login", json={"username": user["username"], "password": user["password"]})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_me_reuses_the_cached_principal(client):
+    user = _user(client)
+    auth = _token(client, user)
+    assert client.get("/api/auth/me").status_code == 401
+    first = client.get("/api/auth/me", headers=auth)
+    assert first.status_code == 200 and first.json()["username"] == user["username"]
+    assert statements(first) == 1  # the users row, once
+    assert statements(client.get("/api/auth/me", headers=auth)) == 0  # principal cache
+
+
+def test_user_change_evicts_the_principal(client):
+    user = _user(client)
+    auth = _token(client, user)
+    client.get("/api/auth/me", headers=auth)  # cached
+    renamed = f"{user['username']}-renamed"
+    assert client.patch(f"/api/users/{user['id']}", json={"username": renamed}).status_code == 200
+    assert client.get("/api/auth/me", headers=auth).json()["username"] == renamed
+    assert client.delete(f"/api/users/{user['id']}").status_code == 204
+    assert client.get("/api/auth/me", headers=auth).status_code == 401
@@ -0,0 +1,40 @@
+"""Cached GETs are gone once a write removed what they show."""
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.mark.parametrize("parent", ["albums", "artists"])
+def test_parent_delete_evicts_song_genres(client, parent):
+    tag = uuid.uuid4().hex[:8]
+    artist = client.post("/api/artists/", json={"name": f"cache {tag}"}).json()["id"]
+    album = client.post("/api/albums/", json={"title": "a", "artist_id": artist}).json()["id"]
+    genre = client.post("/api/genres/", json={"title": f"G {tag}"}).json()["id"]
+    song = client.post("/api/songs/", json={"title": "s", "duration": 1.0, "artist_id": artist, "album_id": album}).json()["id"]
+    assert client.post(f"/api/songs/{song}/genres/{genre}").status_code == 204
+    assert client.get(f"/api/songs/{song}/genres").status_code == 200  # now cached
+
+    parent_id = album if parent == "albums" else artist
+    assert client.delete(f"/api/{parent}/{parent_id}").status_code == 204
+
+    assert client.get(f"/api/songs/{song}").status_code == 404
+    assert client.get(f"/api/songs/{song}/genres").status_code == 404
+
+
+def test_write_from_another_process_is_not_served_stale(client):
+    from database import engine
+    from utils.cache import cache
+
+    tag = uuid.uuid4().hex[:8]
+    artist = client.post("/api/artists/", json={"name": f"cache {tag}"}).json()["id"]
+    first = client.get(f"/api/artists/{artist}")  # now cached
+    # what another worker's write leaves here: new rows and versions, none of its evictions
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE artists SET name = :name WHERE id = :id"), {"name": f"renamed {tag}", "id": artist})
+        conn.execute(text("UPDATE table_versions SET version = version + 1 WHERE name = 'artists'"))
+    cache.invalidate("table_versions")  # as CACHE_VERSIONS_TTL runs out
+
+    second = client.get(f"/api/artists/{artist}")
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()["name"] == f"renamed {tag}"
@@ -0,0 +1,19 @@
+"""Streaming import: what a chunk committed is visible even if the import never finishes."""
+import json
+import uuid
+
+from database import SessionLocal
+from services.catalog_import import SongImporter
+
+
+def test_committed_chunk_evicts_cache_without_close(client):
+    title = f"imported {uuid.uuid4().hex[:8]}"
+    params = {"q": title}
+    assert client.get("/api/songs/", params=params).json() == []  # now cached
+
+    with SessionLocal() as db:
+        importer = SongImporter(db, chunk_size=1)
+        importer.feed_lines([json.dumps({"title": title, "duration": 1.0})])
+        # no close(): the client went away after the first chunk
+
+    assert [s["title"] for s in client.get("/api/songs/", params=params).json()] == [title]
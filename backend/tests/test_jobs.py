@@ -0,0 +1,67 @@
+"""The job queue, on by default whatever the cache backend."""
+from database import SessionLocal
+from services.jobs import JOBS_ENABLED, claim_sync, run_sync
+
+
+def _tag_async(client, name: str, **headers):
+    song = client.post("/api/songs/", json={"title": name, "duration": 1.0}).json()["id"]
+    genre = client.post("/api/genres/", json={"title": name}).json()["id"]
+    r = client.post(
+        "/api/songs/genres/bulk", json={"song_ids": [song], "genre_ids": [genre]}, headers={"Prefer": "respond-async", **headers},
+    )
+    return song, r
+
+
+def test_worker_writes_reach_the_memory_cache(client, monkeypatch):
+    assert JOBS_ENABLED
+    song, r = _tag_async(client, "worker")
+    assert r.status_code == 202
+    assert client.get(f"/api/songs/{song}/genres").json() == []  # cached before the job runs
+
+    # worker.py is another process: none of its evictions reach this one's memory cache
+    monkeypatch.setattr("services.jobs.invalidate", lambda *tags: None)
+    while True:  # as worker.py --once: whatever else is queued runs too
+        with SessionLocal() as db:
+            job = claim_sync(db, "test")
+        if job is None:
+            break
+        run_sync(SessionLocal, job, "test")
+    assert client.get(r.headers["Location"]).json()["status"] == "succeeded"
+
+    # the bumped song_genres version gives the request a new cache key
+    assert client.get(f"/api/songs/{song}/genres").json() == ["worker"]
+
+
+def test_queue_off(client, monkeypatch):
+    monkeypatch.setattr("routers.jobs.JOBS_ENABLED", False)
+    monkeypatch.setattr("routers.songs.JOBS_ENABLED", False)
+    assert client.post("/api/jobs/", json={"kind": "rebuild_stats"}).status_code == 503
+    _, r = _tag_async(client, "off")
+    # the preference is ignored: tagged synchronously
+    assert r.status_code == 200 and r.json()["changed"] == 1
+    assert "Preference-Applied" not in r.headers
+
+
+def test_concurrency_limits_skip_bad_entries(caplog):
+    from services.jobs import _concurrency_limits
+
+    assert _concurrency_limits("purge_deleted=1, bulk_tag=x,rebuild_stats,=2,reindex_search=0,bulk_tag=3,") == {
+        "purge_deleted": 1, "bulk_tag": 3,
+    }
+    assert len([r for r in caplog.records if "JOB_CONCURRENCY" in r.message]) == 4
+
+
+def test_replayed_202_keeps_location(client):
+    song = client.post("/api/songs/", json={"title": "replay", "duration": 1.0}).json()["id"]
+    genre = client.post("/api/genres/", json={"title": "replay"}).json()["id"]
+    request = dict(
+        json={"song_ids": [song], "genre_ids": [genre]},
+        headers={"Prefer": "respond-async", "Idempotency-Key": "replay-202"},
+    )
+    first = client.post("/api/songs/genres/bulk", **request)
+    assert first.status_code == 202
+    assert first.headers["Location"] == f"/api/jobs/{first.json()['id']}"
+    again = client.post("/api/songs/genres/bulk", **request)
+    assert again.status_code == 202 and again.headers["Idempotent-Replayed"] == "true"
+    assert again.headers["Location"] == first.headers["Location"]
+    assert client.get(again.headers["Location"]).json()["status"] == "queued"
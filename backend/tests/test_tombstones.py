@@ -0,0 +1,51 @@
+"""Tombstoned songs (SOFT_DELETE_MIN_SONGS, 3 in conftest) leave every view at once."""
+import uuid
+
+
+def test_facets_skip_tombstoned_songs(client):
+    tag = uuid.uuid4().hex[:8]
+    buried = client.post("/api/artists/", json={"name": f"buried {tag}"}).json()["id"]
+    kept = client.post("/api/artists/", json={"name": f"kept {tag}"}).json()["id"]
+    genre = client.post("/api/genres/", json={"title": f"facet {tag}"}).json()["id"]
+    for artist in (buried, buried, buried, kept):
+        song = client.post("/api/songs/", json={"title": f"s {tag}", "duration": 1.0, "artist_id": artist}).json()["id"]
+        assert client.post(f"/api/songs/{song}/genres/{genre}").status_code == 204
+
+    # tombstoned, purge queued
+    assert client.delete(f"/api/artists/{buried}").status_code == 202
+
+    body = client.get("/api/songs/browse", params={"limit": 200}).json()
+    facet = next(f for f in body["facets"] if f["genre_id"] == genre)
+    assert facet["count"] == 1
+    filtered = client.get("/api/songs/browse", params={"genre_id": genre}).json()
+    assert [s["artist_id"] for s in filtered["items"]] == [kept]
+
+
+
+def _buried(client, tag):
+    """An artist and its album, tombstoned by the artist delete (3 songs)."""
+    artist = client.post("/api/artists/", json={"name": f"buried {tag}"}).json()["id"]
+    album = client.post("/api/albums/", json={"title": "a", "artist_id": artist}).json()["id"]
+    for _ in range(3):
+        client.post("/api/songs/", json={"title": f"s {tag}", "duration": 1.0, "artist_id": artist, "album_id": album})
+    assert client.delete(f"/api/artists/{artist}").status_code == 202
+    return artist, album
+
+
+def test_writes_refuse_tombstoned_parents(client):
+    # the foreign keys accept them: the purge would later delete the new rows under the stats
+    tag = uuid.uuid4().hex[:8]
+    live = client.post("/api/artists/", json={"name": f"live {tag}"}).json()["id"]
+    album = client.post("/api/albums/", json={"title": "b", "artist_id": live}).json()["id"]
+    song = client.post("/api/songs/", json={"title": "t", "duration": 1.0, "artist_id": live}).json()["id"]
+    buried_artist, buried_album = _buried(client, tag)
+
+    assert client.post("/api/songs/", json={"title": "x", "duration": 1.0, "album_id": buried_album}).status_code == 404
+    assert client.post("/api/songs/", json={"title": "x", "duration": 1.0, "artist_id": buried_artist}).status_code == 404
+    assert client.post(f"/api/albums/{buried_album}/songs", json={"title": "x", "duration": 1.0}).status_code == 404
+    assert client.patch(f"/api/songs/{song}", json={"album_id": buried_album}).status_code == 404
+    assert client.put(f"/api/songs/{song}", json={"title": "t", "duration": 1.0, "artist_id": buried_artist}).status_code == 404
+    assert client.post("/api/albums/", json={"title": "x", "artist_id": buried_artist}).status_code == 404
+    assert client.patch(f"/api/albums/{album}", json={"artist_id": buried_artist}).status_code == 404
+
+    assert client.patch(f"/api/songs/{song}", json={"album_id": album}).status_code == 200
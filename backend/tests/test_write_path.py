@@ -0,0 +1,50 @@
+"""Statements per write, pinned: the counts the README Writes section lists (SQLite).
+
+A change that adds a lookup or a re-read to one of these paths fails here; lower a number
+when a write gets cheaper.
+"""
+import uuid
+
+import pytest
+
+from tests.conftest import statements
+
+
+@pytest.fixture
+def catalog(client):
+    tag = uuid.uuid4().hex[:8]
+    artist = client.post("/api/artists/", json={"name": f"writes {tag}"}).json()["id"]
+    album = client.post("/api/albums/", json={"title": "a", "artist_id": artist}).json()["id"]
+    song = client.post("/api/songs/", json={"title": "s", "duration": 100.0, "artist_id": artist, "album_id": album}).json()["id"]
+    return {"artist": artist, "album": album, "song": song, "tag": tag}
+
+
+def _song(catalog, **values):
+    return {"title": "s", "duration": 100.0, "artist_id": catalog["artist"], "album_id": catalog["album"], **values}
+
+
+@pytest.mark.parametrize("method, path, body, expected", [
+    ("PUT", "/api/artists/{artist}", lambda c: {"name": f"writes {c['tag']} 2"}, 2),
+    ("PATCH", "/api/artists/{artist}", lambda c: {"bio": "b"}, 2),
+    ("PUT", "/api/albums/{album}", lambda c: {"title": "a2", "artist_id": c["artist"]}, 3),
+    ("PATCH", "/api/albums/{album}", lambda c: {"title": "a3"}, 3),
+    ("PUT", "/api/songs/{song}", lambda c: _song(c, title="s2"), 3),
+    ("PUT", "/api/songs/{song}", lambda c: _song(c, duration=120.0), 5),  # moves the duration totals
+    ("PATCH", "/api/songs/{song}", lambda c: {"title": "s3"}, 3),
+    ("PATCH", "/api/songs/{song}", lambda c: {"duration": 120.0}, 5),
+])
+def test_update_statements(client, catalog, method, path, body, expected):
+    r = client.request(method, path.format(**catalog), json=body(catalog))
+    assert r.status_code == 200, r.text
+    assert statements(r) == expected
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/api/songs/{song}", 5),
+    ("/api/albums/{album}", 9),
+    ("/api/artists/{artist}", 10),
+])
+def test_delete_statements(client, catalog, path, expected):
+    r = client.delete(path.format(**catalog))
+    assert r.status_code == 204, r.text
+    assert statements(r) == expected
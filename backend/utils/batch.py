@@ -0,0 +1,15 @@
+from typing import Callable, Iterable, TypeVar
+
+
+T = TypeVar("T")
+
+
+def order_by_ids(ids: list[int], found: Iterable[T], key: Callable[[T], int] = lambda o: o.id) -> tuple[list[T], list[int]]:
+    """Line up the rows of one `IN (...)` query with the requested ids.
+
+    Returns the rows in request order (first occurrence wins for repeated ids) and the
+    ids that matched nothing.
+    """
+    by_id = {key(o): o for o in found}
+    wanted = list(dict.fromkeys(ids))
+    return [by_id[i] for i in wanted if i in by_id], [i for i in wanted if i not in by_id]
@@ -0,0 +1,226 @@
+"""Read-through cache for catalog GET endpoints.
+
+Entries are keyed per request (path + sorted query string) and carry tags naming what
+they depend on. Writes evict by tag, so they only drop the views they can affect:
+
+    artist:{id}           the artist row, and any view showing its name
+    artist:{id}:albums    albums of that artist
+    artist:{id}:songs     songs of that artist
+    album:{id}            the album row, and any view showing its title
+    album:{id}:songs      songs of that album
+    song:{id}             the song row
+    song:{id}:genres      genres of that song
+    genre:{id}            the genre row, and any view showing its title
+    genre:{id}:songs      song lists filtered on that genre
+    song_genres           any genre link (genre facet counts)
+    artist:{id}:stats / album:{id}:stats / genre:{id}:stats   maintained counters
+    genre_stats           the counters of any genre
+    artists / albums / songs / genres   the top-level paginated lists
+
+CACHE_BACKEND selects the store: "memory" (in-process LRU with TTL, the default),
+"redis" (REDIS_URL, shared between workers; "fakeredis://" for a local fake) or "none".
+
+Keys also carry the table versions the request validated against (utils/conditional.py),
+so a write made by another process, which bumps them, stops the old entries from being
+served even where its eviction does not reach (the memory backend). Those versions are
+cached for CACHE_VERSIONS_TTL only when the store is not shared.
+
+A read served by a replica is not stored when one of its tags was evicted less than
+REPLICA_STICKY_SECONDS ago: the replica may not have the write yet, and the stale copy
+would outlive the lag by CACHE_TTL.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from utils.pagination import CURSOR_HEADER
+from utils.replicas import REPLICA_STICKY_SECONDS
+
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_PREFIX = "spotilike:"
+# seconds the table versions are reused when evictions stay in the process; 0: read each time
+CACHE_VERSIONS_TTL = int(os.getenv("CACHE_VERSIONS_TTL", "1"))
+# whether an eviction in one process reaches the others; "none" keeps nothing to evict
+CACHE_SHARED = CACHE_BACKEND == "none" or (CACHE_BACKEND == "redis" and not REDIS_URL.startswith("fakeredis://"))
+
+
+class NullCache:
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: int | None = None):
+        pass
+
+    def invalidate(self, *tags: str):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, Any, tuple[str, ...]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, _ = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: int | None = None):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCache:
+    """Same contract on any redis-py compatible client (redis.Redis, fakeredis.FakeRedis)."""
+
+    def __init__(self, client, ttl: int = CACHE_TTL, prefix: str = CACHE_PREFIX):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: int | None = None):
+        ttl = ttl or self.ttl
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, json.dumps(value), ex=ttl)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipe.sadd(tag_key, key)
+            pipe.expire(tag_key, ttl)
+        pipe.execute()
+
+    def invalidate(self, *tags: str):
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            keys = self.client.smembers(tag_key)
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.delete(self.prefix + (key.decode() if isinstance(key, bytes) else key))
+            pipe.delete(tag_key)
+            pipe.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def _build_cache():
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND == "redis":
+        if REDIS_URL.startswith("fakeredis://"):
+            import fakeredis
+            return RedisCache(fakeredis.FakeRedis())
+        import redis
+        return RedisCache(redis.Redis.from_url(REDIS_URL))
+    return MemoryCache()
+
+
+cache = _build_cache()
+
+
+def request_key(request: Request) -> str:
+    query = urlencode(sorted(request.query_params.multi_items()))
+    # the table versions `not_modified` read: a body is only served to a request that
+    # validated against the same ones, so it always matches the ETag sent with it
+    versions = getattr(request.state, "table_versions", None) or {}
+    stamp = ";".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    return f"{request.url.path}?{query}|{stamp}"
+
+
+def cached_response(request: Request, response: Response | None = None):
+    entry = cache.get(request_key(request))
+    if entry is None:
+        return None
+    if response is not None and entry.get("cursor"):
+        response.headers[CURSOR_HEADER] = entry["cursor"]
+    return entry["data"]
+
+
+def cache_response(request: Request, data: Any, tags: Iterable[str], response: Response | None = None):
+    tags = tuple(tags)
+    if storable(request, tags):
+        cursor = response.headers.get(CURSOR_HEADER) if response is not None else None
+        cache.set(request_key(request), {"data": jsonable_encoder(data), "cursor": cursor}, tags=tags)
+    return data
+
+
+# tag -> monotonic time of its last eviction in this process, kept for the replica lag window
+_evicted: dict[str, float] = {}
+_evicted_lock = threading.Lock()
+
+
+def invalidate(*tags: str):
+    cache.invalidate(*tags)
+    now = time.monotonic()
+    with _evicted_lock:
+        for tag in tags:
+            _evicted[tag] = now
+        if len(_evicted) > CACHE_MAX_ENTRIES:
+            horizon = now - REPLICA_STICKY_SECONDS
+            for tag in [t for t, at in _evicted.items() if at < horizon]:
+                del _evicted[tag]
+
+
+def storable(request: Request, tags: Iterable[str]) -> bool:
+    if not getattr(request.state, "read_replica", False):
+        return True
+    horizon = time.monotonic() - REPLICA_STICKY_SECONDS
+    with _evicted_lock:
+        return all(_evicted.get(tag, 0.0) < horizon for tag in tags)
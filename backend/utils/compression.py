@@ -0,0 +1,145 @@
+"""Negotiated response compression (brotli when available, else gzip).
+
+Bodies smaller than COMPRESSION_MIN_SIZE, non-text content types and responses that
+already carry a Content-Encoding go out untouched. Streamed bodies (exports) are
+compressed chunk by chunk and flushed after each, so rows keep flowing to the client.
+Brotli needs the optional `brotli` package; without it only gzip is offered.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 4-5: close to gzip speed, smaller output
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _accepted(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        name, _, q = params.strip().partition("=")
+        try:
+            if name.strip() == "q" and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Gzip:
+    def __init__(self):
+        # wbits 31: gzip container rather than raw zlib
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._z.compress(data)
+        return out + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+class CompressionMiddleware:
+    """Pure ASGI, like MetricsMiddleware: the first body chunk decides, nothing else is buffered."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                headers = list(start.get("headers", []))
+                if not _compressible_type(headers):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                # the representation depends on Accept-Encoding even when sent as is
+                headers = _add_vary(headers)
+                # a streamed body's first chunk says nothing about its total size
+                if not more and len(body) < self.minimum_size:
+                    await send({**start, "headers": headers})
+                    start = None
+                    await send(message)
+                    return
+                compressor = _Brotli() if encoding == "br" else _Gzip()
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                payload = compressor.compress(body, final=not more)
+                if not more:
+                    headers.append((b"content-length", str(len(payload)).encode()))
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": payload, "more_body": more})
+                return
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more), "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _compressible_type(headers) -> bool:
+    content_type = b""
+    for key, value in headers:
+        key = key.lower()
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type":
+            content_type = value
+    return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: list) -> list:
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (key, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
@@ -0,0 +1,104 @@
+"""HTTP validators (ETag / Last-Modified) derived from per-table version counters.
+
+Write handlers call `bump_versions` (`bump_versions_sync` from scripts) inside their transaction; GET handlers call
+`not_modified` before doing any work, which answers 304 when the client copy is still
+current, so neither the catalog query nor the serialization runs.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.table_version import TableVersion
+from utils.cache import CACHE_SHARED, CACHE_VERSIONS_TTL, cache, invalidate, storable
+
+
+VERSIONED_TABLES = ("artists", "albums", "songs", "genres", "song_genres")
+
+
+def bump_versions_sync(db: Session, *tables: str):
+    now = datetime.utcnow()
+    result = db.execute(
+        update(TableVersion)
+        .where(TableVersion.name.in_(tables))
+        .values(version=TableVersion.version + 1, updated_at=now)
+    )
+    if result.rowcount < len(tables):
+        existing = set(db.scalars(select(TableVersion.name).where(TableVersion.name.in_(tables))))
+        missing = [t for t in tables if t not in existing]
+        if missing:
+            db.execute(insert(TableVersion), [{"name": t, "version": 1, "updated_at": now} for t in missing])
+    db.info.setdefault("bumped_tables", set()).update(tables)
+
+
+async def bump_versions(db, *tables: str):
+    await db.run_sync(bump_versions_sync, *tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_cached_versions(session):
+    if session.info.pop("bumped_tables", None):
+        invalidate("table_versions")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_bumps(session):
+    session.info.pop("bumped_tables", None)
+
+
+def seed_versions(sync_engine):
+    with Session(sync_engine) as db:
+        existing = set(db.scalars(select(TableVersion.name)))
+        missing = [t for t in VERSIONED_TABLES if t not in existing]
+        if missing:
+            db.execute(insert(TableVersion), [{"name": t, "version": 0} for t in missing])
+            db.commit()
+
+
+async def _versions(request: Request, db, tables: tuple[str, ...]) -> list:
+    key = "versions:" + ",".join(tables)
+    rows = cache.get(key)
+    if rows is None:
+        result = await db.execute(
+            select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+            .where(TableVersion.name.in_(tables))
+            .order_by(TableVersion.name)
+        )
+        rows = [[name, version, updated_at.isoformat() if updated_at else None] for name, version, updated_at in result]
+        # a per-process copy misses the other processes' bumps: kept only briefly
+        ttl = None if CACHE_SHARED else CACHE_VERSIONS_TTL
+        if ttl != 0 and storable(request, ["table_versions"]):
+            cache.set(key, rows, tags=["table_versions"], ttl=ttl)
+    return rows
+
+
+async def not_modified(request: Request, response: Response, db, *tables: str) -> Response | None:
+    """Return a 304 response if the client copy is current, else set ETag/Last-Modified."""
+    rows = await _versions(request, db, tuple(sorted(tables)))
+    # what the response is validated against, for readers that can answer without SQL (services/snapshot.py)
+    request.state.table_versions = {name: version for name, version, _ in rows}
+    seed = f"{request.url.path}?{request.url.query}|" + ";".join(f"{name}={version}" for name, version, _ in rows)
+    etag = 'W/"%s"' % hashlib.sha1(seed.encode()).hexdigest()[:20]
+    stamps = [datetime.fromisoformat(u).replace(tzinfo=timezone.utc) for _, _, u in rows if u]
+    last_modified = max(stamps).replace(microsecond=0) if stamps else None
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in (t.strip() for t in if_none_match.split(",")) or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif last_modified and (since := request.headers.get("if-modified-since")):
+        try:
+            if last_modified <= parsedate_to_datetime(since):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,43 @@
+"""Sparse fieldsets: `?fields=title,duration` on list and detail endpoints.
+
+Only the named columns (plus `id`, always returned) are selected and serialized, so a
+title-only artist list neither reads `bio` nor ships it. The payload then no longer
+matches the endpoint's response_model, so it goes out through `sparse_response`, which
+keeps the headers (ETag, X-Next-Cursor) already set on the injected response.
+"""
+from typing import Iterable
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (id is always included)"
+
+
+def parse_fields(fields: str | None, schema: type[BaseModel]) -> list[str] | None:
+    """Requested field names in schema order, or None when ?fields= is absent."""
+    if fields is None:
+        return None
+    names = {f.strip() for f in fields.split(",") if f.strip()}
+    if unknown := names - schema.model_fields.keys():
+        raise HTTPException(status_code=400, detail=f"fields inconnus: {', '.join(sorted(unknown))}")
+    return [name for name in schema.model_fields if name == "id" or name in names]
+
+
+def with_fields(selected: list[str], *needed: str) -> list[str]:
+    """selected plus columns the query needs for itself (sort keys, cache tags)."""
+    return list(dict.fromkeys([*selected, *needed]))
+
+
+def columns(model, names: list[str]) -> list:
+    return [getattr(model, name) for name in names]
+
+
+def pick(rows: Iterable, names: list[str]) -> list[dict]:
+    return [{name: getattr(row, name) for name in names} for row in rows]
+
+
+def sparse_response(data, response: Response) -> JSONResponse:
+    return JSONResponse(jsonable_encoder(data), headers=dict(response.headers))
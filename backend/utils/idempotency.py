@@ -0,0 +1,87 @@
+"""Idempotency-Key support for write endpoints.
+
+A client sends `Idempotency-Key: <uuid>` with a write; the handler stores its response
+with `remember` in the same transaction as the write. A retry carrying the same key (lost
+response, timeout, double submit) gets the stored response back from `replay` without
+the write running again; the same key with a different payload is a 422. Keys expire
+after IDEMPOTENCY_TTL seconds.
+
+    if key and (replayed := await replay(db, key, fingerprint)):
+        return replayed
+    ... write ...
+    await remember(db, key, fingerprint, 200, result)
+    await commit_once(db, key, fingerprint)
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from models.idempotency_key import IdempotencyKey
+
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))  # seconds
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+KEY_MAX_LENGTH = IdempotencyKey.__table__.c.key.type.length
+
+
+def fingerprint(route: str, payload) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{route}\n{body}".encode()).hexdigest()
+
+
+def check_key(key: str | None) -> str | None:
+    if key is not None and not 0 < len(key) <= KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} doit faire entre 1 et {KEY_MAX_LENGTH} caractères")
+    return key
+
+
+async def replay(db, key: str, fp: str, location: str | None = None) -> JSONResponse | None:
+    """The stored response for key, if any. location: for a stored 202, the URL template
+    of what was accepted, filled with the id in the stored body (only the body is kept)."""
+    row = await db.get(IdempotencyKey, key)
+    if row is None:
+        return None
+    if row.created_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL):
+        # expired: the key is free again, remember() stores over it
+        await db.delete(row)
+        return None
+    if row.fingerprint != fp:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} déjà utilisée pour une autre requête")
+    body = json.loads(row.response)
+    headers = {REPLAYED_HEADER: "true"}
+    if location and row.status_code == 202:
+        headers["Location"] = location.format(body["id"])
+    return JSONResponse(body, status_code=row.status_code, headers=headers)
+
+
+async def remember(db, key: str, fp: str, status_code: int, result):
+    now = datetime.utcnow()
+    # expired keys go with the next write that stores one (created_at is indexed)
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL), IdempotencyKey.key != key)
+        .execution_options(synchronize_session=False)
+    )
+    db.add(IdempotencyKey(
+        key=key, fingerprint=fp, status_code=status_code, response=json.dumps(jsonable_encoder(result)), created_at=now,
+    ))
+
+
+async def commit_once(db, key: str | None, fp: str, location: str | None = None) -> JSONResponse | None:
+    """Commit; if a concurrent retry with the same key committed first, return its response."""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        if key is None or (replayed := await replay(db, key, fp, location)) is None:
+            raise
+        return replayed
+    return None
@@ -0,0 +1,227 @@
+"""Per-request timing and SQL accounting.
+
+`MetricsMiddleware` opens a `RequestStats` for every HTTP request; the engine hooks
+installed by `instrument_engine` add each statement's count and duration to it (the
+async engine runs its cursor calls in a greenlet that shares the request context, sync
+endpoints run in a worker thread that copies it). When the response starts the
+middleware records per-route histograms and, with SERVER_TIMING on (it exposes the
+internal timings, so it is off by default), adds a `Server-Timing` header:
+
+    Server-Timing: db;dur=3.2;desc="4 queries", app;dur=1.9, total;dur=5.1
+
+`app` is everything but the SQL: routing, validation, serialization, pool waits.
+GET /metrics renders the registry in the Prometheus text format. Statements slower than
+SLOW_QUERY_MS are logged on the "spotilike.sql" logger with the route that ran them.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))  # 0 logs nothing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger("spotilike.sql")
+
+
+class RequestStats:
+    __slots__ = ("scope", "started", "queries", "db_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        out, running = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            running += count
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {running}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {running}")
+        return out
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.statuses: dict[int, int] = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.slow_queries = 0
+        self.queries_outside_requests = 0
+
+    def record(self, method: str, route: str, status: int, stats: RequestStats, elapsed: float):
+        with self._lock:
+            m = self.routes.get((method, route))
+            if m is None:
+                m = self.routes[(method, route)] = RouteMetrics()
+            m.latency.observe(elapsed)
+            m.queries.observe(stats.queries)
+            m.db_seconds += stats.db_seconds
+            m.statuses[status] = m.statuses.get(status, 0) + 1
+
+    def render(self, gauges: dict[str, float] | None = None) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Time to the first response byte, per route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            routes = sorted(self.routes.items())
+            for (method, route), m in routes:
+                lines += m.latency.lines("http_request_duration_seconds", _labels(method, route))
+            lines += [
+                "# HELP http_request_queries SQL statements executed per request, per route.",
+                "# TYPE http_request_queries histogram",
+            ]
+            for (method, route), m in routes:
+                lines += m.queries.lines("http_request_queries", _labels(method, route))
+            lines += [
+                "# HELP http_request_db_seconds_total Time spent in SQL statements, per route.",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (method, route), m in routes:
+                lines.append(f"http_request_db_seconds_total{{{_labels(method, route)}}} {m.db_seconds:.6f}")
+            lines += ["# HELP http_responses_total Responses per route and status.", "# TYPE http_responses_total counter"]
+            for (method, route), m in routes:
+                for status, count in sorted(m.statuses.items()):
+                    lines.append(f'http_responses_total{{{_labels(method, route)},status="{status}"}} {count}')
+            lines += [
+                f"# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).",
+                "# TYPE db_slow_queries_total counter",
+                f"db_slow_queries_total {self.slow_queries}",
+                "# HELP db_queries_outside_requests_total Statements run by startup, scripts and background streams.",
+                "# TYPE db_queries_outside_requests_total counter",
+                f"db_queries_outside_requests_total {self.queries_outside_requests}",
+            ]
+        typed = set()
+        for name, value in (gauges or {}).items():
+            base = name.partition("{")[0]
+            if base not in typed:
+                typed.add(base)
+                lines.append(f"# TYPE {base} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str) -> str:
+    return f'method="{method}",route="{route}"'
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    else:
+        with registry._lock:
+            registry.queries_outside_requests += 1
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        with registry._lock:
+            registry.slow_queries += 1
+        slow_query_log.warning(
+            "slow query %.1f ms on %s: %s",
+            elapsed * 1000, _route_path(stats.scope) if stats is not None else "-", " ".join(statement.split()),
+        )
+
+
+def _handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on engine (an Engine, or the sync_engine of an AsyncEngine)."""
+    if METRICS_ENABLED and not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed bodies are not buffered and no extra task is spawned."""
+
+    def __init__(self, app, skip_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - stats.started
+                registry.record(scope["method"], _route_path(scope), status, stats, elapsed)
+                if SERVER_TIMING:
+                    message["headers"] = [*message.get("headers", ()), (b"server-timing", _server_timing(stats, elapsed))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+def _route_path(scope) -> str:
+    # the route template, not the raw path: one series per endpoint, not per id
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(stats: RequestStats, elapsed: float) -> bytes:
+    db_ms = stats.db_seconds * 1000
+    total_ms = elapsed * 1000
+    return (
+        f'db;dur={db_ms:.1f};desc="{stats.queries} queries", app;dur={max(total_ms - db_ms, 0.0):.1f}, total;dur={total_ms:.1f}'
+    ).encode("latin-1")
@@ -0,0 +1,34 @@
+"""Bring the database schema to the latest Alembic revision (backend/migrations)."""
+import os
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Engine, inspect
+
+
+# run at startup; turn off when several workers start together and run
+# `alembic upgrade head` once from the deploy step instead
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    return cfg
+
+
+def upgrade_database(engine: Engine, revision: str = "head"):
+    cfg = alembic_config()
+    cfg.attributes["configure_logger"] = False
+    # connect, not begin: on SQLite env.py commits and switches foreign keys off first
+    with engine.connect() as conn:
+        cfg.attributes["connection"] = conn
+        inspector = inspect(conn)
+        if not inspector.has_table("alembic_version") and inspector.has_table("songs"):
+            # created by create_all before migrations existed: its schema is the baseline
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, revision)
+        conn.commit()
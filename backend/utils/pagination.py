@@ -0,0 +1,71 @@
+import base64
+import json
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    raw = json.dumps({"s": sort, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data["k"]
+        cursor_sort = data["s"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    if cursor_sort != sort or not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Curseur invalide pour ce tri")
+    return values
+
+
+def _after(columns: Sequence, values: Sequence[Any]):
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), written out so MySQL can use a range scan
+    if len(columns) != len(values):
+        raise HTTPException(status_code=400, detail="Curseur invalide pour ce tri")
+    head, value = columns[0], values[0]
+    if len(columns) == 1:
+        return head > value
+    return or_(head > value, and_(head == value, _after(columns[1:], values[1:])))
+
+
+async def paginate(
+    db,
+    stmt,
+    response: Response,
+    *,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+    order_by: Sequence,
+    sort: str,
+    key: Callable[[Any], Sequence[Any]],
+) -> list:
+    """Run the select `stmt` with offset or keyset pagination.
+
+    When a cursor is given the offset is ignored and rows are fetched strictly after the
+    cursor position, so deep pages cost the same as the first one. In both modes the
+    cursor of the next page (if any) is sent back in the X-Next-Cursor header.
+    """
+    if cursor:
+        stmt = stmt.where(_after(order_by, decode_cursor(cursor, sort)))
+    stmt = stmt.order_by(*order_by)
+    if offset and not cursor:
+        stmt = stmt.offset(offset)
+
+    result = await db.execute(stmt.limit(limit + 1))
+    # select(Model) yields entities, select(Model, col, ...) and select(col, ...) yield rows
+    described = stmt.column_descriptions
+    rows = result.scalars().all() if len(described) == 1 and described[0]["expr"] is described[0]["entity"] else result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[CURSOR_HEADER] = encode_cursor(sort, key(rows[-1]))
+    return rows
@@ -0,0 +1,52 @@
+"""Read-your-writes on top of the replica routing in dependencies.db.get_db.
+
+GET and HEAD requests read from a replica, which may lag the primary. So that a client
+sees its own writes, every successful write response sets a short-lived cookie:
+
+    Set-Cookie: read_primary_until=1760000000.5; Max-Age=5; Path=/; HttpOnly; SameSite=Lax
+
+and reads carrying an unexpired one go to the primary. Clients without a cookie jar can
+send `X-Read-Primary: 1` instead. Size REPLICA_STICKY_SECONDS above the replication lag.
+"""
+import os
+import time
+
+from fastapi import Request
+
+
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+PRIMARY_COOKIE = "read_primary_until"
+PRIMARY_HEADER = "X-Read-Primary"
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def reads_primary(request: Request) -> bool:
+    if request.method not in READ_METHODS or request.headers.get(PRIMARY_HEADER) == "1":
+        return True
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI: tags successful write responses with the read-your-writes cookie."""
+
+    def __init__(self, app, sticky_seconds: float = REPLICA_STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.sticky_seconds
+                cookie = f"{PRIMARY_COOKIE}={until:.1f}; Max-Age={self.sticky_seconds:g}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,47 @@
+import re
+
+from sqlalchemy import and_, case, false
+from sqlalchemy.dialects.mysql import match
+
+
+# Characters with a meaning in MySQL boolean full-text mode
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def search_terms(q: str) -> list[str]:
+    return [t for t in _BOOLEAN_OPERATORS.sub(" ", q).split() if t]
+
+
+def uses_fulltext(db) -> bool:
+    return db.bind.dialect.name in ("mysql", "mariadb")
+
+
+def _boolean_query(terms: list[str]) -> str:
+    # every term required, each one matched as a prefix: "daft pun" -> "+daft* +pun*"
+    return " ".join(f"+{t}*" for t in terms)
+
+
+def text_filter(db, column, q: str):
+    """Filter clause for `q` on a column carrying a FULLTEXT index.
+
+    On MySQL this is a MATCH ... AGAINST served by the index; other backends (SQLite in
+    local runs) fall back to a LIKE on every term.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return false()
+    if uses_fulltext(db):
+        return match(column, against=_boolean_query(terms)).in_boolean_mode()
+    return and_(*[column.ilike(f"%{t}%") for t in terms])
+
+
+def relevance(db, column, q: str):
+    terms = search_terms(q)
+    if uses_fulltext(db):
+        return match(column, against=_boolean_query(terms)).in_boolean_mode()
+    # crude ranking for the fallback: exact title > prefix > contains
+    return case(
+        (column.ilike(q), 3.0),
+        (column.ilike(f"{terms[0]}%"), 2.0),
+        else_=1.0,
+    )
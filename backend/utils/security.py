@@ -1,8 +1,14 @@
+import asyncio
+import hmac
 import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
 from dotenv import load_dotenv, find_dotenv
+from fastapi import HTTPException
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
@@ -13,7 +19,21 @@ JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# "argon2" needs argon2-cffi; bcrypt hashes keep verifying and are upgraded on login
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "bcrypt")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# process (default), thread, or none to hash on the calling thread
+HASH_POOL = os.getenv("HASH_POOL", "process")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_CONCURRENCY = int(os.getenv("HASH_MAX_CONCURRENCY", str(HASH_WORKERS)))
+# hash requests allowed to wait for a slot before answering 503 (0 = unbounded)
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "100"))
+
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"] if PASSWORD_SCHEME == "argon2" else ["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -28,6 +48,128 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Like verify_password, plus a fresh hash when the stored one uses an old scheme or cost.
+
+    A stored value that is no hash at all is a password saved in clear before users were
+    hashed: compared as is, and replaced by a hash when it matches.
+    """
+    if pwd_context.identify(hashed_password, required=False) is None:
+        if hmac.compare_digest(plain_password.encode(), hashed_password.encode()):
+            return True, hash_password(plain_password)
+        return False, None
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception:
+        return False, None
+
+
+class HashingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "pool": HASH_POOL,
+                "workers": HASH_WORKERS,
+                "max_concurrency": HASH_MAX_CONCURRENCY,
+                "max_queue": HASH_MAX_QUEUE,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": round(self.wait_total / done * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "run_avg_ms": round(self.run_total / done * 1000, 3),
+            }
+
+
+hashing_stats = HashingStats()
+_executor: Executor | None = None
+_slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+    if _executor is None and HASH_POOL != "none":
+        if HASH_POOL == "thread":
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _executor
+
+
+def shutdown_hashing():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+async def _run_hashing(fn, *args):
+    """Run a hashing call off the event loop, at most HASH_MAX_CONCURRENCY at a time.
+
+    bcrypt/argon2 cost hundreds of milliseconds of CPU on purpose; in a process pool they
+    neither block the loop nor hold the GIL, so the catalog endpoints keep their latency
+    during a login burst. Callers beyond HASH_MAX_QUEUE get a 503 instead of piling up.
+    """
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(HASH_MAX_CONCURRENCY))
+    slots = _slots[1]
+    stats = hashing_stats
+    with stats._lock:
+        if HASH_MAX_QUEUE and stats.queued >= HASH_MAX_QUEUE:
+            stats.rejected += 1
+            raise HTTPException(status_code=503, detail="Trop de connexions simultanées, réessayez")
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+    waited = time.perf_counter()
+    try:
+        await slots.acquire()
+    finally:
+        with stats._lock:
+            stats.queued -= 1
+    started = time.perf_counter()
+    with stats._lock:
+        stats.in_flight += 1
+    try:
+        executor = _get_executor()
+        if executor is None:
+            return fn(*args)
+        return await loop.run_in_executor(executor, fn, *args)
+    finally:
+        slots.release()
+        done = time.perf_counter()
+        with stats._lock:
+            stats.in_flight -= 1
+            stats.completed += 1
+            stats.wait_total += started - waited
+            stats.wait_max = max(stats.wait_max, started - waited)
+            stats.run_total += done - started
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -35,6 +177,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
+def user_claims(user) -> dict:
+    # username/email ride along so AUTH_TRUST_CLAIMS can skip the user lookup
+    return {"sub": str(user.id), "username": user.username, "email": user.email}
+
+
 def decode_token(token: str) -> dict:
     try:
         return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -0,0 +1,86 @@
+"""Write helpers that keep a create / update to one statement per row.
+
+Foreign keys and unique values are no longer checked with a SELECT before the write: the
+constraint checks them in the INSERT / UPDATE itself, and `constraint_errors` turns the
+violation into the API's 404 / 400. Only a failing request pays for the lookup that
+names the missing parent. `expire_on_commit=False` (database.py) leaves the written
+attributes readable after commit, so nothing is re-SELECTed to build the response.
+"""
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+
+# MySQL error codes: 1452 / 1216 parent row missing, 1062 duplicate entry
+FOREIGN_KEY_ERRORS = (1216, 1452)
+DUPLICATE_ERRORS = (1062,)
+
+
+def _code(error: IntegrityError) -> int | None:
+    args = getattr(error.orig, "args", ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    return _code(error) in FOREIGN_KEY_ERRORS or "FOREIGN KEY constraint failed" in str(error.orig)
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    return _code(error) in DUPLICATE_ERRORS or "UNIQUE constraint failed" in str(error.orig)
+
+
+@asynccontextmanager
+async def constraint_errors(db, *, missing: Callable[[], Awaitable] | None = None, duplicate: str | None = None):
+    """Translate the constraint violations raised by the statements and commit in the block.
+
+    missing: the existence checks that used to run before the write; awaited after a
+    foreign key violation to raise the 404 naming the absent parent.
+    duplicate: the 400 detail for a unique violation.
+    """
+    try:
+        yield
+    except IntegrityError as e:
+        await db.rollback()
+        if duplicate is not None and is_unique_violation(e):
+            raise HTTPException(status_code=400, detail=duplicate) from e
+        if missing is not None and is_foreign_key_violation(e):
+            await missing()
+        raise
+
+
+async def commit_checked(db, **checks):
+    """Commit the session's pending INSERTs / UPDATEs under `constraint_errors`."""
+    async with constraint_errors(db, **checks):
+        await db.commit()
+
+
+def _update(model, row_id: int, values: dict):
+    # row_ids: services/snapshot.py refreshes this row instead of reloading the table
+    return update(model).where(model.id == row_id).values(**values).execution_options(row_ids={row_id})
+
+
+async def update_row(db, model, row_id: int, values: dict) -> bool:
+    """UPDATE one row by id without reading it first; False when there is no such row."""
+    result = await db.execute(_update(model, row_id, values))
+    return result.rowcount > 0
+
+
+async def patch_row(db, model, row_id: int, values: dict):
+    """UPDATE one row by id and return all its columns, or None when there is no such row.
+
+    One UPDATE ... RETURNING where the dialect has it (SQLite, PostgreSQL); an UPDATE then
+    a primary-key SELECT elsewhere (MySQL).
+    """
+    # mapped attributes, not table columns: ORM statements, so models/tombstone.py filters them
+    columns = [getattr(model, attr.key) for attr in model.__mapper__.column_attrs]
+    if not values:
+        return (await db.execute(select(*columns).where(model.id == row_id))).first()
+    stmt = _update(model, row_id, values)
+    if db.get_bind().dialect.update_returning:
+        return (await db.execute(stmt.returning(*columns))).first()
+    if not (await db.execute(stmt)).rowcount:
+        return None
+    return (await db.execute(select(*columns).where(model.id == row_id))).first()
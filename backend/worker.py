@@ -0,0 +1,105 @@
+"""Runs the jobs queued by the API (services/jobs.py). Start it next to uvicorn, as many
+processes as needed; they share the queue through the database:
+
+    cd backend && python worker.py                     # JOB_WORKERS threads, until SIGTERM
+    cd backend && python worker.py --concurrency 4
+    cd backend && python worker.py --once              # drain what is due, then exit (cron)
+
+SIGTERM / Ctrl-C stop the claiming; the jobs in flight are finished first.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from database import SessionLocal
+from models import artist, album, song, genre, table_version, catalog_stats, job  # noqa: F401 (mappers)
+from services.jobs import (
+    JOBS_ENABLED, JOB_POLL_SECONDS, JOB_STALE_SECONDS, JOB_WORKERS, claim_sync, heartbeat_sync, prune_sync, requeue_stale_sync, run_sync,
+)
+
+logger = logging.getLogger("worker")
+
+
+class Worker:
+    def __init__(self, concurrency: int, poll: float, once: bool):
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll = poll
+        self.once = once
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running: dict[int, str] = {}  # job id -> kind, for the heartbeat
+
+    def _loop(self, slot: int):
+        name = f"{self.name}/{slot}"
+        while not self.stop.is_set():
+            with SessionLocal() as db:
+                claimed = claim_sync(db, name)
+            if claimed is None:
+                if self.once:
+                    return
+                self.stop.wait(self.poll)
+                continue
+            with self._lock:
+                self._running[claimed.id] = name
+            logger.info("job %s (%s) started, attempt %s", claimed.id, claimed.kind, claimed.attempts)
+            try:
+                run_sync(SessionLocal, claimed, name)
+            finally:
+                with self._lock:
+                    del self._running[claimed.id]
+            logger.info("job %s (%s) done", claimed.id, claimed.kind)
+
+    def _housekeeping(self):
+        # handlers may sit in one statement for minutes: the heartbeat comes from here
+        with self._lock:
+            running = dict(self._running)
+        with SessionLocal() as db:
+            for slot in set(running.values()):
+                heartbeat_sync(db, slot, [i for i, s in running.items() if s == slot])
+            if requeued := requeue_stale_sync(db):
+                logger.warning("%s stale job(s) requeued", requeued)
+            prune_sync(db)
+
+    def run(self) -> int:
+        threads = [threading.Thread(target=self._loop, args=(i,), name=f"job-{i}") for i in range(self.concurrency)]
+        self._housekeeping()
+        for t in threads:
+            t.start()
+        interval = max(JOB_STALE_SECONDS / 3, self.poll)
+        last = time.monotonic()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=self.poll)
+            if time.monotonic() - last >= interval:
+                last = time.monotonic()
+                try:
+                    self._housekeeping()
+                except Exception:
+                    logger.exception("housekeeping failed")
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the queued maintenance jobs")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKERS, help="jobs run at once by this process")
+    parser.add_argument("--poll", type=float, default=JOB_POLL_SECONDS, help="seconds between polls of an empty queue")
+    parser.add_argument("--once", action="store_true", help="exit when no job is due")
+    args = parser.parse_args()
+    if not JOBS_ENABLED:
+        parser.exit(2, "worker.py: the job queue is off, set JOBS_ENABLED=true\n")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(threadName)s %(message)s")
+
+    worker = Worker(args.concurrency, args.poll, args.once)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: worker.stop.set())
+    return worker.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
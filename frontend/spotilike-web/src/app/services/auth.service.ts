@@ -1,9 +1,10 @@
-import { api } from './api';
+import { api, setAuthToken } from './api';
 
 const AUTH_KEY = 'authUser';
 
 export async function login(username: string, password: string) {
-  const { data } = await api.post<{ ok: boolean; user: any }>(`/api/auth/login`, { username, password });
+  const { data } = await api.post<{ ok: boolean; user: any; access_token: string }>(`/api/auth/login`, { username, password });
+  setAuthToken(data.access_token);
   try { localStorage.setItem(AUTH_KEY, JSON.stringify(data.user)); } catch {}
   return data.user;
 }
@@ -14,5 +15,5 @@ export async function signup(username: string, email: string, password: string)
   return data;
 }
 
-export function logout() { try { localStorage.removeItem(AUTH_KEY); } catch {} }
+export function logout() { setAuthToken(null); try { localStorage.removeItem(AUTH_KEY); } catch {} }
 export function isAuthenticated(): boolean { try { return !!localStorage.getItem(AUTH_KEY); } catch { return false; } }